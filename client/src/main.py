@@ -1,5 +1,6 @@
 """Main client program."""
 from server_API import ServerAPI
+from connections import NetworkException
 import action
 import sys
 import threading
@@ -13,8 +14,8 @@ def main():
     try:
         server_api.join_game()
         game_state = server_api._game_state
-        thread = threading.Thread(name="check_for_updates",
-                                  target=check_for_updates,
+        thread = threading.Thread(name="receive_updates",
+                                  target=receive_updates,
                                   args=(server_api,), daemon=True)
         thread.start()
         while len(game_state._civs) < 2:
@@ -27,10 +28,19 @@ def main():
         sys.exit(1)
 
 
-def check_for_updates(server_api):
-    """Check for updates from server."""
+def receive_updates(server_api):
+    """
+    Subscribe to updates from server.
+
+    The server pushes updates once subscribed, so this only subscribes
+    again after the connection is lost.
+    """
     while True:
-        server_api.check_for_updates()
+        if not server_api.subscribed:
+            try:
+                server_api.subscribe()
+            except NetworkException:
+                pass
         sleep(1)
 
 
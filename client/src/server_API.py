@@ -2,13 +2,17 @@
 from connections import Connection
 import os
 import json
+import traceback
 import action
 from message import Message
 from hexgrid import Grid
+import mapfile
+import mapgen
 from client_gamestate import GameState
 from file_logger import Logger
 from civilisation import Civilisation
 from city import City
+from building import Building
 
 
 class ServerAPI:
@@ -18,52 +22,83 @@ class ServerAPI:
         """Create ServerAPI object."""
         with open(os.path.join("..", "config", "config.json")) as config_file:
             config = json.load(config_file)
-        self.con = Connection(config["server"]["ip"], config["server"]["port"])
-        self.con2 = Connection(config["server"]["ip"],
-                               config["server"]["port"])
+        self._connection = Connection(config["server"]["ip"],
+                                      config["server"]["port"])
+        self._connection.update_handler = self.receive_updates
+        self._subscribed_session = None
         logger = Logger("client.log", "Client",
                         config["logging"]["log_level"])
         self._log = logger.get_logger()
         self.id = None
         self._game_state = None
 
-    def send_action(self, action, connection):
+    def send_action(self, action):
         """
         Create a Message which contains action and send it to the server.
 
         :param action: Action object to be encapsulated and sent to the
             server.
         """
-        connection.open()
         message = Message(action, self.id)
-        connection.send(message.serialise())
-        reply = connection.recv()
-        connection.close()
+        reply = self._connection.request(message.serialise())
         reply_message = Message.deserialise(reply)
         return reply_message
 
+    def close(self):
+        """Close the connection to the server."""
+        if self._connection.is_open:
+            self._connection.close()
+
     def join_game(self):
         """Ask the server to join a game."""
         join_game_action = action.JoinGameAction()
-        reply = self.send_action(join_game_action, self.con)
+        reply = self.send_action(join_game_action)
         if reply.type == "ServerError":
             self._log.error(reply.obj)
             # raise action.ServerError(reply.obj)
         else:
             self._log.info("Joined game player id = " + str(reply.obj))
-            game_id, self.id = reply.obj
-            grid = Grid(20)
-            self._game_state = GameState(game_id, 1, grid, self._log)
-            self._game_state._grid.create_grid()
-            self._game_state._grid.static_map()
+            game_id, self.id, seed, digest = reply.obj
+            grid = self.load_map(seed, digest)
+            self._game_state = GameState(game_id, seed, grid, self._log)
             civ = Civilisation(self.id, self._game_state._grid, self._log)
             self._game_state.add_civ(civ)
             self._game_state._my_id = self.id
 
+    def load_map(self, seed, digest):
+        """
+        Load the map of the game joined.
+
+        A snapshot saved from an earlier game with the same digest is
+        mapped in if there is one. Otherwise the map is generated from the
+        seed, and fetched from the server if that does not give the same
+        map.
+
+        :param seed: seed the server generated the map from
+        :param digest: content hash of the server's map
+        :return: a Grid object
+        """
+        path = os.path.join("..", "maps", digest + ".hexmap")
+        if os.path.exists(path):
+            try:
+                return mapfile.load(path, digest)
+            except ValueError:
+                self._log.error("Discarding damaged map " + path)
+        grid = Grid(20)
+        grid.create_grid()
+        mapgen.generate_map(grid, seed)
+        if mapfile.digest(grid) != digest:
+            self._log.info("Generated map differs, fetching it")
+            reply = self.send_action(action.FetchMapAction())
+            grid = mapfile.loads(reply.obj, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        mapfile.save(grid, path)
+        return grid
+
     def end_turn(self):
         """Ask the server to join a game."""
         end_turn_action = action.EndTurnAction()
-        reply = self.send_action(end_turn_action, self.con)
+        reply = self.send_action(end_turn_action)
         if reply.type == "ServerError":
             self._log.error(reply.obj)
             # raise action.ServerError(reply.obj)
@@ -73,7 +108,7 @@ class ServerAPI:
     def leave_game(self):
         """Ask the server to leave a game."""
         leave_game_action = action.LeaveGameAction()
-        reply = self.send_action(leave_game_action, self.con)
+        reply = self.send_action(leave_game_action)
         if reply.type == "ServerError":
             self._log.error(reply.obj)
             # raise action.ServerError(reply.obj)
@@ -88,7 +123,7 @@ class ServerAPI:
         :param hexagon: the hex that the unit is to be moved to.
         """
         move_action = action.MovementAction(unit, hexagon)
-        reply = self.send_action(move_action, self.con)
+        reply = self.send_action(move_action)
         if reply.type == "ServerError":
             self._log.error(reply.obj)
             # raise action.ServerError(reply.obj)
@@ -106,7 +141,7 @@ class ServerAPI:
         :param defender: unit that is being attacked.
         """
         combat_action = action.CombatAction(attacker, defender)
-        reply = self.send_action(combat_action, self.con)
+        reply = self.send_action(combat_action)
         if reply.type == "ServerError":
             self._log.error(reply.obj)
             # raise action.ServerError(reply.obj)
@@ -120,7 +155,7 @@ class ServerAPI:
         :param unit: unit that is being upgraded.
         """
         upgrade_action = action.UpgradeAction(unit)
-        reply = self.send_action(upgrade_action, self.con)
+        reply = self.send_action(upgrade_action)
         if reply.type == "ServerError":
             self._log.error(reply.obj)
             # raise action.ServerError(reply.obj)
@@ -135,7 +170,7 @@ class ServerAPI:
         :param building_type: the type of building that is being built.
         """
         build_action = action.BuildAction(unit, building_type)
-        reply = self.send_action(build_action, self.con)
+        reply = self.send_action(build_action)
         if reply.type == "ServerError":
             self._log.error(reply.obj)
             # raise action.ServerError(reply.obj)
@@ -152,7 +187,7 @@ class ServerAPI:
         :param unit: unit that is doing the building.
         """
         build_city_action = action.BuildCityAction(unit)
-        reply = self.send_action(build_city_action, self.con)
+        reply = self.send_action(build_city_action)
         if reply.type == "ServerError":
             self._log.error(reply.obj)
             # raise action.ServerError(reply.obj)
@@ -170,7 +205,7 @@ class ServerAPI:
         :param level: the level of unit being bought.
         """
         purchase_action = action.PurchaseAction(city, unit_type, level)
-        reply = self.send_action(purchase_action, self.con)
+        reply = self.send_action(purchase_action)
         if reply.type == "ServerError":
             self._log.error(reply.obj)
             # raise action.ServerError(reply.obj)
@@ -182,17 +217,50 @@ class ServerAPI:
     def work_resource(self, unit):
         """Crate an action to indicate a resource is now being worked."""
         work_resource_action = action.WorkResourceAction(unit)
-        reply = self.send_action(work_resource_action, self.con)
+        reply = self.send_action(work_resource_action)
         if reply.type == "ServerError":
             self._log.error(reply.obj)
             # raise action.ServerError(reply.obj)
         else:
-            unit.position.terrain.resource.work()
+            unit.position.resource_worked = True
+
+    @property
+    def subscribed(self):
+        """
+        Getter for whether the server is pushing updates to this client.
+
+        :return: a boolean
+        """
+        return (self._connection.is_open and
+                self._subscribed_session == self._connection.session)
+
+    def subscribe(self):
+        """Ask the server to push updates to this client as they happen."""
+        subscribe_action = action.SubscribeAction()
+        reply = self.send_action(subscribe_action)
+        if reply.type == "ServerError":
+            self._log.error(reply.obj)
+            # raise action.ServerError(reply.obj)
+        elif reply.obj:
+            self._subscribed_session = self._connection.session
+            self._log.info("Subscribed to updates")
+
+    def receive_updates(self, payload):
+        """
+        Handle updates pushed by the server.
+
+        :param payload: the serialised message holding a list of updates
+        """
+        try:
+            for update in Message.deserialise(payload).obj:
+                self.handle_update(update)
+        except Exception:
+            self._log.error(traceback.format_exc())
 
     def check_for_updates(self):
         """Ask the server to update the game for a client."""
         check_for_updates_action = action.CheckForUpdates()
-        reply = self.send_action(check_for_updates_action, self.con2)
+        reply = self.send_action(check_for_updates_action)
         if reply.type == "ServerError":
             self._log.error(reply.obj)
             # raise action.ServerError(reply.obj)
@@ -255,69 +323,126 @@ class ServerAPI:
                 coords = unit.position.coords
                 hex_tile = self._game_state._grid.get_hextile(coords)
                 civ._units[unit._id].position = hex_tile
-                hex_tile._unit = civ._units[unit._id]
+                hex_tile.unit = civ._units[unit._id]
             else:
                 coords = unit.position.coords
                 hex_tile = self._game_state._grid.get_hextile(coords)
-                hex_tile._unit = None
+                hex_tile.unit = None
 
     def handle_tile_update(self, tile):
-        """Handle tile update."""
+        """
+        Handle tile update.
+
+        A city arrives without its tiles or buildings, so it is merged into
+        the city already known with the same id rather than replacing it.
+        The tiles it owns arrive as tiles of their own carrying its id.
+        """
         old_tile = self._game_state._grid.get_hextile(tile.coords)
-        unit = tile._unit
-        building = tile._building
+        unit = tile.unit
+        building = tile.building
         if unit is not None:
             civ = self._game_state._civs[unit._civ_id]
             if unit._id in civ._units:
                 civ._units[unit._id].position.unit = None
                 civ._units[unit._id].position = old_tile
-                old_tile._unit = civ._units[unit._id]
+                old_tile.unit = civ._units[unit._id]
             else:
-                civ._units[unit._id] = tile._unit
+                civ._units[unit._id] = tile.unit
                 coords = unit.position.coords
                 hex_tile = self._game_state._grid.get_hextile(coords)
                 civ._units[unit._id].position = hex_tile
-                old_tile._unit = civ._units[unit._id]
+                old_tile.unit = civ._units[unit._id]
         else:
-            old_tile._unit = None
+            old_tile.unit = None
         if building is not None:
             if isinstance(building, City):
-                civ_id = tile.civ_id
-                civ = self._game_state._civs[civ_id]
-                civ._cities[building.id] = building
-                coords = building._hex.coords
-                hex_tile = self._game_state._grid.get_hextile(coords)
-                civ._cities[building.id]._hex = hex_tile
-                old_tile._building = civ._cities[building.id]
+                civ = self._game_state._civs[tile.civ_id]
+                city = civ._cities.get(building.id, building)
+                city._civ_id = building._civ_id
+                city._hex = old_tile
+                old_tile.building = city
+                if city is building:
+                    civ._cities[building.id] = city
+                    self.adopt_city_tiles(city)
             else:
                 civ = self._game_state._civs[building._civ_id]
                 if building._city_id in civ._cities:
                     city = civ._cities[building._city_id]
                     buildings = city._buildings
                     if building._id in buildings:
-                        pass
+                        old_tile.building = buildings[building._id]
                     else:
                         buildings[building._id] = building
                         coords = building._location.coords
                         hex_tile = self._game_state._grid.get_hextile(coords)
                         buildings[building._id].position = hex_tile
-                        old_tile._building = buildings[building._id]
+                        old_tile.building = buildings[building._id]
                 else:
-                    old_tile._building = building
-                    old_tile._civ_id = building._civ_id
+                    old_tile.building = building
+                    old_tile.civ_id = building._civ_id
                     coords = building._location.coords
                     hex_tile = self._game_state._grid.get_hextile(coords)
-                    old_tile._building._hex = hex_tile
+                    old_tile.building.position = hex_tile
                     self._game_state._orphaned_buildings += \
-                        [old_tile._building]
+                        [old_tile.building]
 
         else:
-            old_tile._building = None
-        old_tile._civ_id = tile._civ_id
-        old_tile._city_id = tile._city_id
+            old_tile.building = None
+        self.move_city_tile(old_tile, tile.civ_id, tile.city_id)
+        old_tile.civ_id = tile.civ_id
+        old_tile.city_id = tile.city_id
         if tile.terrain.resource is not None:
-            old_tile.terrain.resource._is_worked = \
-                tile.terrain.resource._is_worked
+            old_tile.resource_worked = tile.resource_worked
+
+    def adopt_city_tiles(self, city):
+        """
+        Give a city new to the client the tiles and buildings it owns.
+
+        Those handled before the city itself were left without it.
+
+        :param city: the City
+        """
+        orphaned = self._game_state._orphaned_buildings
+        for tile in self._game_state._grid.spiral_ring(city.position,
+                                                       City.RANGE):
+            if tile.civ_id != city.civ_id or tile.city_id != city.id:
+                continue
+            city._tiles.append(tile)
+            building = tile.building
+            if isinstance(building, Building) and \
+                    building.city_id == city.id:
+                city._buildings[building.id] = building
+                if building in orphaned:
+                    orphaned.remove(building)
+
+    def move_city_tile(self, tile, civ_id, city_id):
+        """
+        Move a tile from the tiles of the city owning it to those of another.
+
+        :param tile: the Hex of the grid
+        :param civ_id: id of the civilisation now owning the tile, or None
+        :param city_id: id of the city now owning the tile, or None
+        """
+        old_city = self.find_city(tile.civ_id, tile.city_id)
+        new_city = self.find_city(civ_id, city_id)
+        if old_city is not None and old_city is not new_city and \
+                tile in old_city._tiles:
+            old_city._tiles.remove(tile)
+        if new_city is not None and tile not in new_city._tiles:
+            new_city._tiles.append(tile)
+
+    def find_city(self, civ_id, city_id):
+        """
+        Find a city known to the client.
+
+        :param civ_id: id of the civilisation owning the city, or None
+        :param city_id: id of the city, or None
+        :return: the City, or None
+        """
+        civ = self._game_state._civs.get(civ_id)
+        if civ is None:
+            return None
+        return civ._cities.get(city_id)
 
     def handle_civ_destroyed_update(self, update):
         """Handle player destroyed update."""
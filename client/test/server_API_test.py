@@ -0,0 +1,107 @@
+"""server_API unit testing."""
+
+import logging
+import unittest
+from action import TileUpdates
+from building import Building, BuildingType
+from city import City
+from civilisation import Civilisation
+from client_gamestate import GameState
+from hexgrid import Grid
+from message import Message
+from server_API import ServerAPI
+
+
+def make_game():
+    """Create a game state with one civilisation and no cities."""
+    log = logging.getLogger("server_API_test")
+    grid = Grid(10)
+    grid.create_grid()
+    grid.static_map()
+    game_state = GameState(1, 0, grid, log)
+    game_state.add_civ(Civilisation(1, grid, log))
+    return game_state
+
+
+def found_city(game_state):
+    """
+    Found a city with a farm at the centre of a game.
+
+    :return: the City
+    """
+    grid = game_state.grid
+    centre = grid.get_hextile((0, 0, 0))
+    city = City(1, centre, 1)
+    centre.building = city
+    city.tiles = grid.spiral_ring(centre, City.RANGE)
+    for tile in city.tiles:
+        tile.civ_id = 1
+        tile.city_id = 1
+    farm_tile = grid.get_hextile((1, 0, -1))
+    farm = Building(2, BuildingType.FARM, farm_tile, 1, 1)
+    farm_tile.building = farm
+    city.buildings[farm.id] = farm
+    game_state.get_civ(1).cities[city.id] = city
+    return city
+
+
+def server_api(game_state):
+    """Create a ServerAPI for a game state without connecting it."""
+    api = ServerAPI.__new__(ServerAPI)
+    api._game_state = game_state
+    api._log = logging.getLogger("server_API_test")
+    api.id = 1
+    return api
+
+
+def sent_tiles(game_state):
+    """
+    Send the tiles of the city in a game as the server does.
+
+    :return: the tiles as received by the client
+    """
+    tiles = game_state.get_civ(1).cities[1].tiles
+    message = Message(TileUpdates(tiles), -1).serialise()
+    return Message.deserialise(message).obj._tiles
+
+
+class ServerAPITest(unittest.TestCase):
+    """Unittest class for ServerAPI."""
+
+    def test_city_update_keeps_tiles_and_buildings(self):
+        """Test an update to a known city merges into it."""
+        server = make_game()
+        found_city(server)
+        client = make_game()
+        city = found_city(client)
+        tiles = list(city.tiles)
+        api = server_api(client)
+        for tile in sent_tiles(server):
+            api.handle_tile_update(tile)
+        self.assertIs(client.get_civ(1).cities[1], city)
+        self.assertEqual(city.tiles, tiles)
+        self.assertEqual(list(city.buildings), [2])
+        centre = client.grid.get_hextile((0, 0, 0))
+        self.assertIs(centre.building, city)
+        self.assertIs(city.position, centre)
+
+    def test_new_city_gains_its_tiles(self):
+        """Test a city new to the client adopts tiles handled before it."""
+        server = make_game()
+        found_city(server)
+        client = make_game()
+        api = server_api(client)
+        received = sent_tiles(server)
+        self.assertEqual(received[-1].coords, (0, 0, 0))
+        for tile in received:
+            api.handle_tile_update(tile)
+        city = client.get_civ(1).cities[1]
+        self.assertEqual(sorted(tile.coords for tile in city.tiles),
+                         sorted(tile.coords for tile in received))
+        self.assertIs(client.grid.get_hextile((1, 0, -1)).building,
+                      city.buildings[2])
+        self.assertEqual(client._orphaned_buildings, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,377 @@
+"""Asyncio Connection Handler."""
+import asyncio
+import functools
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from connections import FRAME_HEADER, MAX_FRAME, REQUEST, REPLY, UPDATE
+from server_connection_handler import HandshakeMetrics, server_context
+
+# Seconds a closing connection has to flush before it is aborted.
+CLOSE_TIMEOUT = 1.0
+
+
+class AsyncConnectionHandler:
+    """
+    Class to serve tcp connections from a single asyncio event loop.
+
+    Every connection is a task on the loop rather than a thread. Each
+    request read from a connection is handed to the callback, which is
+    called with the request payload and a push function, and returns the
+    reply payload. Calling push with a payload from any thread other than
+    the loop's writes it to the client as an update frame, waiting for the
+    loop to do so, and returns False if the update was not written. The
+    callback runs on a pool of worker threads, one thread
+    by default, so the game state is only ever used by one request at a
+    time.
+
+    Backpressure: a connection has at most max_pipelined requests waiting
+    on the workers. Beyond that its socket is not read, so a client
+    sending faster than the server answers is slowed by TCP itself. Replies
+    are drained before a request slot is freed, so a client that does not
+    read its replies stops being read as well. A connection whose pushed
+    updates go unread until more than max_frame bytes are waiting to be
+    sent is closed.
+
+    TLS handshakes are done by the connection tasks, with a timeout, so
+    they never hold up accepting.
+
+    Only asyncio APIs found in Python 3.6 are used, as that is the
+    version the project is built for.
+    """
+
+    def __init__(self, function, log, ip=None, context=None,
+                 max_connections=1024, max_pipelined=8, max_frame=MAX_FRAME,
+                 workers=1, handshake_timeout=10.0):
+        """
+        Create base AsyncConnectionHandler.
+
+        :param function: callback function, called with the payload of a
+            request and a push function, and returning the payload of its
+            reply
+        :param log: logger to report errors to
+        :param ip: address to listen on, read from the config if None
+        :param context: SSLContext to accept with, made from the config
+            certificate if None
+        :param max_connections: connections served at once, further ones
+            are closed as soon as they are accepted
+        :param max_pipelined: requests a connection may have in progress
+        :param max_frame: size in bytes of the largest request accepted
+        :param workers: number of threads the callback is run on
+        :param handshake_timeout: seconds a client has to finish its TLS
+            handshake
+        """
+        if ip is None or context is None:
+            with open(os.path.join("..", "config", "config.json")) \
+                    as config_file:
+                config = json.load(config_file)
+            if ip is None:
+                ip = config["server"]["ip_address"]
+            if context is None:
+                context = server_context(config)
+        self._log = log
+        self._ip = ip
+        self._context = context
+        self._function = function
+        self._max_connections = max_connections
+        self._max_pipelined = max_pipelined
+        self._max_frame = max_frame
+        self._workers = workers
+        self._handshake_timeout = handshake_timeout
+        self._handshake_metrics = HandshakeMetrics()
+        self._executor = None
+        self._loop = None
+        self._thread = None
+        self._stopped = None
+        self._clients = set()
+        self._port = None
+
+    @property
+    def port(self):
+        """
+        Getter for the port the handler is listening on.
+
+        :return: an int, or None if the handler is not started
+        """
+        return self._port
+
+    @property
+    def connection_count(self):
+        """
+        Getter for the number of connections being served.
+
+        :return: an int
+        """
+        return len(self._clients)
+
+    @property
+    def handshake_metrics(self):
+        """
+        Getter for the metrics of the TLS handshakes done.
+
+        :return: a HandshakeMetrics object
+        """
+        return self._handshake_metrics
+
+    def start(self, port):
+        """
+        Start the event loop in a new thread and listen for connections.
+
+        :param port: port for connection handler to listen on, 0 for any
+        """
+        started = threading.Event()
+        errors = []
+        self._executor = ThreadPoolExecutor(self._workers,
+                                            thread_name_prefix="worker")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            name="handler", target=self._run, args=(port, started, errors))
+        self._thread.start()
+        started.wait()
+        if errors:
+            self._thread.join()
+            raise errors[0]
+
+    def stop(self):
+        """Stop listening, close all connections and join the loop thread."""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join()
+        self._thread = None
+        self._port = None
+
+    def _run(self, port, started, errors):
+        """
+        Run the event loop until the handler is stopped.
+
+        :param port: port to listen on
+        :param started: Event set once listening, or on failure
+        :param errors: list to put an exception raised while starting in
+        """
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve(port, started, errors))
+        finally:
+            started.set()
+            self._loop.close()
+
+    async def _serve(self, port, started, errors):
+        """
+        Accept connections until the handler is stopped.
+
+        :param port: port to listen on
+        :param started: Event set once listening
+        :param errors: list to put an exception raised while starting in
+        """
+        self._stopped = asyncio.Event()
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((self._ip, port))
+            listener.listen(128)
+        except OSError as e:
+            listener.close()
+            errors.append(e)
+            return
+        listener.setblocking(False)
+        self._port = listener.getsockname()[1]
+        started.set()
+        accepting = self._loop.create_task(self._accept(listener))
+        await self._stopped.wait()
+        accepting.cancel()
+        for client in list(self._clients):
+            client.cancel()
+        await asyncio.gather(accepting, *self._clients,
+                             return_exceptions=True)
+        listener.close()
+        await self._loop.run_in_executor(None, self._executor.shutdown)
+
+    async def _accept(self, listener):
+        """
+        Start a task for every connection accepted.
+
+        :param listener: the listening socket
+        """
+        while True:
+            sock, address = await self._loop.sock_accept(listener)
+            if len(self._clients) >= self._max_connections:
+                self._log.warning("Connection limit reached, closing %s."
+                                  % (address,))
+                sock.close()
+                continue
+            client = self._loop.create_task(self._client(sock))
+            self._clients.add(client)
+            client.add_done_callback(self._clients.discard)
+
+    async def _client(self, sock):
+        """
+        Serve the requests sent over one connection until it closes.
+
+        :param sock: the accepted socket
+        """
+        reader = asyncio.StreamReader()
+        protocol = _ClientProtocol(reader)
+        writer = await self._handshake(sock, reader, protocol)
+        if writer is None:
+            return
+        slots = asyncio.Semaphore(self._max_pipelined)
+        push = functools.partial(self._push, writer)
+        replies = set()
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                length, frame_type, flags, request_id = \
+                    FRAME_HEADER.unpack(header)
+                if length > self._max_frame:
+                    self._log.error("Request of %i bytes refused." % length)
+                    break
+                payload = await reader.readexactly(length)
+                if frame_type != REQUEST:
+                    continue
+                await slots.acquire()
+                reply = asyncio.ensure_future(
+                    self._reply(writer, request_id, payload, push, slots))
+                replies.add(reply)
+                reply.add_done_callback(replies.discard)
+        except (asyncio.IncompleteReadError, asyncio.CancelledError,
+                ConnectionError, OSError):
+            pass
+        finally:
+            for reply in list(replies):
+                reply.cancel()
+            await self._close(writer, protocol)
+
+    async def _close(self, writer, protocol):
+        """
+        Close a connection and wait until its transport is closed.
+
+        :param writer: StreamWriter of the connection
+        :param protocol: _ClientProtocol of the connection
+        """
+        writer.close()
+        try:
+            await asyncio.wait_for(protocol.closed.wait(), CLOSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            writer.transport.abort()
+
+    async def _handshake(self, sock, reader, protocol):
+        """
+        Do the TLS handshake of an accepted socket.
+
+        :param sock: the accepted socket
+        :param reader: StreamReader to read the connection with
+        :param protocol: _ClientProtocol feeding reader
+        :return: a StreamWriter for the connection, None if the handshake
+            failed
+        """
+        started = time.perf_counter()
+        try:
+            transport, protocol = await asyncio.wait_for(
+                self._loop.connect_accepted_socket(
+                    lambda: protocol, sock, ssl=self._context),
+                self._handshake_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            sock.close()
+            self._handshake_metrics.record(time.perf_counter() - started, e)
+            self._log.error("TLS handshake failed: %s" % e)
+            return None
+        except asyncio.CancelledError:
+            sock.close()
+            return None
+        self._handshake_metrics.record(time.perf_counter() - started)
+        return asyncio.StreamWriter(transport, protocol, reader, self._loop)
+
+    async def _reply(self, writer, request_id, payload, push, slots):
+        """
+        Answer one request on a worker thread and write back its reply.
+
+        :param writer: StreamWriter of the connection
+        :param request_id: int id of the request
+        :param payload: bytes of the request
+        :param push: the push function of the connection
+        :param slots: Semaphore of the connection to release when done
+        """
+        try:
+            result = await self._loop.run_in_executor(
+                self._executor, self._function, payload, push)
+            writer.writelines([
+                FRAME_HEADER.pack(len(result), REPLY, 0, request_id),
+                result])
+            await writer.drain()
+        except (ConnectionError, OSError):
+            writer.close()
+        except Exception as e:
+            self._log.error("Run-time error: %s" % e)
+            writer.close()
+        finally:
+            slots.release()
+
+    def _push(self, writer, payload):
+        """
+        Send an update to a connection, from any thread but the loop's.
+
+        Waits for the loop to write the update, so that one that is dropped
+        is reported to the caller, who can keep it.
+
+        :param writer: StreamWriter of the connection
+        :param payload: bytes of the update
+        :return: False if the update was not written
+        """
+        if writer.transport.is_closing():
+            return False
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Updates cannot be pushed from the loop.")
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                self._write_update(writer, payload), self._loop)
+        except RuntimeError:
+            return False
+        try:
+            return future.result()
+        except CancelledError:
+            return False
+
+    async def _write_update(self, writer, payload):
+        """
+        Write an update frame, closing connections that do not read them.
+
+        :param writer: StreamWriter of the connection
+        :param payload: bytes of the update
+        :return: False if the update was not written
+        """
+        if writer.transport.is_closing():
+            return False
+        if writer.transport.get_write_buffer_size() > self._max_frame:
+            self._log.error("Updates not read, closing %s."
+                            % (writer.get_extra_info("peername"),))
+            writer.close()
+            return False
+        writer.writelines([FRAME_HEADER.pack(len(payload), UPDATE, 0, 0),
+                           payload])
+        return True
+
+
+class _ClientProtocol(asyncio.StreamReaderProtocol):
+    """Stream protocol of a connection, noting when it has closed."""
+
+    def __init__(self, reader):
+        """
+        Create a new _ClientProtocol object.
+
+        :param reader: StreamReader to feed
+        """
+        super().__init__(reader)
+        self.closed = asyncio.Event()
+
+    def connection_lost(self, exc):
+        """
+        Note that the connection has closed.
+
+        :param exc: the exception it closed with, or None
+        """
+        super().connection_lost(exc)
+        self.closed.set()
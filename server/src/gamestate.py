@@ -10,8 +10,11 @@ from action import ServerError, GAME_FULL_ERROR, UNKNOWN_ACTION, \
     PlayerJoinedUpdate, ResearchAction, BuildCityAction, WinUpdate, \
     CivDestroyedUpdate, WorkResourceAction
 from unit import Worker
+import mapfile
+import mapgen
 import random
-from queue import Queue
+from message import Message
+from update_queue import UpdateQueue
 
 
 class GameState:
@@ -22,7 +25,7 @@ class GameState:
         Initialise GameState attributes.
 
         :param game_id: hex grid that game is using
-        :param seed: hex grid that game is using
+        :param seed: seed the map of the game was generated from
         :param grid: hex grid that game is using
         """
         self._logger = logger
@@ -30,16 +33,18 @@ class GameState:
         self._game_id = game_id
         self._seed = seed
         self._grid = grid
+        self._map_snapshot = mapfile.dumps(grid)
+        self._map_digest = mapfile.read_header(self._map_snapshot)[2]
         self._civs = {}
         self._my_id = None
         self._turn_count = 0
         self._current_player = None
         self._game_started = False
         self._queues = {}
+        self._sent_versions = {}
         self._num_players = 2
         self._game_won = False
-        self._start_locations = [(4, -2, -2), (-3, -2, 5),
-                                 (-2, 4, -2), (4, -5, 1)]
+        self._start_locations = list(mapgen.START_LOCATIONS)
 
     @property
     def game_id(self):
@@ -59,6 +64,15 @@ class GameState:
         """
         return self._seed
 
+    @property
+    def map_digest(self):
+        """
+        Getter for the content hash of the map the game started with.
+
+        :return: hex digest string
+        """
+        return self._map_digest
+
     @property
     def grid(self):
         """
@@ -76,6 +90,23 @@ class GameState:
         """
         return self._civs[civ_id]
 
+    def choose_start_location(self):
+        """
+        Pick the free start location furthest from every existing unit.
+
+        Uses one distance field seeded with the units of every player
+        already in the game. The first player starts at random.
+
+        :return: (x, y, z) coordinates of a start location
+        """
+        units = [unit.position for civ in self._civs.values()
+                 for unit in civ.units.values()]
+        if not units:
+            return random.choice(self._start_locations)
+        distances = self._grid.distance_field(units)[0]
+        return max(self._start_locations, key=lambda location:
+                   distances[self._grid.tile_index(location)])
+
     def add_civ(self, civ):
         """Add the civ to the list of civs playing."""
         self._civs[civ.id] = civ
@@ -108,11 +139,13 @@ class GameState:
         """Setter for turn_count."""
         self._turn_count = turn_count
 
-    def handle_message(self, message):
+    def handle_message(self, message, push=None):
         """
         Handle an action sent by a client.
 
         :param messag: The message object received from the client
+        :param push: function sending a serialised message to the client,
+            returning False if it could not; needed to subscribe
         :return: The value to be sent back to the client
         """
         civ_actions = ["MovementAction", "CombatAction", "UpgradeAction",
@@ -121,6 +154,10 @@ class GameState:
 
         if message.type == "CheckForUpdates":
             return self.update_player(message)
+        if message.type == "SubscribeAction" and push is not None:
+            return self.subscribe_player(message, push)
+        if message.type == "FetchMapAction":
+            return self._map_snapshot
         self._logger.debug(message)
         if message.type == "JoinGameAction":
             return self.add_player(message)
@@ -140,25 +177,30 @@ class GameState:
         return err
 
     def populate_queues(self, result_set):
-        """Add update information to relevant queues."""
-        impacted_tiles = result_set
-        is_tile = True
-        if isinstance(result_set[0], Unit):
-            impacted_tiles = [unit.position for unit in impacted_tiles]
-            is_tile = False
+        """
+        Add update information to relevant queues.
+
+        Tile updates carry the tiles in a player's vision changed since
+        the grid version last sent to them, rather than every tile the
+        action touched. They are sent whatever the action, as unit
+        actions change tiles too, such as a unit killed in combat leaving
+        its tile.
+        """
+        is_unit = isinstance(result_set[0], Unit)
         for civ in self._civs:
-            self._civs[civ].calculate_vision()
+            (visible, hidden) = self._civs[civ].calculate_vision()
             vision = self._civs[civ].vision
-            relevant = []
-            for tile in range(len(impacted_tiles)):
-                if impacted_tiles[tile] in vision:
-                    relevant += [tile]
-            if is_tile:
-                self._queues[civ].put(
-                    TileUpdates([result_set[x] for x in relevant]))
-            else:
-                for index in relevant:
-                    self._queues[civ].put(UnitUpdate(result_set[index]))
+            if visible:
+                self._queues[civ].put(TileUpdates(visible))
+            changed = [tile for tile in self._grid.changed_since(
+                self._sent_versions.get(civ, 0)) if tile in vision]
+            if changed:
+                self._queues[civ].put(TileUpdates(changed))
+            if is_unit:
+                for unit in result_set:
+                    if unit.position in vision:
+                        self._queues[civ].put(UnitUpdate(unit))
+            self._sent_versions[civ] = self._grid.version
 
     def add_player(self, message):
         """
@@ -177,14 +219,15 @@ class GameState:
             self._logger.info("New Civilisation joined with id " +
                               str(user_id))
             # NOTE: Not needed when loading from db
-            location = random.choice(self._start_locations)
+            location = self.choose_start_location()
             del self._start_locations[self._start_locations.index(location)]
             unit_id = database_API.Unit.insert(self._session, user_id, 1,
                                                0, Worker.get_health(1),
                                                *location)
             self._civs[user_id].set_up(self._grid.get_hextile(location),
                                        unit_id)
-            self._queues[user_id] = Queue()
+            self._queues[user_id] = UpdateQueue()
+            self._sent_versions[user_id] = self._grid.version
             self._queues[user_id].put(UnitUpdate(
                 self._civs[user_id].units[unit_id]))
             if(len(self._civs) == self._num_players):
@@ -202,7 +245,7 @@ class GameState:
                                                       keys())[0]]
                     self.populate_queues([unit])
 
-            return self._game_id, user_id
+            return self._game_id, user_id, self._seed, self._map_digest
         else:
             err = ServerError(GAME_FULL_ERROR)
             self._logger.error(err)
@@ -217,7 +260,7 @@ class GameState:
         """
         user_id = message.id
         del self._civs[user_id]
-        del self._queues[user_id]
+        self._queues.pop(user_id).unsubscribe()
         database_API.User.update(self._session, user_id, active=False)
         return True
 
@@ -228,11 +271,30 @@ class GameState:
         :param message: The message object sent from the client.
         :return: The list of updates for that client.
         """
-        user_id = message.id
-        updates = []
-        while not self._queues[user_id].empty():
-            updates.append(self._queues[user_id].get())
-        return updates
+        return self._queues[message.id].drain()
+
+    def subscribe_player(self, message, push):
+        """
+        Push the updates of a player to them from now on.
+
+        Updates already waiting are pushed straight away, each later one as
+        soon as it happens, so the player need not poll with
+        CheckForUpdates. Every push is a message holding a list of updates.
+
+        :param message: The message object sent from the client.
+        :param push: function sending a serialised message to the client,
+            returning False if it could not
+        :return: whether the player is now subscribed, or a ServerError if
+            they are not in the game
+        """
+        if message.id not in self._queues:
+            err = ServerError(UNKNOWN_ACTION)
+            self._logger.error(err)
+            return err
+
+        def subscriber(updates):
+            return push(Message(updates, -1).serialise())
+        return self._queues[message.id].subscribe(subscriber)
 
     def end_turn(self, message):
         """
@@ -269,7 +331,7 @@ class GameState:
         city_destroyed_update = self._civs[civ].move_unit_to_hex(unit, tile)
         database_API.Unit.update(self._session, unit.id, x=tile.x,
                                  y=tile.y, z=tile.z)
-        result_tiles = self._grid.vision(unit.position, 3)
+        (result_tiles, hidden) = self._civs[civ].calculate_vision()
         results = [pos, unit.position] + \
             (city_destroyed_update if
              city_destroyed_update is not None else [])
@@ -360,7 +422,7 @@ class GameState:
         """Handle incoming work resource actions and update game state."""
         unit = self.validate_unit(civ, action.unit)
         tile = self.validate_tile(unit.position)
-        tile.terrain.resource.work()
+        tile.resource_worked = True
         return ([tile], True)
 
     def validate_unit(self, civ, unit):
@@ -475,6 +537,6 @@ class GameState:
         winner = self.check_win_conditions()
         if winner:
             for queue in self._queues:
-                queue.put(WinUpdate(winner))
+                self._queues[queue].put(WinUpdate(winner))
             self._game_won = True
         return result
@@ -1,15 +1,23 @@
 """A module for launching a server instance."""
 
 from server_connection_handler import ConnectionHandler
+from async_server import AsyncConnectionHandler
 from database_logger import Logger
 from hexgrid import Grid
 from gamestate import GameState
+import mapgen
 import traceback
+import random
 import database_API
 import os
 import sys
 import json
 from message import Message
+from action import ServerError, UNKNOWN_ACTION
+from connections import NetworkException, UPDATE
+
+# Seconds an update may take to send before its client is given up on.
+PUSH_TIMEOUT = 5.0
 
 
 class Server():
@@ -27,13 +35,22 @@ class Server():
                         config["logging"]["log_level"])
 
         self._log = logger.get_logger()
-        self._connection_handler = ConnectionHandler(self.handle_message,
-                                                     self._log)
+        handshake_timeout = config["server"].get("handshake_timeout", 10.0)
+        if config["server"].get("mode") == "asyncio":
+            self._connection_handler = AsyncConnectionHandler(
+                self.handle_request, self._log,
+                handshake_timeout=handshake_timeout,
+                **config["server"].get("limits", {}))
+        else:
+            self._connection_handler = ConnectionHandler(
+                self.handle_message, self._log, handshake_timeout)
+        seed = random.randrange(2 ** 31)
         grid = Grid(20)
         grid.create_grid()
-        grid.static_map()
-        game_id = database_API.Game.insert(self._session, 1, True)
-        self._gamestate = GameState(game_id, 1, grid, self._log, self._session)
+        mapgen.generate_map(grid, seed)
+        game_id = database_API.Game.insert(self._session, seed, True)
+        self._gamestate = GameState(game_id, seed, grid, self._log,
+                                    self._session)
         try:
             self._connection_handler.start(config["server"]["port"])
         except KeyboardInterrupt:
@@ -42,18 +59,51 @@ class Server():
 
     def handle_message(self, connection):
         """
-        Handle an incoming message sent to the server.
+        Handle the messages sent over a connection until it closes.
+
+        Every reply carries the request id of the message it answers.
+        Updates the client subscribes to are pushed over the connection
+        too. Pushes are made from the threads of other players' requests, so
+        one that cannot be sent in time shuts the connection down rather
+        than hold those requests up.
 
         :param connection: The initiated connection
         """
+        def push(payload):
+            try:
+                connection.send_frame(0, payload, UPDATE,
+                                      timeout=PUSH_TIMEOUT)
+            except (OSError, NetworkException):
+                return False
+            return True
+
+        while True:
+            try:
+                request_id, info = connection.recv_frame()
+            except (OSError, NetworkException):
+                break
+            try:
+                connection.send_frame(request_id,
+                                      self.handle_request(info, push))
+            except OSError:
+                break
+
+    def handle_request(self, info, push):
+        """
+        Handle one message sent by a client.
+
+        :param info: the serialised message
+        :param push: function sending a serialised update message to the
+            client, returning False if it could not
+        :return: the serialised reply
+        """
         try:
-            info = connection.recv()
             message = Message.deserialise(info)
-            result = self._gamestate.handle_message(message)
-            msg = Message(result, -1)
-            connection.send(msg.serialise())
-        except TypeError as t:
-            self._log.error(traceback.format_exc(t))
+            result = self._gamestate.handle_message(message, push)
+        except TypeError:
+            self._log.error(traceback.format_exc())
+            result = ServerError(UNKNOWN_ACTION)
+        return Message(result, -1).serialise()
 
 
 if __name__ == "__main__":
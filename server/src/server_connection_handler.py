@@ -1,35 +1,145 @@
 """Server Connection Handler."""
 from socket import socket, AF_INET, SOCK_STREAM, \
     timeout
+import asyncio
 import threading
+import time
 import ssl
 import os
 from connections import Connection
 import json
 
 
+def server_context(config):
+    """
+    Create the TLS context the server accepts connections with.
+
+    :param config: the server configuration
+    :return: an SSLContext holding the server certificate
+    """
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(certfile=config["paths"]["cert"],
+                            keyfile=config["paths"]["key"])
+    return context
+
+
+class HandshakeMetrics:
+    """Counts and times the TLS handshakes of a connection handler."""
+
+    def __init__(self):
+        """Create a new HandshakeMetrics object with nothing recorded."""
+        self._lock = threading.Lock()
+        self._count = 0
+        self._failures = 0
+        self._timeouts = 0
+        self._total_duration = 0.0
+        self._longest_duration = 0.0
+
+    @property
+    def count(self):
+        """Getter for the number of handshakes recorded."""
+        return self._count
+
+    @property
+    def failures(self):
+        """Getter for the number of handshakes that failed, timeouts too."""
+        return self._failures
+
+    @property
+    def timeouts(self):
+        """Getter for the number of handshakes that timed out."""
+        return self._timeouts
+
+    @property
+    def mean_duration(self):
+        """Getter for the mean seconds a handshake took."""
+        if self._count == 0:
+            return 0.0
+        return self._total_duration / self._count
+
+    @property
+    def longest_duration(self):
+        """Getter for the most seconds a handshake took."""
+        return self._longest_duration
+
+    def record(self, duration, error=None):
+        """
+        Record one handshake.
+
+        :param duration: seconds the handshake took
+        :param error: the exception it failed with, None if it succeeded
+        """
+        with self._lock:
+            self._count += 1
+            self._total_duration += duration
+            self._longest_duration = max(self._longest_duration, duration)
+            if error is not None:
+                self._failures += 1
+                if isinstance(error, (timeout, asyncio.TimeoutError)):
+                    self._timeouts += 1
+
+    def __str__(self):
+        """Summarise the handshakes recorded."""
+        return ("%i handshakes, %i failed, %i timed out, mean %.1f ms, "
+                "longest %.1f ms" % (self._count, self._failures,
+                                     self._timeouts,
+                                     self.mean_duration * 1000,
+                                     self._longest_duration * 1000))
+
+
 class ConnectionHandler:
-    """Class to handle incoming tcp connections."""
+    """
+    Class to handle incoming tcp connections.
+
+    The accept loop only accepts. The TLS handshake of a connection is done
+    on the thread that serves it, with a timeout, so a client that stalls
+    mid-handshake holds up no one else.
+    """
 
-    def __init__(self, function, log):
+    def __init__(self, function, log, handshake_timeout=10.0, config=None):
         """
         Create base ConnectionHandler.
 
-        :param function: callback function, called with arguments (addr, Conn)
+        :param function: callback function, called with the Connection
+        :param log: logger to report errors to
+        :param handshake_timeout: seconds a client has to finish its TLS
+            handshake
+        :param config: the server configuration, read from config.json if
+            None
         """
-        with open(os.path.join("..", "config", "config.json")) as config_file:
-            config = json.load(config_file)
+        if config is None:
+            with open(os.path.join("..", "config", "config.json")) \
+                    as config_file:
+                config = json.load(config_file)
         self._log = log
         self._ip = config["server"]["ip_address"]
         self._config = config
         self._function = function
         self._socket = socket(AF_INET, SOCK_STREAM)
         self._threads = []
+        self._connections = set()
         self._stop_flag = False
-        self._context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-        self._context.load_cert_chain(
-            certfile=config["paths"]["cert"],
-            keyfile=config["paths"]["key"])
+        self._context = server_context(config)
+        self._handshake_timeout = handshake_timeout
+        self._handshake_metrics = HandshakeMetrics()
+
+    @property
+    def port(self):
+        """
+        Getter for the port the handler is listening on.
+
+        :return: an int
+        """
+        return self._socket.getsockname()[1]
+
+    @property
+    def handshake_metrics(self):
+        """
+        Getter for the metrics of the TLS handshakes done.
+
+        :return: a HandshakeMetrics object
+        """
+        return self._handshake_metrics
 
     def start(self, port):
         """
@@ -40,7 +150,7 @@ class ConnectionHandler:
         self._stop_flag = False
         print(self._ip)
         self._socket.bind((self._ip, port))
-        self._socket.listen(10)
+        self._socket.listen(128)
         thread = threading.Thread(name="handler", target=self.handler, args=())
         thread.start()
         self._threads.append(thread)
@@ -51,27 +161,82 @@ class ConnectionHandler:
             try:
                 self._socket.settimeout(0.2)
                 conn, addr = self._socket.accept()
-                conn = self._context.wrap_socket(conn, server_side=True)
-            except ssl.SSLEOFError as e:
-                self._log.error("Run-time error: %s" % e)
-                pass
             except timeout:
                 pass
             except Exception as e:
                 self._log.error("Run-time error: %s" % e)
                 pass
             else:
-                client_conn = Connection(addr[0], addr[1], connection=conn)
                 thread = threading.Thread(name="worker",
-                                          target=self._function,
+                                          target=self._serve,
                                           daemon=True,
-                                          args=(client_conn,))
+                                          args=(conn, addr))
+                self._threads = [running for running in self._threads
+                                 if running.is_alive()]
                 thread.start()
                 self._threads.append(thread)
 
+    def _handshake(self, conn):
+        """
+        Do the TLS handshake of an accepted socket.
+
+        The handshake as a whole must finish within the handshake timeout,
+        however slowly the client sends its part of it.
+
+        :param conn: the accepted socket
+        :return: the TLS socket, or None if the handshake failed
+        """
+        started = time.perf_counter()
+        deadline = started + self._handshake_timeout
+        try:
+            conn = self._context.wrap_socket(
+                conn, server_side=True, do_handshake_on_connect=False)
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise timeout("TLS handshake timed out")
+                conn.settimeout(remaining)
+                try:
+                    conn.do_handshake()
+                    break
+                except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                    pass
+        except OSError as e:
+            self._handshake_metrics.record(time.perf_counter() - started, e)
+            self._log.error("TLS handshake failed: %s" % e)
+            conn.close()
+            return None
+        self._handshake_metrics.record(time.perf_counter() - started)
+        conn.settimeout(None)
+        return conn
+
+    def _serve(self, conn, addr):
+        """
+        Pass a connection to the callback and close it when it returns.
+
+        :param conn: the accepted socket of a client
+        :param addr: the address of the client
+        """
+        conn = self._handshake(conn)
+        if conn is None:
+            return
+        connection = Connection(addr[0], addr[1], connection=conn)
+        self._connections.add(connection)
+        try:
+            self._function(connection)
+        finally:
+            self._connections.discard(connection)
+            if connection.is_open:
+                connection.close()
+            else:
+                conn.close()
+
     def stop(self):
         """Stop connection handler and join all threads."""
         self._stop_flag = True
+        for connection in list(self._connections):
+            if connection.is_open:
+                connection.close()
         for thread in self._threads:
             thread.join()
         self._socket.close()
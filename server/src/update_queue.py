@@ -0,0 +1,119 @@
+"""Updates waiting to be sent to a player."""
+import threading
+
+
+class UpdateQueue:
+    """
+    The updates waiting to be sent to one player.
+
+    Updates are kept until the player asks for them with CheckForUpdates.
+    Once the player subscribes, updates are instead pushed to them as soon
+    as they are put, and nothing is kept. If a push fails the subscription
+    ends, and the updates are kept for the player to fetch or be sent when
+    they subscribe again.
+
+    Pushes are made without holding the lock, by one thread at a time:
+    updates put while a push is being made are pushed by the thread
+    making it, once it is done, so put never waits on another player's
+    push.
+    """
+
+    def __init__(self):
+        """Create a new empty UpdateQueue object."""
+        self._lock = threading.Lock()
+        self._updates = []
+        self._subscriber = None
+        self._pushing = False
+
+    @property
+    def subscribed(self):
+        """
+        Getter for whether updates are being pushed to the player.
+
+        :return: a boolean
+        """
+        with self._lock:
+            return self._subscriber is not None
+
+    def put(self, update):
+        """
+        Push an update to the subscriber, or keep it if there is none.
+
+        :param update: the update object
+        """
+        with self._lock:
+            self._updates.append(update)
+            if self._subscriber is None or self._pushing:
+                return
+            self._pushing = True
+        self._push_waiting()
+
+    def empty(self):
+        """
+        Check if no updates are waiting.
+
+        :return: a boolean
+        """
+        with self._lock:
+            return not self._updates
+
+    def drain(self):
+        """
+        Take every update waiting.
+
+        :return: a list of updates, oldest first
+        """
+        with self._lock:
+            updates, self._updates = self._updates, []
+        return updates
+
+    def subscribe(self, subscriber):
+        """
+        Push updates to a subscriber from now on.
+
+        The updates waiting are pushed straight away.
+
+        :param subscriber: function called with a list of updates, returning
+            False if they could not be sent
+        :return: False if the waiting updates could not be sent, in which
+            case the subscriber is not kept
+        """
+        with self._lock:
+            self._subscriber = subscriber
+            if self._pushing:
+                return True
+            self._pushing = True
+        self._push_waiting()
+        with self._lock:
+            return self._subscriber is subscriber
+
+    def unsubscribe(self):
+        """Stop pushing updates, keeping them instead."""
+        with self._lock:
+            self._subscriber = None
+
+    def _push_waiting(self):
+        """
+        Push the waiting updates until none are left or a push fails.
+
+        Called by the one thread which set _pushing.
+        """
+        while True:
+            with self._lock:
+                updates, subscriber = self._updates, self._subscriber
+                if not updates or subscriber is None:
+                    self._pushing = False
+                    return
+                self._updates = []
+            pushed = False
+            try:
+                pushed = subscriber(updates)
+            finally:
+                if not pushed:
+                    with self._lock:
+                        self._updates = updates + self._updates
+                        if self._subscriber is subscriber:
+                            self._subscriber = None
+                        self._pushing = False
+            if not pushed:
+                return
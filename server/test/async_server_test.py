@@ -0,0 +1,186 @@
+"""async_server unit testing."""
+
+import logging
+import os
+import queue
+import socket
+import ssl
+import threading
+import time
+import unittest
+from async_server import AsyncConnectionHandler
+from update_queue import UpdateQueue
+from connections import Connection, FrameReader, NetworkException, \
+    REQUEST, write_frame
+
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                      "config")
+
+
+def server_context():
+    """Create a TLS context with the server test certificate."""
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(os.path.join(CONFIG, "cert.pem"),
+                            os.path.join(CONFIG, "key.pem"))
+    return context
+
+
+def client_socket(port):
+    """Open a TLS socket to the handler, not checking its certificate."""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    sock = context.wrap_socket(socket.socket())
+    sock.connect(("127.0.0.1", port))
+    return sock
+
+
+class LocalConnection(Connection):
+    """A client Connection to a handler on this machine."""
+
+    def __init__(self, port):
+        """Create a connection to a port on this machine."""
+        super().__init__("127.0.0.1", port)
+
+    def _new_socket(self):
+        """Open a TLS socket to the handler."""
+        return client_socket(self._port)
+
+
+class AsyncConnectionHandlerTest(unittest.TestCase):
+    """Unittest class for AsyncConnectionHandler."""
+
+    def start(self, function, **limits):
+        """Start a handler on any free port."""
+        handler = AsyncConnectionHandler(
+            function, logging.getLogger("async_server_test"),
+            ip="127.0.0.1", context=server_context(), **limits)
+        handler.start(0)
+        self.addCleanup(handler.stop)
+        return handler
+
+    def test_requests_reach_callback(self):
+        """Test many clients are answered from one loop."""
+        handler = self.start(lambda payload, push: payload[::-1])
+        connections = [LocalConnection(handler.port) for i in range(4)]
+        replies = []
+
+        def ask(connection, i):
+            for j in range(5):
+                replies.append(
+                    connection.request(b"%i %i" % (i, j), 5) ==
+                    b"%i %i" % (j, i))
+
+        threads = [threading.Thread(target=ask, args=(connection, i))
+                   for i, connection in enumerate(connections)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(replies, [True] * 20)
+        self.assertEqual(handler.connection_count, 4)
+        for connection in connections:
+            connection.close()
+
+    def test_connection_limit(self):
+        """Test connections past the limit are closed."""
+        handler = self.start(lambda payload, push: payload, max_connections=1)
+        first = LocalConnection(handler.port)
+        self.assertEqual(first.request(b"first", 5), b"first")
+        second = LocalConnection(handler.port)
+        with self.assertRaises((OSError, NetworkException)):
+            second.request(b"second", 5)
+        first.close()
+
+    def test_pipelined_requests_are_limited(self):
+        """Test a connection has no more than max_pipelined requests run."""
+        release = threading.Event()
+        started = []
+
+        def slow(payload, push):
+            started.append(payload)
+            release.wait(5)
+            return payload
+
+        handler = self.start(slow, max_pipelined=2, workers=4)
+        sock = client_socket(handler.port)
+        for request_id in range(5):
+            write_frame(sock, REQUEST, request_id, b"%i" % request_id)
+        time.sleep(0.2)
+        self.assertEqual(len(started), 2)
+        release.set()
+        reader = FrameReader(sock)
+        replies = sorted(reader.read_frame()[2] for i in range(5))
+        self.assertEqual(replies, list(range(5)))
+        sock.close()
+
+    def test_stalled_handshake_does_not_block_accept(self):
+        """Test a client that never handshakes holds up no one else."""
+        handler = self.start(lambda payload, push: payload,
+                             handshake_timeout=0.5)
+        stalled = socket.create_connection(("127.0.0.1", handler.port))
+        connection = LocalConnection(handler.port)
+        self.assertEqual(connection.request(b"hello", 5), b"hello")
+        self.assertEqual(handler.handshake_metrics.failures, 0)
+        self.assertEqual(stalled.recv(1), b"")
+        stalled.close()
+        metrics = handler.handshake_metrics
+        while metrics.count < 2:
+            time.sleep(0.01)
+        self.assertEqual((metrics.count, metrics.failures, metrics.timeouts),
+                         (2, 1, 1))
+        connection.close()
+
+    def test_updates_are_pushed(self):
+        """Test push sends updates to the client from any thread."""
+        pushes = []
+
+        def subscribe(payload, push):
+            pushes.append(push)
+            return b"subscribed"
+
+        handler = self.start(subscribe)
+        connection = LocalConnection(handler.port)
+        updates = queue.Queue()
+        connection.update_handler = updates.put
+        self.assertEqual(connection.request(b"subscribe", 5), b"subscribed")
+        self.assertTrue(pushes[0](b"first"))
+        thread = threading.Thread(target=pushes[0], args=(b"second",))
+        thread.start()
+        thread.join()
+        self.assertEqual([updates.get(timeout=5), updates.get(timeout=5)],
+                         [b"first", b"second"])
+        connection.close()
+        while handler.connection_count:
+            time.sleep(0.01)
+        self.assertFalse(pushes[0](b"closed"))
+
+    def test_queue_keeps_update_not_pushed(self):
+        """Test an update pushed after the connection closed is kept."""
+        updates = UpdateQueue()
+
+        def subscribe(payload, push):
+            updates.subscribe(push)
+            return b"subscribed"
+
+        handler = self.start(subscribe)
+        connection = LocalConnection(handler.port)
+        self.assertEqual(connection.request(b"subscribe", 5), b"subscribed")
+        connection.close()
+        while handler.connection_count:
+            time.sleep(0.01)
+        updates.put(b"closed")
+        self.assertFalse(updates.subscribed)
+        self.assertEqual(updates.drain(), [b"closed"])
+
+    def test_oversized_request_closes_connection(self):
+        """Test a request larger than max_frame is refused."""
+        handler = self.start(lambda payload, push: payload, max_frame=16)
+        connection = LocalConnection(handler.port)
+        self.assertEqual(connection.request(b"small", 5), b"small")
+        with self.assertRaises(NetworkException):
+            connection.request(bytes(17), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
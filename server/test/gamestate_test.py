@@ -0,0 +1,59 @@
+"""gamestate unit testing."""
+
+import logging
+import unittest
+from action import TileUpdates
+from civilisation import Civilisation
+from gamestate import GameState
+from hexgrid import Grid
+from unit import Archer, Worker
+from update_queue import UpdateQueue
+
+
+def make_game():
+    """Create a game of two civilisations, each with one unit."""
+    log = logging.getLogger("gamestate_test")
+    grid = Grid(20)
+    grid.create_grid()
+    game = GameState(1, 0, grid, log, None)
+    units = []
+    for civ_id, unit_type, coords in [(1, Archer, (0, 0, 0)),
+                                      (2, Worker, (2, -1, -1))]:
+        civ = Civilisation(civ_id, grid, log)
+        game.add_civ(civ)
+        tile = grid.get_hextile(coords)
+        unit = unit_type(civ_id, 1, tile, civ_id)
+        unit.actions = 1
+        tile.unit = unit
+        civ.units[unit.id] = unit
+        units.append(unit)
+        game._queues[civ_id] = UpdateQueue()
+    game.populate_queues([tile])
+    for queue in game._queues.values():
+        queue.drain()
+    return game, units
+
+
+class GameStateTest(unittest.TestCase):
+    """Unittest class for GameState."""
+
+    def test_combat_sends_changed_tiles(self):
+        """Test the tile a unit is killed on is sent as changed."""
+        game, (archer, worker) = make_game()
+        worker.receive_damage(worker.health - 1)
+        game.get_civ(1).attack_unit(archer, worker)
+        self.assertEqual(worker.health, 0)
+        game.populate_queues([archer, worker])
+        updates = game._queues[1].drain()
+        tiles = [tile for update in updates
+                 if isinstance(update, TileUpdates)
+                 for tile in update._tiles]
+        self.assertIn(worker.position, tiles)
+        self.assertIsNone(tiles[tiles.index(worker.position)].unit)
+        game.populate_queues([archer, worker])
+        self.assertFalse([update for update in game._queues[1].drain()
+                          if isinstance(update, TileUpdates)])
+
+
+if __name__ == '__main__':
+    unittest.main()
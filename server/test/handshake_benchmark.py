@@ -0,0 +1,74 @@
+"""Measure accept latency while many clients are connecting at once."""
+
+import logging
+import os
+import socket
+import threading
+import time
+from async_server import AsyncConnectionHandler
+from server_connection_handler import ConnectionHandler, server_context
+from async_server_test import CONFIG, LocalConnection
+from server_connection_handler_test import echo
+
+CLIENTS = [0, 100, 300]
+
+
+def config():
+    """Get a server config using the test certificate."""
+    return {"server": {"ip_address": "127.0.0.1"},
+            "paths": {"cert": os.path.join(CONFIG, "cert.pem"),
+                      "key": os.path.join(CONFIG, "key.pem")}}
+
+
+def latency(port):
+    """
+    Time one client connecting and getting a reply.
+
+    :return: the seconds taken
+    """
+    started = time.perf_counter()
+    connection = LocalConnection(port)
+    connection.request(b"ping", 30)
+    elapsed = time.perf_counter() - started
+    if connection.is_open:
+        connection.close()
+    return elapsed
+
+
+def measure(name, handler):
+    """Print accept latency behind stalled and concurrent clients."""
+    handler.start(0)
+    port = handler.port
+    for clients in CLIENTS:
+        stalled = [socket.create_connection(("127.0.0.1", port))
+                   for i in range(clients)]
+        behind_stalled = latency(port)
+        for sock in stalled:
+            sock.close()
+        times = []
+        threads = [threading.Thread(target=lambda: times.append(latency(port)))
+                   for i in range(clients or 1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print("%-8s %3i clients  behind stalled: %7.1f ms  "
+              "concurrent: mean %7.1f ms  max %7.1f ms"
+              % (name, clients, behind_stalled * 1000,
+                 sum(times) / len(times) * 1000, max(times) * 1000))
+    print("%-8s %s" % (name, handler.handshake_metrics))
+    handler.stop()
+
+
+def main():
+    """Measure both connection handlers."""
+    log = logging.getLogger("handshake_benchmark")
+    log.setLevel(logging.CRITICAL)
+    measure("threads", ConnectionHandler(echo, log, 10.0, config()))
+    measure("asyncio", AsyncConnectionHandler(
+        lambda payload, push: payload, log, ip="127.0.0.1",
+        context=server_context(config()), handshake_timeout=10.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""server_connection_handler unit testing."""
+
+import logging
+import os
+import socket
+import ssl
+import time
+import unittest
+from connections import NetworkException
+from server_connection_handler import ConnectionHandler, HandshakeMetrics
+from async_server_test import CONFIG, LocalConnection
+
+
+def echo(connection):
+    """Reply to every request with its payload."""
+    try:
+        while True:
+            request_id, payload = connection.recv_frame()
+            connection.send_frame(request_id, payload)
+    except (OSError, NetworkException):
+        pass
+
+
+class ConnectionHandlerTest(unittest.TestCase):
+    """Unittest class for ConnectionHandler."""
+
+    def start(self, handshake_timeout):
+        """Start a handler on any free port."""
+        config = {"server": {"ip_address": "127.0.0.1"},
+                  "paths": {"cert": os.path.join(CONFIG, "cert.pem"),
+                            "key": os.path.join(CONFIG, "key.pem")}}
+        handler = ConnectionHandler(echo,
+                                    logging.getLogger("handler_test"),
+                                    handshake_timeout, config)
+        handler.start(0)
+        self.addCleanup(handler.stop)
+        return handler
+
+    def test_stalled_handshake_does_not_block_accept(self):
+        """Test a client that never handshakes holds up no one else."""
+        handler = self.start(0.5)
+        stalled = socket.create_connection(("127.0.0.1", handler.port))
+        connection = LocalConnection(handler.port)
+        self.assertEqual(connection.request(b"hello", 5), b"hello")
+        self.assertEqual(handler.handshake_metrics.failures, 0)
+        connection.close()
+        self.assertEqual(stalled.recv(1), b"")
+        stalled.close()
+        metrics = handler.handshake_metrics
+        while metrics.count < 2:
+            time.sleep(0.01)
+        self.assertEqual((metrics.count, metrics.failures, metrics.timeouts),
+                         (2, 1, 1))
+        self.assertGreaterEqual(metrics.longest_duration, 0.5)
+
+    def test_slow_handshake_times_out(self):
+        """Test a client sending its handshake a byte at a time is cut off."""
+        handler = self.start(0.5)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        outgoing = ssl.MemoryBIO()
+        client = context.wrap_bio(ssl.MemoryBIO(), outgoing,
+                                  server_hostname="localhost")
+        with self.assertRaises(ssl.SSLWantReadError):
+            client.do_handshake()
+        hello = outgoing.read()
+        dripping = socket.create_connection(("127.0.0.1", handler.port))
+        dripping.settimeout(0.2)
+        started = time.perf_counter()
+        for i in range(len(hello)):
+            try:
+                dripping.sendall(hello[i:i + 1])
+                if dripping.recv(1) == b"":
+                    break
+            except socket.timeout:
+                pass
+            except OSError:
+                break
+        dripping.close()
+        self.assertLess(time.perf_counter() - started, 2)
+        metrics = handler.handshake_metrics
+        while metrics.count < 1:
+            time.sleep(0.01)
+        self.assertEqual((metrics.count, metrics.failures, metrics.timeouts),
+                         (1, 1, 1))
+
+    def test_handshake_metrics(self):
+        """Test handshakes are counted and timed."""
+        metrics = HandshakeMetrics()
+        metrics.record(0.25)
+        metrics.record(0.75, ssl.SSLError())
+        metrics.record(1.0, socket.timeout())
+        self.assertEqual((metrics.count, metrics.failures, metrics.timeouts),
+                         (3, 2, 1))
+        self.assertAlmostEqual(metrics.mean_duration, 2 / 3)
+        self.assertEqual(metrics.longest_duration, 1.0)
+        self.assertEqual(str(metrics), "3 handshakes, 2 failed, 1 timed out, "
+                         "mean 666.7 ms, longest 1000.0 ms")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""update_queue unit testing."""
+
+import threading
+import unittest
+from update_queue import UpdateQueue
+
+
+class UpdateQueueTest(unittest.TestCase):
+    """Unittest class for UpdateQueue."""
+
+    def test_updates_are_kept_until_drained(self):
+        """Test updates put without a subscriber are kept in order."""
+        queue = UpdateQueue()
+        self.assertTrue(queue.empty())
+        queue.put(1)
+        queue.put(2)
+        self.assertFalse(queue.empty())
+        self.assertEqual(queue.drain(), [1, 2])
+        self.assertEqual(queue.drain(), [])
+
+    def test_subscriber_is_pushed_updates(self):
+        """Test waiting and later updates are pushed to a subscriber."""
+        queue = UpdateQueue()
+        queue.put(1)
+        pushed = []
+        self.assertTrue(queue.subscribe(
+            lambda updates: pushed.append(list(updates)) is None))
+        queue.put(2)
+        queue.put(3)
+        self.assertEqual(pushed, [[1], [2], [3]])
+        self.assertTrue(queue.empty())
+        queue.unsubscribe()
+        queue.put(4)
+        self.assertEqual(queue.drain(), [4])
+
+    def test_failed_push_ends_subscription(self):
+        """Test an update that cannot be pushed is kept."""
+        queue = UpdateQueue()
+        open_connection = [True]
+        queue.subscribe(lambda updates: open_connection[0])
+        queue.put(1)
+        open_connection[0] = False
+        queue.put(2)
+        self.assertFalse(queue.subscribed)
+        queue.put(3)
+        self.assertFalse(queue.subscribe(lambda updates: False))
+        self.assertEqual(queue.drain(), [2, 3])
+
+    def test_put_does_not_wait_for_a_push(self):
+        """Test updates put during a slow push are pushed after it."""
+        queue = UpdateQueue()
+        started = threading.Event()
+        release = threading.Event()
+        pushed = []
+
+        def slow(updates):
+            started.set()
+            release.wait(5)
+            pushed.append(list(updates))
+            return True
+
+        queue.subscribe(slow)
+        pushing = threading.Thread(target=queue.put, args=(1,))
+        pushing.start()
+        started.wait(5)
+        queue.put(2)
+        self.assertTrue(queue.subscribed)
+        self.assertEqual(pushed, [])
+        release.set()
+        pushing.join()
+        self.assertEqual(pushed, [[1], [2]])
+        self.assertTrue(queue.empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
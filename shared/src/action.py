@@ -1,5 +1,7 @@
 """Module to represent a variety of specific game actions."""
 
+import wire
+
 GAME_FULL_ERROR = 0
 VALIDATION_ERROR = 1
 DATABASE_ERROR = 2
@@ -59,6 +61,30 @@ class CheckForUpdates():
         return "<CheckForUpdates>"
 
 
+class SubscribeAction():
+    """An action to have updates pushed as they happen."""
+
+    def __init__(self):
+        """Initialise a new subscribe action."""
+        pass
+
+    def __str__(self):
+        """Return a String representation of a SubscribeAction object."""
+        return "<SubscribeAction>"
+
+
+class FetchMapAction():
+    """An action to fetch a snapshot of the map."""
+
+    def __init__(self):
+        """Initialise a new fetch map action."""
+        pass
+
+    def __str__(self):
+        """Return a String representation of a FetchMapAction object."""
+        return "<FetchMapAction>"
+
+
 class EndTurnAction():
     """An action to end a turn."""
 
@@ -232,12 +258,25 @@ class ResearchAction():
 
 
 class TileUpdates():
-    """A list of tiles that need to be updated."""
+    """
+    A list of tiles that need to be updated.
+
+    Tiles are pickled in the compact form of the wire module and come out
+    as detached Hex objects.
+    """
 
     def __init__(self, tiles):
         """Initialise a new title update object."""
         self._tiles = tiles
 
+    def __getstate__(self):
+        """Get the state to pickle, the wire form of every tile."""
+        return (wire.encode_tiles(self._tiles),)
+
+    def __setstate__(self, state):
+        """Restore the tiles from their wire form."""
+        self._tiles = wire.decode_tiles(state[0])
+
     def __str__(self):
         """Return a String representation of a TileUpdates object."""
         return "<TileUpdates>"
@@ -17,6 +17,8 @@ class BuildingType(Enum):
 class Building():
     """A single resource-producing building."""
 
+    __slots__ = ('_id', '_location', '_type', '_city_id', '_civ_id')
+
     def __init__(self, identifier, building_type, hexagon, civilisation_id,
                  city_id):
         """
@@ -39,7 +41,7 @@ class Building():
     @property
     def id(self):
         """Return unique id."""
-        return self._identifier
+        return self._id
 
     @property
     def civ_id(self):
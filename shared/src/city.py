@@ -7,17 +7,19 @@ from building import BuildingType
 class City():
     """A city which claims some of it's neighbouring tiles."""
 
+    __slots__ = ('_hex', '_tiles', '_type', '_id', '_civ_id', '_buildings')
+
     RANGE = 3
 
     def __init__(self, identifier, hexagon, civ_id):
         """Instantiate new City object."""
         self._hex = hexagon
-        hexagon.building = self
         self._tiles = []
         self._type = BuildingType.CITY
         self._id = identifier
         self._civ_id = civ_id
         self._buildings = {}
+        hexagon.building = self
 
     def __repr__(self):
         """Return string representation of City."""
@@ -11,6 +11,12 @@ from mapresource import ResourceType
 class Civilisation(object):
     """Civilisation class."""
 
+    # Vision radius, in tiles, of every unit, city and building. Units of
+    # all types and levels see equally far.
+    UNIT_VISION = 3
+    CITY_VISION = 3
+    BUILDING_VISION = 2
+
     def __init__(self, identifier, grid, logger):
         """
         Initialise Civilisation attributes.
@@ -28,6 +34,8 @@ class Civilisation(object):
         self._tree = ResearchTree(self)
         self._logger = logger
         self._vision = {}
+        self._vision_counts = {}
+        self._vision_sources = {}
 
     def __repr__(self):
         """Return string representation of Civilisation."""
@@ -323,9 +331,9 @@ class Civilisation(object):
 
     def destroy_building(self, tile):
         """Remove references for buildings."""
-        tile._building = None
-        tile._city_id = None
-        tile._civ_id = None
+        tile.building = None
+        tile.city_id = None
+        tile.civ_id = None
 
     def destroy_city(self, tile):
         """Remove all references for the city and its buildings."""
@@ -334,7 +342,7 @@ class Civilisation(object):
             if city_tile.city_id == tile.city_id:
                 self.destroy_building(city_tile)
             if city_tile.terrain.resource is not None:
-                city_tile.terrain.resource.stop_work()
+                city_tile.resource_worked = False
         self.destroy_building(tile)
         return city_tiles
 
@@ -350,10 +358,7 @@ class Civilisation(object):
 
     def movement_cost_of_path(self, path):
         """Calculate movement cost of list of hex tiles."""
-        movement_cost = 0
-        for hex in path:
-            movement_cost += hex.terrain.calculate_movement_cost()
-        return movement_cost
+        return self._grid.path_cost(path)
 
     def attack_unit(self, soldier, enemy):
         """
@@ -466,24 +471,95 @@ class Civilisation(object):
         return currency
 
     def calculate_vision(self):
-        """Determine the tiles visible to the civilisation."""
-        vision = set()
-        self._vision = {}
+        """
+        Determine the tiles visible to the civilisation.
+
+        Every unit, city and building is a vision source. Only sources which
+        have appeared, moved or disappeared since the last call, or whose
+        surroundings have changed terrain, are looked at again.
+
+        :return: a tuple (visible, hidden) of lists of hex objects which
+            became visible and stopped being visible since the last call
+        """
+        sources = {}
         for unit_id in self._units:
             unit = self._units[unit_id]
-            vision_range = 3  # TODO: Replace with unit vision range
-            tile = unit.position
-            unit_vision = self._grid.vision(tile, vision_range)
-            vision |= set(unit_vision)
-
+            sources[("unit", unit_id)] = (unit.position,
+                                          Civilisation.UNIT_VISION)
         for city_id in self.cities:
             city = self.cities[city_id]
             buildings = city.buildings
-            vision |= set(self._grid.vision(city.position, 3))
+            sources[("city", city_id)] = (city.position,
+                                          Civilisation.CITY_VISION)
             for building in buildings:
-                vision_range = 2
-                tile = buildings[building].position
-                building_vision = self._grid.vision(tile, vision_range)
-                vision |= set(building_vision)
-        for tile in vision:
-            self._vision[tile] = tile
+                sources[("building", building)] = \
+                    (buildings[building].position,
+                     Civilisation.BUILDING_VISION)
+        changed = {}
+        for key in list(self._vision_sources):
+            if key not in sources:
+                self._move_vision_source(key, None, 0, changed)
+        for key in sources:
+            tile, vision_range = sources[key]
+            self._move_vision_source(key, tile, vision_range, changed)
+        return self._vision_delta(changed)
+
+    def _move_vision_source(self, key, tile, vision_range, changed):
+        """
+        Replace the footprint of a vision source, diffing old against new.
+
+        :param key: hashable key naming the source
+        :param tile: hex object the source sees from, None to remove it
+        :param vision_range: the radius the source can see
+        :param changed: dictionary of tile index to whether it was visible
+            before the first change made to it, added to for each tile
+            whose count changes
+        """
+        old = self._vision_sources.get(key)
+        if tile is None:
+            if old is None:
+                return
+            del self._vision_sources[key]
+            footprint = ()
+        else:
+            centre = self._grid.hex_index(tile)
+            state = (centre, vision_range, self._grid.terrain_epoch)
+            if old is not None and old[0] == state:
+                return
+            footprint = self._grid.vision_indices(centre, vision_range)
+            self._vision_sources[key] = (state, footprint)
+        old_footprint = old[1] if old is not None else ()
+        counts = self._vision_counts
+        grid = self._grid
+        for index in set(old_footprint).difference(footprint):
+            changed.setdefault(index, True)
+            counts[index] -= 1
+            if counts[index] == 0:
+                del counts[index]
+                del self._vision[grid.hex_at(index)]
+        for index in set(footprint).difference(old_footprint):
+            changed.setdefault(index, index in counts)
+            if index in counts:
+                counts[index] += 1
+            else:
+                counts[index] = 1
+                tile = grid.hex_at(index)
+                self._vision[tile] = tile
+
+    def _vision_delta(self, changed):
+        """
+        Split changed tiles into those which became visible and hidden.
+
+        :param changed: dictionary of tile index to whether it was visible
+            before it changed
+        :return: a tuple (visible, hidden) of lists of hex objects
+        """
+        visible = []
+        hidden = []
+        for index in changed:
+            now = index in self._vision_counts
+            if now and not changed[index]:
+                visible.append(self._grid.hex_at(index))
+            elif changed[index] and not now:
+                hidden.append(self._grid.hex_at(index))
+        return (visible, hidden)
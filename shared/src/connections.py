@@ -1,16 +1,49 @@
 """Network API."""
-from socket import socket, gethostbyname, AF_INET, SOCK_STREAM
+from socket import socket, gethostbyname, AF_INET, SOCK_STREAM, \
+    SHUT_RDWR
+import itertools
 import ssl
 import os
 import json
+import logging
+import struct
+import threading
+import time
 from message import Message
 from action import UpgradeAction
 from unit import Worker
 from hexgrid import Hex
 
 
+# Every frame starts with this header: the payload length, the frame
+# type, flags and the request id, big endian.
+FRAME_HEADER = struct.Struct("!IBBI")
+
+# Frame types. An UPDATE is sent by the server without being asked for,
+# once the client has subscribed to updates.
+REQUEST = 0
+REPLY = 1
+UPDATE = 2
+
+# Payloads up to this size are sent in the same write as their header.
+COALESCE_LIMIT = 16384
+
+# Frames larger than this are refused, rather than trusting the length of
+# a header enough to allocate it.
+MAX_FRAME = 1 << 24
+
+
 class Connection:
-    """Class the represent a TCP connection."""
+    """
+    Class the represent a TCP connection.
+
+    A client Connection is a keep-alive session: request sends a payload
+    tagged with a new request id and waits for the reply carrying the same
+    id, so many requests, from many threads, share one socket. A reader
+    thread hands replies to their requests as they arrive, and updates
+    pushed by the other party to the update handler. If the socket fails,
+    the next request opens a new one.
+    """
 
     def __init__(self, host, port, connection=None):
         """
@@ -20,24 +53,65 @@ class Connection:
         :param port: port number of other party
         :param connection: default new connection, can be passed existing tcp
         """
-        with open(os.path.join("..", "config", "config.json")) as config_file:
-            self._config = json.load(config_file)
         self._host = gethostbyname(host)
         self._port = port
+        self._write_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        self._reader = None
+        self._config = None
+        self._context = None
+        self._close_lock = threading.Lock()
+        self._reads_replies = False
+        self._update_handler = None
+        self._session = 0
         if connection is None:
-            self._context = ssl.SSLContext(ssl.PROTOCOL_TLS)
-            self._context.verify_mode = ssl.CERT_REQUIRED
-            self._context.check_hostname = True
-            self._context.load_verify_locations(
-                self._config["paths"]["ca-bundle"])
-            self._socket = self._context.wrap_socket(
-                socket(AF_INET, SOCK_STREAM),
-                server_hostname=self._config["server"]["hostname"])
+            self._socket = None
             self._open_status = False
         else:
             self._socket = connection
             self._open_status = True
 
+    @property
+    def is_open(self):
+        """
+        Getter for whether the connection is open.
+
+        :return: a boolean
+        """
+        return self._open_status
+
+    @property
+    def session(self):
+        """
+        Getter for the number of sockets opened by this connection.
+
+        A subscription made by the other party lasts only as long as the
+        socket it was made on, so it needs making again once this changes.
+
+        :return: an int
+        """
+        return self._session
+
+    @property
+    def update_handler(self):
+        """
+        Getter for the function called with the payload of every update.
+
+        :return: a function, or None
+        """
+        return self._update_handler
+
+    @update_handler.setter
+    def update_handler(self, handler):
+        """
+        Setter for the function called with the payload of every update.
+
+        It is called on the reader thread, so must not wait for a reply.
+        """
+        self._update_handler = handler
+
     def send(self, message, wait_response=False):
         """
         Send message to other party over TCP.
@@ -46,64 +120,375 @@ class Connection:
         :param wait_response: (bool) default False, set True to return response
         :return: response to message else None
         """
-        if self._open_status:
-            try:
-                msglen = "{:16}".format(len(message))  # create padded string
-                message = msglen.encode() + message  # add the message length
-                self._socket.sendall(message)  # send encoded message
-                if wait_response:
-                    return self.recv()  # recv message in response
-                return None
-            except Exception:
-                raise
-        else:
-            raise NetworkException("Connection currently closed.")
+        self.send_frame(0, message, REQUEST)
+        if wait_response:
+            return self.recv()  # recv message in response
+        return None
 
     def recv(self):
         """
-        Send message to other party over TCP.
+        Receive a message from the other party over TCP.
 
-        :return: response to message else None
+        :return: the payload of the next frame
         """
-        if self._open_status:
+        return self.recv_frame()[1]
+
+    def send_frame(self, request_id, payload, frame_type=REPLY, flags=0,
+                   timeout=None):
+        """
+        Send one frame to the other party.
+
+        :param request_id: int id of the request the frame belongs to
+        :param payload: bytes-like object to send
+        :param frame_type: REQUEST, REPLY or UPDATE
+        :param flags: int flags of the frame
+        :param timeout: seconds the frame may take to send, None to wait
+            forever. A frame not sent in time shuts the connection down,
+            as the other party is no longer reading it.
+        """
+        if not self._open_status:
+            raise NetworkException("Connection currently closed.")
+        if timeout is None:
+            with self._write_lock:
+                write_frame(self._socket, frame_type, request_id, payload,
+                            flags)
+            return
+        deadline = time.monotonic() + timeout
+        sock = self._socket
+        if not self._write_lock.acquire(timeout=timeout):
+            self._disconnected(sock, close=False)
+            raise NetworkException("Timed out waiting to send.")
+        try:
+            watchdog = threading.Timer(max(deadline - time.monotonic(), 0),
+                                       self._disconnected, (sock, False))
+            watchdog.start()
             try:
-                amount_expected = int(self._socket.recv(16).decode())
-                amount_received = 0
-                message = b""
-                while amount_received < amount_expected:
-                    data = self._socket.recv(16)  # get 16 bytes
-                    message += data
-                    amount_received += len(data)
-                return message
-            except Exception:
-                raise
-        else:
+                write_frame(sock, frame_type, request_id, payload, flags)
+            finally:
+                watchdog.cancel()
+        finally:
+            self._write_lock.release()
+
+    def recv_frame(self):
+        """
+        Receive one frame from the other party.
+
+        :return: a tuple (request_id, payload), payload a bytearray
+        """
+        if not self._open_status:
             raise NetworkException("Connection currently closed.")
+        if self._reader is None:
+            self._reader = FrameReader(self._socket)
+        frame_type, flags, request_id, payload = self._reader.read_frame()
+        return (request_id, payload)
+
+    def request(self, payload, timeout=None):
+        """
+        Send a request and wait for its reply, reconnecting if needed.
+
+        A request that cannot be sent because the connection has failed,
+        or could not be opened, is sent again once, on a new connection.
+        A request that was sent is never repeated, as the other party may
+        have acted on it.
+
+        :param payload: bytes to send
+        :param timeout: seconds to wait for the reply, None to wait forever
+        :return: the payload of the reply
+        """
+        for attempt in range(2):
+            reply = _Reply()
+            sock = None
+            with self._write_lock:
+                request_id = next(self._request_ids)
+                with self._pending_lock:
+                    self._pending[request_id] = reply
+                try:
+                    if self._open_status:
+                        sock = self._socket
+                    else:
+                        sock = self._connect()
+                    if sock is None or self._socket is not sock:
+                        raise NetworkException("Connection lost.")
+                    write_frame(sock, REQUEST, request_id, payload)
+                except (OSError, NetworkException) as error:
+                    with self._pending_lock:
+                        self._pending.pop(request_id, None)
+                    if attempt:
+                        raise NetworkException(
+                            "Could not send request: %s" % error)
+                else:
+                    break
+            if sock is not None:
+                self._disconnected(sock, close=False)
+        if not reply.wait(timeout):
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise NetworkException("No reply to request %i." % request_id)
+        return reply.result()
 
     def open(self):
         """Open tcp connection with other party."""
-        if not self._open_status:
-            try:
-                self._socket.connect((self._host, self._port))
-                self._open_status = True
-            except Exception:
-                raise
-        else:
+        if self._open_status:
             raise NetworkException("Connection is already open.")
+        with self._write_lock:
+            self._connect()
 
     def close(self):
         """Close tcp connection."""
-        if self._open_status:
+        if not self._open_status:
+            raise NetworkException("Connection currently closed.")
+        self._disconnected(self._socket, close=not self._reads_replies)
+
+    def _new_socket(self):
+        """
+        Open a new socket to the other party.
+
+        :return: a connected TLS socket
+        """
+        if self._context is None:
+            with open(os.path.join("..", "config", "config.json")) \
+                    as config_file:
+                self._config = json.load(config_file)
+            self._context = ssl.SSLContext(ssl.PROTOCOL_TLS)
+            self._context.verify_mode = ssl.CERT_REQUIRED
+            self._context.check_hostname = True
+            self._context.load_verify_locations(
+                self._config["paths"]["ca-bundle"])
+        sock = self._context.wrap_socket(
+            socket(AF_INET, SOCK_STREAM),
+            server_hostname=self._config["server"]["hostname"])
+        sock.connect((self._host, self._port))
+        return sock
+
+    def _connect(self):
+        """
+        Open a new socket and start reading replies from it.
+
+        :return: the new socket
+        """
+        sock = self._new_socket()
+        self._socket = sock
+        self._reads_replies = True
+        self._session += 1
+        self._open_status = True
+        threading.Thread(name="replies", target=self._read_replies,
+                         args=(sock,), daemon=True).start()
+        return sock
+
+    def _read_replies(self, sock):
+        """
+        Hand every reply read from a socket to its waiting request.
+
+        Updates are passed to the update handler instead. An error raised
+        by the update handler is logged, and replies are still read.
+
+        :param sock: the socket to read from until it fails
+        """
+        reader = FrameReader(sock)
+        try:
+            while True:
+                frame_type, flags, request_id, payload = reader.read_frame()
+                if frame_type == UPDATE and self._update_handler is not None:
+                    try:
+                        self._update_handler(payload)
+                    except Exception:
+                        logging.getLogger(__name__).exception(
+                            "Update handler failed.")
+                if frame_type != REPLY:
+                    continue
+                with self._pending_lock:
+                    reply = self._pending.pop(request_id, None)
+                if reply is not None:
+                    reply.set(payload)
+        except (OSError, ValueError, NetworkException):
+            pass
+        finally:
+            self._disconnected(sock)
+
+    def _disconnected(self, sock, close=True):
+        """
+        Shut down a socket and fail the requests waiting on it.
+
+        :param sock: the socket that failed or is being closed
+        :param close: whether to close the socket as well. A socket with a
+            reader thread is only closed by that thread: closed from another
+            thread, the reader could go on to read whatever new socket is
+            given the same file descriptor.
+        """
+        if self._socket is sock:
+            self._open_status = False
+            self._socket = None
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+            for reply in pending.values():
+                reply.fail(NetworkException("Connection lost."))
+        if sock is None:
+            return
+        # Shutting down wakes a thread blocked reading the socket, which
+        # closing alone does not.
+        with self._close_lock:
+            if sock.fileno() == -1:
+                return
             try:
-                self._socket.close()
-                self._open_status = False
-                self._socket = self._context.wrap_socket(
-                    socket(AF_INET, SOCK_STREAM),
-                    server_hostname=self._config["server"]["hostname"])
-            except Exception:
-                raise
+                sock.shutdown(SHUT_RDWR)
+            except OSError:
+                pass
+            if close:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+
+
+class _Reply:
+    """The reply to a request, filled in by the reader thread."""
+
+    def __init__(self):
+        """Create a new empty reply."""
+        self._event = threading.Event()
+        self._payload = None
+        self._error = None
+
+    def set(self, payload):
+        """Fill in the reply."""
+        self._payload = payload
+        self._event.set()
+
+    def fail(self, error):
+        """Fill in an error to raise instead of a reply."""
+        self._error = error
+        self._event.set()
+
+    def wait(self, timeout):
+        """
+        Wait for the reply or an error.
+
+        :param timeout: seconds to wait, None to wait forever
+        :return: False if the wait timed out
+        """
+        return self._event.wait(timeout)
+
+    def result(self):
+        """Get the reply payload, or raise its error."""
+        if self._error is not None:
+            raise self._error
+        return self._payload
+
+
+def write_frame(sock, frame_type, request_id, payload, flags=0):
+    """
+    Write one frame to a socket without copying its payload.
+
+    The header and payload are sent with one sendmsg call on plain
+    sockets. TLS sockets have no sendmsg, so small payloads are joined to
+    their header to go out in one TLS record and large ones are written
+    after it.
+
+    :param sock: the socket to write to
+    :param frame_type: REQUEST, REPLY or UPDATE
+    :param request_id: int id of the request the frame belongs to
+    :param payload: bytes-like object
+    :param flags: int flags of the frame
+    """
+    header = FRAME_HEADER.pack(len(payload), frame_type, flags, request_id)
+    if isinstance(sock, ssl.SSLSocket):
+        if len(payload) <= COALESCE_LIMIT:
+            sock.sendall(header + payload)
         else:
-            raise NetworkException("Connection currently closed.")
+            sock.sendall(header)
+            sock.sendall(payload)
+        return
+    buffers = [memoryview(header), memoryview(payload).cast("B")]
+    while buffers:
+        sent = sock.sendmsg(buffers)
+        while buffers and sent >= len(buffers[0]):
+            sent -= len(buffers[0])
+            buffers.pop(0)
+        if sent:
+            buffers[0] = buffers[0][sent:]
+
+
+class FrameReader:
+    """
+    Reads frames from a socket through a reusable receive buffer.
+
+    Small frames are read many at a time into the buffer and copied out
+    of it. The body of a frame larger than what is buffered is received
+    straight into its own bytearray.
+    """
+
+    def __init__(self, sock, buffer_size=65536, max_frame=MAX_FRAME):
+        """
+        Create a new FrameReader object.
+
+        :param sock: the socket to read from
+        :param buffer_size: the size of the receive buffer in bytes
+        :param max_frame: the size in bytes of the largest payload accepted
+        """
+        self._socket = sock
+        self._max_frame = max_frame
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+
+    def read_frame(self):
+        """
+        Read the next frame.
+
+        :return: a tuple (frame_type, flags, request_id, payload), payload
+            a bytearray owned by the caller
+        :raises NetworkException: if the connection closed, or the frame is
+            larger than max_frame
+        """
+        self._fill(FRAME_HEADER.size)
+        length, frame_type, flags, request_id = FRAME_HEADER.unpack_from(
+            self._buffer, self._start)
+        if length > self._max_frame:
+            raise NetworkException("Frame of %i bytes refused." % length)
+        self._start += FRAME_HEADER.size
+        payload = bytearray(length)
+        if length <= len(self._buffer):
+            self._fill(length)
+            payload[:] = self._view[self._start:self._start + length]
+            self._start += length
+        else:
+            buffered = self._end - self._start
+            payload[:buffered] = self._view[self._start:self._end]
+            self._start = self._end = 0
+            view = memoryview(payload)
+            while buffered < length:
+                buffered += self._recv_into(view[buffered:])
+        return (frame_type, flags, request_id, payload)
+
+    def _fill(self, size):
+        """
+        Receive until the buffer holds at least some unread bytes.
+
+        :param size: the number of unread bytes needed, no more than the
+            size of the buffer
+        """
+        if self._end - self._start >= size:
+            return
+        if self._start + size > len(self._buffer):
+            unread = self._end - self._start
+            self._buffer[:unread] = \
+                self._view[self._start:self._end].tobytes()
+            self._start, self._end = 0, unread
+        while self._end - self._start < size:
+            self._end += self._recv_into(self._view[self._end:])
+
+    def _recv_into(self, view):
+        """
+        Receive into a memoryview.
+
+        :param view: the memoryview to fill
+        :return: the number of bytes received
+        """
+        received = self._socket.recv_into(view)
+        if not received:
+            raise NetworkException("Connection closed by other party.")
+        return received
 
 
 class NetworkException(Exception):
@@ -1,29 +1,370 @@
 """Hex map representation."""
 
-from queue import PriorityQueue
-from terrain import Terrain, TerrainType, BiomeType
+from array import array
+from collections.abc import Mapping
+from math import inf
+import threading
+import pathfinding
+from terrain import Terrain, TerrainType, BiomeType, MOVEMENT_COSTS, \
+    VISION_ALLOWED
 from mapresource import ResourceType, Resource
 
+_TERRAIN_TYPES = sorted(TerrainType, key=lambda member: member.value)
+_BIOME_TYPES = sorted(BiomeType, key=lambda member: member.value)
+
+# The cheapest cost of entering any tile, used to bound path costs.
+MIN_MOVEMENT_COST = min(min(row) for row in MOVEMENT_COSTS)
+
+# Vision of every TerrainType value, as a bytes.translate table.
+_VISION_TABLE = bytes(VISION_ALLOWED) + bytes(256 - len(VISION_ALLOWED))
+
+# Shared Terrain of every TerrainType value, then BiomeType value.
+_SHARED_TERRAIN = [[Terrain.shared(terrain_type, biome)
+                    for biome in _BIOME_TYPES]
+                   for terrain_type in _TERRAIN_TYPES]
+
+# (x, y, z) offsets of the six neighbours, in direction order.
+DIRECTIONS = [(1, -1, 0), (1, 0, -1), (0, 1, -1),
+              (-1, 1, 0), (-1, 0, 1), (0, -1, 1)]
+
+
+def hex_line(start, end):
+    """
+    Get the coordinates on a line between two hexes, without wrapping.
+
+    Steps along the line in integers, with every coordinate scaled up by
+    the length of the line, so no floating point is rounded. A point
+    exactly halfway between two hexes rounds like Python's round does,
+    to the even coordinate, and hex_round's tie breaking is applied to
+    the exact rounding errors.
+
+    :param start: (x, y, z) coordinates
+    :param end: (x, y, z) coordinates
+    :return: list of (x, y, z) coordinates from start to end inclusive
+    """
+    x, y, z = start
+    dx, dy, dz = end[0] - x, end[1] - y, end[2] - z
+    length = max(abs(dx), abs(dy), abs(dz))
+    if length == 0:
+        return [(x, y, z)]
+    x, y, z = x * length, y * length, z * length
+    double = 2 * length
+    line = []
+    for step in range(length + 1):
+        rx, x_tie = divmod(2 * x + length, double)
+        ry, y_tie = divmod(2 * y + length, double)
+        rz, z_tie = divmod(2 * z + length, double)
+        if x_tie == 0 and rx & 1:
+            rx -= 1
+        if y_tie == 0 and ry & 1:
+            ry -= 1
+        if z_tie == 0 and rz & 1:
+            rz -= 1
+        x_dif = abs(rx * length - x)
+        y_dif = abs(ry * length - y)
+        z_dif = abs(rz * length - z)
+        if x_dif > y_dif and x_dif > z_dif:
+            rx = -ry - rz
+        elif y_dif > z_dif:
+            ry = -rx - rz
+        else:
+            rz = -rx - ry
+        line.append((rx, ry, rz))
+        x += dx
+        y += dy
+        z += dz
+    return line
+
+
+class TileStore:
+    """
+    Parallel per-tile arrays holding the state of every tile on a map.
+
+    All arrays are indexed by the flat tile index handed out by a Grid;
+    a Hex is only a view onto one index of a store. The epoch counts
+    changes to units and terrain, which invalidate cached searches, and
+    the terrain epoch counts changes to terrain alone.
+
+    Every change to a tile also stamps it with a new version, so that
+    the tiles changed since any earlier version can be found. The most
+    recent changes are kept in a journal, older queries scan versions.
+
+    A store can also hand out and take back single tiles, for Hex objects
+    not on any grid.
+    """
+
+    DEFAULT_TERRAIN = Terrain(TerrainType.FLAT, BiomeType.GRASSLAND)
+
+    def __init__(self, size):
+        """
+        Create a new TileStore object.
+
+        :param size: the number of tiles to allocate
+        """
+        default = TileStore.DEFAULT_TERRAIN
+        self.terrain_types = bytearray([default.terrain_type.value]) * size
+        self.biomes = bytearray([default.biome.value]) * size
+        self.movement_costs = array('d', [default.movement_cost]) * size
+        self.visions = bytearray([default.vision]) * size
+        self.resources = [None] * size
+        self.units = [None] * size
+        self.buildings = [None] * size
+        self.civ_ids = [None] * size
+        self.city_ids = [None] * size
+        self.epoch = 0
+        self.terrain_epoch = 0
+        self.version = 0
+        self.versions = array('q', [0]) * size
+        self._journal = []
+        self._journal_start = 0
+        self._free = []
+        self._allocate_lock = threading.Lock()
+
+    def __len__(self):
+        """
+        Length of the store.
+
+        :return: the number of tiles held
+        """
+        return len(self.terrain_types)
+
+    def allocate(self):
+        """
+        Take a tile with the default state, growing the store if needed.
+
+        :return: the index of the tile
+        """
+        with self._allocate_lock:
+            if self._free:
+                return self._free.pop()
+            default = TileStore.DEFAULT_TERRAIN
+            index = len(self.units)
+            self.terrain_types.append(default.terrain_type.value)
+            self.biomes.append(default.biome.value)
+            self.movement_costs.append(default.movement_cost)
+            self.visions.append(default.vision)
+            self.versions.append(0)
+            for values in (self.resources, self.units, self.buildings,
+                           self.civ_ids, self.city_ids):
+                values.append(None)
+            return index
+
+    def release(self, index):
+        """
+        Give back a tile taken with allocate, resetting its state.
+
+        May be called while allocate runs, from a Hex being freed.
+
+        :param index: the tile index
+        """
+        default = TileStore.DEFAULT_TERRAIN
+        self.terrain_types[index] = default.terrain_type.value
+        self.biomes[index] = default.biome.value
+        self.movement_costs[index] = default.movement_cost
+        self.visions[index] = default.vision
+        for values in (self.resources, self.units, self.buildings,
+                       self.civ_ids, self.city_ids):
+            values[index] = None
+        self._free.append(index)
+
+    def stamp(self, index):
+        """
+        Record a change to a tile under a new version.
+
+        :param index: the tile index
+        """
+        self.version += 1
+        self.versions[index] = self.version
+        journal = self._journal
+        journal.append(index)
+        if len(journal) > max(4 * len(self.versions), 1024):
+            dropped = len(journal) // 2
+            del journal[:dropped]
+            self._journal_start += dropped
+
+    def stamp_all(self):
+        """Record a change to every tile under a new version."""
+        self.version += 1
+        self.versions[:] = array('q', [self.version]) * len(self.versions)
+        self._journal.clear()
+        self._journal_start = self.version
+
+    def changed_since(self, version):
+        """
+        Get the tiles changed after a version.
+
+        :param version: a version number returned by an earlier query of
+            version
+        :return: sorted list of the indices of tiles changed since
+        """
+        if version >= self._journal_start:
+            return sorted(set(self._journal[version - self._journal_start:]))
+        return [index for index, tile_version in enumerate(self.versions)
+                if tile_version > version]
+
+    def terrain(self, index):
+        """
+        Get a Terrain object for a tile.
+
+        :param index: the tile index
+        :return: the shared Terrain of the tile's kind, or a Terrain
+            object holding the tile's resource if it has one
+        """
+        terrain = _SHARED_TERRAIN[self.terrain_types[index]][
+            self.biomes[index]]
+        resource = self.resources[index]
+        if resource is None:
+            return terrain
+        return Terrain(terrain.terrain_type, terrain.biome, resource)
+
+    def set_terrain(self, index, terrain):
+        """
+        Write a Terrain object into the arrays of a tile.
+
+        :param index: the tile index
+        :param terrain: a Terrain object
+        """
+        self.terrain_types[index] = terrain.terrain_type.value
+        self.biomes[index] = terrain.biome.value
+        self.movement_costs[index] = terrain.movement_cost
+        self.visions[index] = terrain.vision
+        self.resources[index] = terrain.resource
+        self.epoch += 1
+        self.terrain_epoch += 1
+        self.stamp(index)
+
+    def set_layers(self, terrain_types, biomes, resources,
+                   movement_costs=None):
+        """
+        Write the terrain of every tile at once.
+
+        :param terrain_types: bytes holding the TerrainType value of
+            every tile
+        :param biomes: bytes holding the BiomeType value of every tile
+        :param resources: list holding the Resource object or None of
+            every tile
+        :param movement_costs: optional bytes holding the movement cost of
+            every tile as doubles, worked out from the terrain if None
+        """
+        self.terrain_types[:] = terrain_types
+        self.biomes[:] = biomes
+        self.visions[:] = self.terrain_types.translate(_VISION_TABLE)
+        if movement_costs is None:
+            self.movement_costs[:] = array('d', [
+                MOVEMENT_COSTS[terrain_type][biome]
+                for terrain_type, biome in zip(self.terrain_types,
+                                               self.biomes)])
+        else:
+            costs = array('d')
+            costs.frombytes(movement_costs)
+            self.movement_costs[:] = costs
+        self.resources[:] = resources
+        self.epoch += 1
+        self.terrain_epoch += 1
+        self.stamp_all()
+
+    def set_unit(self, index, unit):
+        """
+        Place a unit on a tile.
+
+        :param index: the tile index
+        :param unit: a Unit object, or None
+        """
+        self.units[index] = unit
+        self.epoch += 1
+        self.stamp(index)
+
+    def set_building(self, index, building):
+        """
+        Place a building on a tile.
+
+        :param index: the tile index
+        :param building: a Building or City object, or None
+        """
+        self.buildings[index] = building
+        self.stamp(index)
+
+    def set_resource(self, index, resource):
+        """
+        Place a resource on a tile.
+
+        :param index: the tile index
+        :param resource: a Resource object, or None
+        """
+        self.resources[index] = resource
+        self.stamp(index)
+
+    def set_resource_worked(self, index, worked):
+        """
+        Start or stop working the resource on a tile.
+
+        :param index: the tile index
+        :param worked: True to work the resource, False to stop
+        """
+        resource = self.resources[index]
+        if worked:
+            resource.work()
+        else:
+            resource.stop_work()
+        self.stamp(index)
+
+    def set_civ_id(self, index, civ_id):
+        """
+        Set the civilisation owning a tile.
+
+        :param index: the tile index
+        :param civ_id: a civilisation id, or None
+        """
+        self.civ_ids[index] = civ_id
+        self.stamp(index)
+
+    def set_city_id(self, index, city_id):
+        """
+        Set the city owning a tile.
+
+        :param index: the tile index
+        :param city_id: a city id, or None
+        """
+        self.city_ids[index] = city_id
+        self.stamp(index)
+
 
 class Hex:
-    """A class for a Hexagonal shape."""
+    """
+    A class for a Hexagonal shape.
+
+    A Hex on a Grid is a thin view over one index of the grid's TileStore.
+    A Hex created on its own takes a tile of a store shared by every such
+    Hex, and gives it back when it is freed.
+    """
 
-    def __init__(self, x, y, z):
+    __slots__ = ('_x', '_y', '_z', '_tiles', '_index')
+
+    def __init__(self, x, y, z, tiles=None, index=0):
         """
         Create a new Hex object.
 
         :param x: the x coordinate of the hexagon
         :param y: the y coordinate of the hexagon
         :param z: the z coordinate of the hexagon
+        :param tiles: the TileStore holding the tile state,
+            a tile of the shared detached store if None
+        :param index: the index of this tile in tiles
         """
         self._x = x
         self._y = y
         self._z = z
-        self._terrain = Terrain(TerrainType.FLAT, BiomeType.GRASSLAND)
-        self._unit = None
-        self._building = None
-        self._civ_id = None
-        self._city_id = None
+        if tiles is None:
+            tiles = _DETACHED_TILES
+            index = tiles.allocate()
+        self._tiles = tiles
+        self._index = index
+
+    def __del__(self):
+        """Give back the tile of a Hex not on any grid."""
+        tiles = getattr(self, "_tiles", None)
+        if tiles is not None and tiles is _DETACHED_TILES:
+            tiles.release(self._index)
 
     @property
     def x(self):
@@ -52,24 +393,6 @@ class Hex:
         """
         return self._z
 
-    @property
-    def unit(self):
-        """
-        Property for unit.
-
-        :return: a unit
-        """
-        return self._unit
-
-    @unit.setter
-    def unit(self, new_unit):
-        """
-        Setter for terrain.
-
-        :param unit: a Unit object, or None
-        """
-        self._unit = new_unit
-
     @property
     def coords(self):
         """
@@ -84,9 +407,12 @@ class Hex:
         """
         Property for terrain.
 
+        The Terrain is built from the tile arrays, so changes must be made
+        by assigning a new Terrain or through the resource property.
+
         :return: a Terrain object
         """
-        return self._terrain
+        return self._tiles.terrain(self._index)
 
     @terrain.setter
     def terrain(self, new_terrain):
@@ -95,7 +421,47 @@ class Hex:
 
         :param new_terrain: a Terrain object
         """
-        self._terrain = new_terrain
+        self._tiles.set_terrain(self._index, new_terrain)
+
+    @property
+    def resource(self):
+        """
+        Property for the resource on this hex.
+
+        :return: a Resource object, or None
+        """
+        return self._tiles.resources[self._index]
+
+    @resource.setter
+    def resource(self, resource):
+        """
+        Setter for resource.
+
+        :param resource: a Resource object, or None
+        """
+        self._tiles.set_resource(self._index, resource)
+
+    @property
+    def resource_worked(self):
+        """
+        Property for whether the resource on this hex is being worked.
+
+        :return: a boolean, False if there is no resource
+        """
+        resource = self._tiles.resources[self._index]
+        return resource is not None and resource.is_worked
+
+    @resource_worked.setter
+    def resource_worked(self, worked):
+        """
+        Start or stop working the resource on this hex.
+
+        Working a resource through here stamps the tile as changed, unlike
+        calling work on the Resource itself.
+
+        :param worked: True to work the resource, False to stop
+        """
+        self._tiles.set_resource_worked(self._index, worked)
 
     @property
     def vision(self):
@@ -104,7 +470,7 @@ class Hex:
 
         :return: a boolean value of visiona allowed
         """
-        return self._terrain.vision
+        return self._tiles.visions[self._index] == 1
 
     @property
     def movement_cost(self):
@@ -113,7 +479,7 @@ class Hex:
 
         :return: movement cost value
         """
-        return self._terrain.movement_cost
+        return self._tiles.movement_costs[self._index]
 
     @property
     def unit(self):
@@ -122,7 +488,7 @@ class Hex:
 
         :return: unit object
         """
-        return self._unit
+        return self._tiles.units[self._index]
 
     @unit.setter
     def unit(self, unit):
@@ -131,7 +497,7 @@ class Hex:
 
         :param unit: unit object
         """
-        self._unit = unit
+        self._tiles.set_unit(self._index, unit)
 
     @property
     def building(self):
@@ -140,7 +506,7 @@ class Hex:
 
         :return: building object
         """
-        return self._building
+        return self._tiles.buildings[self._index]
 
     @building.setter
     def building(self, building):
@@ -149,27 +515,50 @@ class Hex:
 
         :param building: building object
         """
-        self._building = building
+        self._tiles.set_building(self._index, building)
 
     @property
     def civ_id(self):
         """Return civilisation that owns tile."""
-        return self._civ_id
+        return self._tiles.civ_ids[self._index]
 
     @civ_id.setter
     def civ_id(self, civilisation_id):
         """Set civilisation ID of tile."""
-        self._civ_id = civilisation_id
+        self._tiles.set_civ_id(self._index, civilisation_id)
 
     @property
     def city_id(self):
         """Return city that owns tile."""
-        return self._city_id
+        return self._tiles.city_ids[self._index]
 
     @city_id.setter
     def city_id(self, city_id):
         """Set city ID of tile."""
-        self._city_id = city_id
+        self._tiles.set_city_id(self._index, city_id)
+
+    def __getstate__(self):
+        """
+        Get the state to pickle, detached from any grid.
+
+        :return: a tuple of the coordinates and tile state
+        """
+        return (self._x, self._y, self._z, self.terrain, self.unit,
+                self.building, self.civ_id, self.city_id)
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled Hex as a detached tile.
+
+        :param state: a tuple as returned by __getstate__
+        """
+        x, y, z, terrain, unit, building, civ_id, city_id = state
+        Hex.__init__(self, x, y, z)
+        self.terrain = terrain
+        self.unit = unit
+        self.building = building
+        self.civ_id = civ_id
+        self.city_id = city_id
 
     def __eq__(self, other):
         """
@@ -204,18 +593,77 @@ class Hex:
         return hash((self.x, self.y, self.z))
 
 
+# Store of the tiles of every Hex not on a grid.
+_DETACHED_TILES = TileStore(0)
+
+
+class HexTileMap(Mapping):
+    """Read-only mapping of (x, y, z) coordinates to a Grid's Hex views."""
+
+    def __init__(self, grid):
+        """
+        Create a new HexTileMap object.
+
+        :param grid: the Grid to map
+        """
+        self._grid = grid
+
+    def __getitem__(self, coordinates):
+        """
+        Get the Hex at coordinates, without wrapping.
+
+        :param coordinates: tuple (x, y, z)
+        :return: Hex object
+        """
+        return self._grid.hex_at(self._grid.tile_index(coordinates))
+
+    def __iter__(self):
+        """
+        Iterate over the coordinates of every tile in index order.
+
+        :return: an iterator of (x, y, z) tuples
+        """
+        grid = self._grid
+        for index in range(len(grid.tiles)):
+            yield grid.tile_coordinates(index)
+
+    def __len__(self):
+        """
+        Return the number of tiles in the grid.
+
+        :return: an int
+        """
+        return len(self._grid.tiles)
+
+
 class Grid:
     """Class for the Grid."""
 
-    def __init__(self, size):
+    def __init__(self, size, cache_size=128, vision_cache_size=4096):
         """
         Create a new Grid object.
 
         :param size: the size of the grid
+        :param cache_size: the most search results to keep cached
+        :param vision_cache_size: the most vision results to keep cached
         """
         self._size = size
-        self._hextiles = {}
+        self._search_cache = pathfinding.SearchCache(cache_size)
+        self._vision_cache = pathfinding.SearchCache(vision_cache_size)
+        self._ray_templates = {}
+        self._ring_templates = {}
+        self._spiral_templates = {}
         self._radius = size // 2
+        self._tiles = TileStore(0)
+        self._views = []
+        self._xs = array('l')
+        self._ys = array('l')
+        self._row_offsets = []
+        self._residues = array('l')
+        self._wrapped_norms = array('l')
+        self._wrap_stride = 3 * self._radius + 2
+        self._neighbours = array('l')
+        self._hextiles = HexTileMap(self)
         x, y, z = 2*self._radius+1, -self._radius, -self._radius-1
         self._mirrors = [(x, y, z),
                          (-y, -z, -x),
@@ -224,6 +672,74 @@ class Grid:
                          (y, z, x),
                          (-z, -x, -y)]
 
+    @property
+    def epoch(self):
+        """
+        Getter for the number of unit and terrain changes on the grid.
+
+        :return: an int
+        """
+        return self._tiles.epoch
+
+    @property
+    def terrain_epoch(self):
+        """
+        Getter for the number of terrain changes on the grid.
+
+        :return: an int
+        """
+        return self._tiles.terrain_epoch
+
+    @property
+    def version(self):
+        """
+        Getter for the version of the grid, raised by every tile change.
+
+        :return: an int
+        """
+        return self._tiles.version
+
+    def tile_version(self, hexagon):
+        """
+        Get the version a tile was last changed in.
+
+        :param hexagon: a Hex object
+        :return: an int, 0 if the tile has never changed
+        """
+        return self._tiles.versions[self.hex_index(hexagon)]
+
+    def changed_since(self, version):
+        """
+        Get the tiles changed after a version of the grid.
+
+        Changes to a tile's terrain, resource, unit, building, owning
+        civilisation or city, or through Hex.resource_worked, are
+        recorded automatically.
+
+        :param version: an earlier value of version
+        :return: list of Hex objects in index order
+        """
+        return [self.hex_at(index)
+                for index in self._tiles.changed_since(version)]
+
+    @property
+    def vision_cache(self):
+        """
+        Getter for the cache of visible tiles.
+
+        :return: SearchCache object
+        """
+        return self._vision_cache
+
+    @property
+    def search_cache(self):
+        """
+        Getter for the cache of reachable tiles and paths.
+
+        :return: SearchCache object
+        """
+        return self._search_cache
+
     @property
     def mirrors(self):
         """Getter for mirrors."""
@@ -234,6 +750,161 @@ class Grid:
         """Getter for size."""
         return self._size
 
+    @property
+    def tiles(self):
+        """
+        Getter for the TileStore backing every Hex of the grid.
+
+        :return: TileStore object
+        """
+        return self._tiles
+
+    @property
+    def xs(self):
+        """
+        Getter for the x coordinate of every tile, by index.
+
+        :return: an array of ints
+        """
+        return self._xs
+
+    @property
+    def ys(self):
+        """
+        Getter for the y coordinate of every tile, by index.
+
+        :return: an array of ints
+        """
+        return self._ys
+
+    def set_layers(self, terrain_types, biomes, resources,
+                   movement_costs=None):
+        """
+        Write the terrain of every tile at once.
+
+        :param terrain_types: bytes holding the TerrainType value of
+            every tile, by index
+        :param biomes: bytes holding the BiomeType value of every tile
+        :param resources: list holding the Resource object or None of
+            every tile
+        :param movement_costs: optional bytes holding the movement cost of
+            every tile as doubles, worked out from the terrain if None
+        """
+        self._tiles.set_layers(terrain_types, biomes, resources,
+                               movement_costs)
+
+    def tile_index(self, coordinates):
+        """
+        Get the flat tile index of coordinates on the map, without wrapping.
+
+        :param coordinates: tuple (x, y, z)
+        :return: int index into the grid's TileStore
+        """
+        x, y, z = coordinates
+        radius = self._radius
+        if x + y + z != 0 or not self._row_offsets or \
+                not (-radius <= x <= radius and -radius <= y <= radius and
+                     -radius <= z <= radius):
+            raise KeyError(coordinates)
+        return self._row_offsets[x + radius] + y
+
+    def tile_coordinates(self, index):
+        """
+        Get the coordinates of a tile index.
+
+        :param index: int index into the grid's TileStore
+        :return: tuple (x, y, z)
+        """
+        x, y = self._xs[index], self._ys[index]
+        return (x, y, -x-y)
+
+    def hex_at(self, index):
+        """
+        Get the Hex view of a tile index.
+
+        :param index: int index into the grid's TileStore
+        :return: Hex object
+        """
+        hexagon = self._views[index]
+        if hexagon is None:
+            x, y = self._xs[index], self._ys[index]
+            hexagon = Hex(x, y, -x-y, self._tiles, index)
+            self._views[index] = hexagon
+        return hexagon
+
+    def hex_index(self, hexagon):
+        """
+        Get the tile index of a Hex, wrapping it onto the map if needed.
+
+        :param hexagon: a Hex object, either a view of this grid or not
+        :return: int index into the grid's TileStore
+        """
+        if hexagon._tiles is self._tiles:
+            return hexagon._index
+        return self.get_hextile(hexagon.coords)._index
+
+    def path_cost(self, path):
+        """
+        Get the total movement cost of entering every hex on a path.
+
+        Reads the cost each hex holds in its tile arrays, without building
+        a Terrain for it.
+
+        :param path: iterable of Hex objects
+        :return: the sum of their movement costs
+        """
+        return sum(hexagon.movement_cost for hexagon in path)
+
+    @property
+    def neighbours(self):
+        """
+        Getter for the wrapped neighbour table.
+
+        :return: an array holding the neighbour of tile i in direction d
+            at position 6*i + d
+        """
+        return self._neighbours
+
+    def neighbour_indices(self, index):
+        """
+        Get the indices of all neighbours of a tile.
+
+        :param index: int tile index
+        :return: a list of 6 tile indices, in direction order
+        """
+        start = 6 * index
+        return self._neighbours[start:start + 6].tolist()
+
+    def neighbour_index(self, index, direction):
+        """
+        Get the index of the neighbour of a tile in a given direction.
+
+        :param index: int tile index
+        :param direction: a direction from 0 to 5
+        :return: int tile index
+        """
+        return self._neighbours[6 * index + direction]
+
+    def wrapped_index(self, coordinates):
+        """
+        Get the tile index of any coordinates, wrapping them onto the map.
+
+        Every translation that wraps the map (see mirrors) is a multiple
+        of N = len(tiles) under f(x, y) = (3*radius + 2)*x + y, and f takes
+        a different value mod N on every tile of the map. f mod N is
+        therefore a constant time key for the wrapped tile.
+
+        :param coordinates: tuple (x, y, z)
+        :return: int index into the grid's TileStore
+        """
+        if coordinates[0] + coordinates[1] + coordinates[2] != 0:
+            raise KeyError(coordinates)
+        try:
+            return self._residues[(self._wrap_stride * coordinates[0] +
+                                   coordinates[1]) % len(self._residues)]
+        except ZeroDivisionError:
+            raise KeyError(coordinates)
+
     def get_hextile(self, coordinates):
         """
         Get hex at coordinates.
@@ -241,22 +912,13 @@ class Grid:
         :param coordinates: tuple (x, y, z)
         :return: Hex object
         """
-        coordinates_sum = coordinates[0] + coordinates[1] + coordinates[2]
-        should_wrap = ((abs(coordinates[0]) > self._radius) or
-                       (abs(coordinates[1]) > self._radius) or
-                       (abs(coordinates[2]) > self._radius))
-        if coordinates_sum is not 0:
-            raise KeyError
-        elif should_wrap:
-            return self.get_hextile(self.wrap_around(coordinates))
-        else:
-            return self._hextiles[coordinates]
+        return self.hex_at(self.wrapped_index(coordinates))
 
     def get_hextiles(self):
         """
-        Get the dictionary containing all hexs.
+        Get the mapping containing all hexs.
 
-        :return: Dictionary of hex objects.
+        :return: Mapping of (x, y, z) to hex objects.
         """
         return self._hextiles
 
@@ -264,21 +926,50 @@ class Grid:
         """
         Create a grid layout.
 
-        :return: a dictionary in the form {(x,y,z):Hex},
+        Tiles are numbered row by row along x, each row ordered by y.
+
+        :return: a mapping in the form {(x,y,z):Hex},
             where (x,y,z) is a tuple of coordinates and Hex is a Hex object
         """
         map_radius = self._size // 2
-        x = -map_radius
-        while x <= map_radius:
+        self._xs = array('l')
+        self._ys = array('l')
+        self._row_offsets = []
+        for x in range(-map_radius, map_radius + 1):
             y1 = max(-map_radius, -x - map_radius)
             y2 = min(map_radius, -x + map_radius)
-            y = y1
-            while y <= y2:
-                self._hextiles[(x, y, -x-y)] = Hex(x, y, -x-y)
-                y += 1
-            x += 1
+            self._row_offsets.append(len(self._xs) - y1)
+            self._xs.extend([x] * (y2 - y1 + 1))
+            self._ys.extend(range(y1, y2 + 1))
+        count = len(self._xs)
+        self._tiles = TileStore(count)
+        self._views = [None] * count
+        self._residues = array('l', [0]) * count
+        self._wrapped_norms = array('l', [0]) * count
+        stride = self._wrap_stride
+        for index, (x, y) in enumerate(zip(self._xs, self._ys)):
+            residue = (stride * x + y) % count
+            self._residues[residue] = index
+            self._wrapped_norms[residue] = max(abs(x), abs(y), abs(x + y))
+        self._neighbours = self.build_neighbour_table()
+        self._search_cache.clear()
+        self._vision_cache.clear()
         return self._hextiles
 
+    def build_neighbour_table(self):
+        """
+        Build the wrapped neighbour table of the grid.
+
+        :return: an array of 6 tile indices per tile, so the neighbour of
+            tile i in direction d is at position 6*i + d
+        """
+        residues, count = self._residues, len(self._residues)
+        stride = self._wrap_stride
+        offsets = [stride * dx + dy for dx, dy, dz in DIRECTIONS]
+        return array('l', [residues[(stride * x + y + offset) % count]
+                           for x, y in zip(self._xs, self._ys)
+                           for offset in offsets])
+
     def add_coords(self, first_hex, second_hex):
         """
         Add coordinates.
@@ -317,19 +1008,14 @@ class Grid:
 
     def get_all_neighbours(self, hexagon):
         """
-        Get all the neighbouring tiles coordinates.
+        Get all the neighbouring tiles.
 
         :param hexagon: a Hex object
-        :return: a list in the form [(x, y, z)],
-            where (x,y,z) is a tuple of coordinates
+        :return: a list of the 6 neighbouring Hex objects, in direction order
         """
-        x, y, z = hexagon.x, hexagon.y, hexagon.z
-        return [self.get_hextile((x+1, y-1, z)),
-                self.get_hextile((x+1, y, z-1)),
-                self.get_hextile((x, y+1, z-1)),
-                self.get_hextile((x-1, y+1, z)),
-                self.get_hextile((x-1, y, z+1)),
-                self.get_hextile((x, y-1, z+1))]
+        start = 6 * self.hex_index(hexagon)
+        hex_at = self.hex_at
+        return [hex_at(index) for index in self._neighbours[start:start + 6]]
 
     def get_neighbour_in_direction(self, hexagon, dire):
         """
@@ -339,8 +1025,8 @@ class Grid:
         :param dire: a direction to pick
         :return: a Hex object
         """
-        possible_directions = self.get_all_neighbours(hexagon)
-        return possible_directions[dire]
+        return self.hex_at(self._neighbours[6 * self.hex_index(hexagon) +
+                                            dire])
 
     def get_diagonals(self, hexagon):
         """
@@ -407,6 +1093,22 @@ class Grid:
         distance /= 2
         return distance
 
+    def wrapped_hex_distance(self, first_hex, second_hex):
+        """
+        Return the distance between two Hexes across the wrapped map.
+
+        The difference of the two hexes wraps onto the map tile nearest the
+        origin, so the distance is that tile's distance from the origin.
+
+        :param first_hex: A Hex object
+        :param second_hex: A Hex object
+        :return: the fewest steps between first_hex and second_hex,
+            going over the edges of the map where shorter, as an int
+        """
+        key = self._wrap_stride * (first_hex.x - second_hex.x) + \
+            first_hex.y - second_hex.y
+        return self._wrapped_norms[key % len(self._wrapped_norms)]
+
     def hex_round(self, coordinates):
         """
         Turn fractional hex coordinates(floating point) into nearest integer.
@@ -462,13 +1164,23 @@ class Grid:
         :param hex_b: a Hex object
         :return: list of hex tiles on the line
         """
-        distance = int(self.hex_distance(hex_a, hex_b))
-        results = []
-        jump = 1 / max(distance, 1)  # to handle lines with length 0
-        for i in range(distance+1):
-            results.append(self.get_hextile((self.hex_round(
-                self.hex_interpolate(hex_a, hex_b, jump * i)))))
-        return results
+        return [self.hex_at(index)
+                for index in self.line_indices(hex_a, hex_b)]
+
+    def line_indices(self, hex_a, hex_b):
+        """
+        Get the tile indices on a line between two hexes.
+
+        The line is drawn by hex_line and each tile wrapped onto the map.
+
+        :param hex_a: a Hex object
+        :param hex_b: a Hex object
+        :return: list of tile indices from hex_a to hex_b inclusive
+        """
+        residues, count = self._residues, len(self._residues)
+        stride = self._wrap_stride
+        return [residues[(stride * x + y) % count]
+                for x, y, z in hex_line(hex_a.coords, hex_b.coords)]
 
     def single_ring(self, centre_hexagon, ring_radius):
         """
@@ -478,15 +1190,8 @@ class Grid:
         :param centre_hexagon: the centre tile of the ring
         :return: a list of Hex objects forming a ring
         """
-        results = []
-        hexagon = self.get_hextile((centre_hexagon.x - ring_radius,
-                                    centre_hexagon.y,
-                                    centre_hexagon.z + ring_radius))
-        for side in range(6):
-            for j in range(ring_radius):
-                results.append(hexagon)
-                hexagon = self.get_neighbour_in_direction(hexagon, side)
-        return results
+        return self._offset_hexes(centre_hexagon,
+                                  self.ring_template(ring_radius))
 
     def spiral_ring(self, centre_hexagon, spiral_radius):
         """
@@ -496,12 +1201,71 @@ class Grid:
         :param spiral_radius: the radius of the spiral
         :return: a list of Hex objects forming a ring
         """
-        results = []
-        for ring_radius in range(1, spiral_radius+1):
-            results += self.single_ring(centre_hexagon, ring_radius)
-        results += [centre_hexagon]
+        results = self._offset_hexes(centre_hexagon,
+                                     self.spiral_template(spiral_radius))
+        results.append(centre_hexagon)
         return results
 
+    def ring_template(self, radius):
+        """
+        Get the offsets of the tiles of a ring around the origin.
+
+        :param radius: the radius of the ring
+        :return: an array of wrapped index keys (see wrapped_index) going
+            around the ring from (-radius, 0, radius), one per step
+        """
+        template = self._ring_templates.get(radius)
+        if template is None:
+            stride = self._wrap_stride
+            steps = [stride * dx + dy for dx, dy, dz in DIRECTIONS]
+            template = array('l')
+            key = -stride * radius
+            for step in steps:
+                for i in range(radius):
+                    template.append(key)
+                    key += step
+            self._ring_templates[radius] = template
+        return template
+
+    def spiral_template(self, radius):
+        """
+        Get the offsets of the rings of radius 1 up to a radius.
+
+        :param radius: the radius of the outermost ring
+        :return: an array of wrapped index keys (see wrapped_index), ring
+            by ring outwards, not including the origin
+        """
+        template = self._spiral_templates.get(radius)
+        if template is None:
+            template = array('l')
+            for ring_radius in range(1, radius + 1):
+                template.extend(self.ring_template(ring_radius))
+            self._spiral_templates[radius] = template
+        return template
+
+    def _offset_indices(self, key, template):
+        """
+        Get the tile indices at offsets from a wrapped index key.
+
+        :param key: wrapped index key of the centre
+        :param template: array of wrapped index key offsets
+        :return: list of tile indices, one per offset
+        """
+        residues, count = self._residues, len(self._residues)
+        return [residues[(key + offset) % count] for offset in template]
+
+    def _offset_hexes(self, centre_hexagon, template):
+        """
+        Get the Hex objects at offsets from a hex.
+
+        :param centre_hexagon: the centre Hex, on the map or not
+        :param template: array of wrapped index key offsets
+        :return: list of Hex objects, one per offset
+        """
+        key = self._wrap_stride * centre_hexagon.x + centre_hexagon.y
+        return [self.hex_at(index)
+                for index in self._offset_indices(key, template)]
+
     def intersecting_hex_ranges(self, first_range, second_range):
         """
         Get list of all hex objects common to both ranges.
@@ -519,80 +1283,191 @@ class Grid:
         :param coordinates: tuple (x, y, z)
         :return: tuple (x, y, z)
         """
-        min_mirror = self._mirrors[0]
-        last_distance = self.hex_distance_coordinates(coordinates, min_mirror)
-        for mirror in self._mirrors[1:]:
-            distance = self.hex_distance_coordinates(coordinates, mirror)
-            if distance <= last_distance:
-                min_mirror = mirror
-                last_distance = self.hex_distance_coordinates(coordinates,
-                                                              min_mirror)
-        return (round(coordinates[0] - min_mirror[0]),
-                round(coordinates[1] - min_mirror[1]),
-                round(coordinates[2] - min_mirror[2]))
+        return self.tile_coordinates(self.wrapped_index(coordinates))
 
     def vision(self, hex, radius):
         """
         Determine which tiles are visible in a certain radius.
 
+        Results are cached until terrain on the grid changes.
+
         :param hex: a hex marking centre of the vision radius
         :param radius: the radius to calculate
         :return: the list of values visible from the current tile
         """
-        result = {hex}
-        ring = self.single_ring(hex, radius)
-        for tile in ring:
-            view = True
-            if self.hex_distance(hex, tile) <= radius:
-                ray = self.hex_linedraw(hex, tile)
-                for raytile in range(len(ray))[1:]:
-                    if(view):
-                        result = result | {ray[raytile]}
-                        if not ray[raytile].vision:
-                            view = False
-        return list(result)
+        return [self.hex_at(index)
+                for index in self.vision_indices(self.hex_index(hex), radius)]
+
+    def vision_indices(self, centre, radius):
+        """
+        Determine which tile indices are visible in a certain radius.
+
+        Results are cached until terrain on the grid changes.
+
+        :param centre: tile index marking centre of the vision radius
+        :param radius: the radius to calculate
+        :return: a tuple of the visible tile indices
+        """
+        key = (centre, radius)
+        visible = self._vision_cache.get(key, self._tiles.terrain_epoch)
+        if visible is None:
+            visible = self.visible_indices(centre, radius)
+            self._vision_cache.put(key, self._tiles.terrain_epoch, visible)
+        return visible
+
+    def visible_indices(self, centre, radius):
+        """
+        Cast the rays of a radius from a tile.
+
+        Each ray reveals tiles up to and including the first one that
+        blocks vision. Rays whose end would wrap over the edge of the map
+        are not cast.
+
+        :param centre: tile index to look from
+        :param radius: the radius to calculate
+        :return: a tuple of the visible tile indices
+        """
+        radius_limit = self._radius
+        residues, count = self._residues, len(self._residues)
+        visions = self._tiles.visions
+        x, y = self._xs[centre], self._ys[centre]
+        centre_key = self._wrap_stride * x + y
+        visible = {centre}
+        for end_x, end_y, ray in self.ray_templates(radius):
+            end_x += x
+            end_y += y
+            if abs(end_x) > radius_limit or abs(end_y) > radius_limit or \
+                    abs(end_x + end_y) > radius_limit:
+                continue
+            for offset in ray:
+                index = residues[(centre_key + offset) % count]
+                visible.add(index)
+                if not visions[index]:
+                    break
+        return tuple(visible)
+
+    def ray_templates(self, radius):
+        """
+        Get the rays from the origin to every tile of a ring.
+
+        :param radius: the radius of the ring
+        :return: a list of tuples (x, y, ray) where (x, y) is the end of the
+            ray and ray lists the wrapped index keys (see wrapped_index)
+            of the tiles along it, relative to the start of the ray
+        """
+        templates = self._ray_templates.get(radius)
+        if templates is None:
+            templates = []
+            x, y, z = -radius, 0, radius
+            for side in range(6):
+                for step in range(radius):
+                    ray = [self._wrap_stride * rx + ry for rx, ry, rz in
+                           hex_line((0, 0, 0), (x, y, z))[1:]]
+                    templates.append((x, y, ray))
+                    x += DIRECTIONS[side][0]
+                    y += DIRECTIONS[side][1]
+                    z += DIRECTIONS[side][2]
+            self._ray_templates[radius] = templates
+        return templates
 
     def dijkstra(self, start_hex, movement, include_units=False):
         """
         Implement Dijkstra's algorithm for hex tiles.
 
+        Results are cached until a unit or terrain on the grid changes.
+
         :param start_hex: the starting hex to determine paths from
         :param movement: the movement cost limit available
+        :param include_units: keep tiles holding a unit in the result
         :return: a dictionary with keys as reachable tiles and
             values as previous tile in path
         """
-        opn = PriorityQueue()
-        opn.put((0, start_hex))
-        visited, previous_tiles, result = {}, {start_hex: (0, None)}, {}
-        while opn.qsize() > 0:
-            current_hex = opn.get()
-            prev = previous_tiles[current_hex[1]]
-            if prev[0] > movement:
-                break
-            current_cost = current_hex[0]
-            current_hex = current_hex[1]
-            visited[current_hex] = None
-            neighbours = self.get_all_neighbours(current_hex)
-            result[current_hex] = prev[1]
-            for neighbour in neighbours:
-                if neighbour in previous_tiles:
-                    if (current_cost + neighbour.movement_cost) < \
-                                        previous_tiles[neighbour][0]:
-                        previous_tiles[neighbour] = (current_cost +
-                                                     neighbour.movement_cost,
-                                                     current_hex)
-                else:
-                    previous_tiles[neighbour] = (current_cost +
-                                                 neighbour.movement_cost,
-                                                 current_hex)
-                if neighbour not in visited:
-                    opn.put((current_cost +
-                             neighbour.movement_cost, neighbour))
-        if not include_units:
-            for tile in list(result):
-                if tile.unit is not None:
-                    del result[tile]
-        return result
+        start = self.hex_index(start_hex)
+        key = ("reachable", start, movement, include_units)
+        result = self._search_cache.get(key, self._tiles.epoch)
+        if result is None:
+            previous, costs = pathfinding.dijkstra(
+                self._neighbours, self._tiles.movement_costs, start,
+                movement)
+            units = self._tiles.units
+            hex_at = self.hex_at
+            result = {}
+            for index, before in previous.items():
+                if include_units or units[index] is None:
+                    result[hex_at(index)] = hex_at(before) if before >= 0 \
+                        else None
+            self._search_cache.put(key, self._tiles.epoch, result)
+        return dict(result)
+
+    def distance_field(self, sources, movement=inf):
+        """
+        Get the movement cost from the nearest of many hexes to every tile.
+
+        Runs a single search seeded with every source, so asking for the
+        distance to the nearest enemy unit or city costs one search rather
+        than one per source. Results are cached until a unit or terrain on
+        the grid changes.
+
+        :param sources: iterable of Hex objects to measure from
+        :param movement: the movement cost limit, tiles costing more to reach
+            are left unreached
+        :return: a tuple (distances, nearest) of arrays by tile index.
+            distances holds the cost of reaching each tile from its nearest
+            source, inf if unreached, and nearest holds the tile index of
+            that source, -1 if unreached. Use hex_at to turn an index into
+            a Hex.
+        """
+        sources = tuple(self.hex_index(hexagon) for hexagon in sources)
+        key = ("field", sources, movement)
+        result = self._search_cache.get(key, self._tiles.epoch)
+        if result is None:
+            result = pathfinding.distance_field(
+                self._neighbours, self._tiles.movement_costs, sources,
+                movement)
+            self._search_cache.put(key, self._tiles.epoch, result)
+        distances, nearest = result
+        return (array('d', distances), array('l', nearest))
+
+    def path_indices(self, start, end, movement):
+        """
+        Determine the shortest path between two tile indices.
+
+        Results are cached until a unit or terrain on the grid changes.
+
+        :param start: tile index the path begins from
+        :param end: tile index the path ends at
+        :param movement: the total movement cost available
+        :return: a list of the tile indices on the path after start,
+            empty if no path is available
+        """
+        key = ("path", start, end, movement)
+        path = self._search_cache.get(key, self._tiles.epoch)
+        if path is None:
+            previous, cost = pathfinding.astar(
+                self._neighbours, self._tiles.movement_costs, start, end,
+                movement, self.distance_heuristic(end))
+            path = [] if cost is None else \
+                pathfinding.walk_back(previous, start, end)
+            self._search_cache.put(key, self._tiles.epoch, path)
+        return list(path)
+
+    def distance_heuristic(self, target):
+        """
+        Build a lower bound on the movement cost of reaching a tile.
+
+        :param target: tile index to be reached
+        :return: a function of a tile index returning the wrapped hex
+            distance to target times the cheapest movement cost
+        """
+        xs, ys = self._xs, self._ys
+        norms, count = self._wrapped_norms, len(self._wrapped_norms)
+        stride = self._wrap_stride
+        target_key = stride * xs[target] + ys[target]
+
+        def heuristic(index):
+            return norms[(stride * xs[index] + ys[index] - target_key) %
+                         count] * MIN_MOVEMENT_COST
+        return heuristic
 
     def shortest_path(self, start_hex, end_hex, movement):
         """
@@ -604,14 +1479,9 @@ class Grid:
         :return: a list of the tiles on the path from start_hex to second_hex
             returns an empty list if no path is available
         """
-        reachable = self.dijkstra(start_hex, movement, True)
-        path = []
-        if end_hex in reachable:
-            nxt = end_hex
-            while nxt != start_hex:
-                path += [nxt]
-                nxt = reachable[nxt]
-        return path[::-1]
+        path = self.path_indices(self.hex_index(start_hex),
+                                 self.hex_index(end_hex), movement)
+        return [self.hex_at(index) for index in path]
 
     def move_along_path(self, start_hex, end_hex, movement):
         """
@@ -621,32 +1491,33 @@ class Grid:
         :param end_hex: the hex the path ends at
         :param movement: the total movement cost available
         """
-        path = self.shortest_path(start_hex, end_hex, movement)
-        unit = start_hex.unit
-        for tile in range(len(path)):
-            unit.position = path[tile]
-            path[tile].unit = unit
-            if tile > 0:
-                path[tile - 1].unit = None
+        start = self.hex_index(start_hex)
+        path = self.path_indices(start, self.hex_index(end_hex), movement)
+        if path:
+            tiles = self._tiles
+            unit = tiles.units[start]
+            unit.position = self.hex_at(path[-1])
+            tiles.set_unit(start, None)
+            tiles.set_unit(path[-1], unit)
 
     def static_map(self):
         """Create the static map."""
         resourcenum = 0
 
-        for hex_point in self.get_hextiles():
-            hexagon = self.get_hextile(hex_point)
+        for index in range(len(self._tiles)):
+            hexagon = self.hex_at(index)
 
             terraintype = self.choose_terrain_type(hexagon)
             biometype = self.choose_biome_type(hexagon)
 
-            hexagon._terrain = Terrain(terraintype, biometype)
+            hexagon.terrain = Terrain(terraintype, biometype)
 
             resource = self.choose_resource(hexagon, resourcenum)
 
             if resource is not None:
                 resourcenum += 1
 
-            hexagon._terrain._resource = resource
+            hexagon.resource = resource
 
     def choose_terrain_type(self, hexagon):
         """
@@ -708,8 +1579,9 @@ class Grid:
         """
         resource = None
 
-        if hexagon._terrain.terrain_type != TerrainType.OCEAN and \
-                hexagon._terrain.terrain_type != TerrainType.MOUNTAIN:
+        terrain_type = hexagon.terrain.terrain_type
+        if terrain_type != TerrainType.OCEAN and \
+                terrain_type != TerrainType.MOUNTAIN:
 
             if hexagon._y % 2 == 1 and hexagon._z % 2 == 0:
                 # resources
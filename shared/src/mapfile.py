@@ -0,0 +1,134 @@
+"""
+Binary map snapshots.
+
+A snapshot is a fixed header followed by the packed layers of every
+tile, in tile index order:
+
+    magic      4 bytes  b"HEXM"
+    version    uint16
+    size       uint32   the size of the Grid
+    count      uint32   the number of tiles
+    digest     32 bytes SHA-256 of everything after the header
+    terrain    count bytes of TerrainType values
+    biomes     count bytes of BiomeType values
+    resources  count bytes of ResourceType values, 0xff for none
+
+All integers are little endian.
+"""
+
+import hashlib
+import mmap
+import struct
+import numpy as np
+import mapgen
+from hexgrid import Grid
+
+MAGIC = b"HEXM"
+VERSION = 1
+HEADER = struct.Struct("<4sHII32s")
+
+
+def dumps(grid):
+    """
+    Pack the terrain of a grid into a snapshot.
+
+    :param grid: a Grid object with its tiles created
+    :return: the snapshot as bytes
+    """
+    tiles = grid.tiles
+    resources = bytes(0xff if resource is None
+                      else resource.resource_type.value
+                      for resource in tiles.resources)
+    body = bytes(tiles.terrain_types) + bytes(tiles.biomes) + resources
+    return HEADER.pack(MAGIC, VERSION, grid.size, len(tiles),
+                       hashlib.sha256(body).digest()) + body
+
+
+def digest(grid):
+    """
+    Get the content hash of a grid's terrain.
+
+    :param grid: a Grid object with its tiles created
+    :return: the hex digest a snapshot of the grid would carry
+    """
+    return read_header(dumps(grid))[2]
+
+
+def read_header(buffer):
+    """
+    Read and check the header of a snapshot.
+
+    :param buffer: a bytes-like object holding a snapshot
+    :return: a tuple (size, count, digest) where digest is a hex string
+    :raises ValueError: if the buffer is not a snapshot of this version
+    """
+    if len(buffer) < HEADER.size:
+        raise ValueError("Map snapshot is truncated.")
+    magic, version, size, count, content_hash = \
+        HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version %i map snapshot." % VERSION)
+    if len(buffer) != HEADER.size + 3 * count:
+        raise ValueError("Map snapshot is truncated.")
+    return (size, count, content_hash.hex())
+
+
+def loads(buffer, expected_digest=None):
+    """
+    Build a grid from a snapshot.
+
+    The layers are read straight out of the buffer, so no work is done
+    per tile beyond creating the grid itself and its resources.
+
+    :param buffer: a bytes-like object holding a snapshot
+    :param expected_digest: optional hex digest the snapshot must carry
+    :return: a Grid object
+    :raises ValueError: if the snapshot is damaged or has the wrong digest
+    """
+    size, count, content_hash = read_header(buffer)
+    body = memoryview(buffer)[HEADER.size:]
+    try:
+        if hashlib.sha256(body).hexdigest() != content_hash:
+            raise ValueError("Map snapshot does not match its digest.")
+        if expected_digest is not None and expected_digest != content_hash:
+            raise ValueError("Map snapshot is not the expected map.")
+        grid = Grid(size)
+        grid.create_grid()
+        if len(grid.tiles) != count:
+            raise ValueError("Map snapshot has the wrong number of tiles.")
+        layers = np.frombuffer(body, dtype=np.uint8).reshape(3, count)
+        mapgen.apply_layers(grid, layers[0], layers[1],
+                            layers[2].view(np.int8))
+        del layers
+    finally:
+        body.release()
+    return grid
+
+
+def save(grid, path):
+    """
+    Write a snapshot of a grid to a file.
+
+    :param grid: a Grid object with its tiles created
+    :param path: the path of the file to write
+    :return: the hex digest of the snapshot
+    """
+    snapshot = dumps(grid)
+    with open(path, "wb") as snapshot_file:
+        snapshot_file.write(snapshot)
+    return read_header(snapshot)[2]
+
+
+def load(path, expected_digest=None):
+    """
+    Build a grid from a snapshot file, mapped into memory.
+
+    :param path: the path of the snapshot file
+    :param expected_digest: optional hex digest the snapshot must carry
+    :return: a Grid object
+    :raises ValueError: if the snapshot is damaged or has the wrong digest
+    """
+    with open(path, "rb") as snapshot_file:
+        with mmap.mmap(snapshot_file.fileno(), 0,
+                       access=mmap.ACCESS_READ) as buffer:
+            return loads(buffer, expected_digest)
@@ -0,0 +1,213 @@
+"""Vectorised generation of terrain, biome and resource layers for a Grid."""
+
+import numpy as np
+import terrain
+from terrain import TerrainType, BiomeType
+from mapresource import ResourceType, Resource
+
+# Resource types handed out in turn by the static map.
+STATIC_RESOURCES = [ResourceType.COAL, ResourceType.IRON,
+                    ResourceType.LOGS, ResourceType.GEMS]
+
+# Resource types a seeded map picks from.
+NOISE_RESOURCES = sorted(ResourceType, key=lambda member: member.value)
+
+# Coordinates always left as flat grassland on a seeded map, so that
+# players can start there.
+START_LOCATIONS = [(4, -2, -2), (-3, -2, 5), (-2, 4, -2), (4, -5, 1)]
+
+# Movement cost of every TerrainType value, then BiomeType value.
+MOVEMENT_COSTS = np.array(terrain.MOVEMENT_COSTS)
+
+# Lattice spacing and weight of each octave of seeded noise.
+OCTAVES = [(8, 0.6), (4, 0.3), (2, 0.1)]
+
+
+def coordinate_arrays(grid):
+    """
+    Get the cube coordinates of every tile on a grid.
+
+    :param grid: a Grid object with its tiles created
+    :return: a tuple (xs, ys, zs) of int64 arrays, by tile index
+    """
+    xs = np.array(grid.xs, dtype=np.int64)
+    ys = np.array(grid.ys, dtype=np.int64)
+    return (xs, ys, -xs - ys)
+
+
+def static_layers(xs, ys, zs, size):
+    """
+    Compute the layers of the static map.
+
+    Matches Grid.choose_terrain_type, Grid.choose_biome_type and
+    Grid.choose_resource applied to every tile in index order.
+
+    :param xs: x coordinate of every tile
+    :param ys: y coordinate of every tile
+    :param zs: z coordinate of every tile
+    :param size: the size of the grid
+    :return: a tuple (terrain_types, biomes, resources) of uint8 arrays of
+        TerrainType and BiomeType values and an int8 array of ResourceType
+        values, -1 where a tile has no resource
+    """
+    radius = size // 2
+    terrain_types = np.full(xs.shape, TerrainType.FLAT.value, dtype=np.uint8)
+    mountain = (zs % 3 == 0) & ((ys % 2 == 1) | (xs % 3 == 1))
+    terrain_types[mountain] = TerrainType.MOUNTAIN.value
+    hill = (ys % 3 != 1) & (zs % 2 == 1)
+    terrain_types[hill] = TerrainType.HILL.value
+    ocean = (np.abs(xs) == radius) | (np.abs(ys) == radius) | \
+        (np.abs(zs) == radius) | (xs == 0) | (ys == 0) | (zs == 0) | \
+        ((xs % 3 == 1) & (ys % 2 == 1))
+    terrain_types[ocean] = TerrainType.OCEAN.value
+    bridge = (np.abs(xs) == size // 4) | (np.abs(ys) == size // 4)
+    terrain_types[bridge] = TerrainType.FLAT.value
+
+    biomes = np.full(xs.shape, BiomeType.GRASSLAND.value, dtype=np.uint8)
+    biomes[np.abs(ys) < size // 6] = BiomeType.DESERT.value
+    biomes[np.abs(ys) > size // 3] = BiomeType.TUNDRA.value
+
+    has_resource = (terrain_types != TerrainType.OCEAN.value) & \
+        (terrain_types != TerrainType.MOUNTAIN.value) & \
+        (ys % 2 == 1) & (zs % 2 == 0)
+    order = np.cumsum(has_resource) - 1
+    values = np.array([resource.value for resource in STATIC_RESOURCES],
+                      dtype=np.int8)
+    resources = np.where(has_resource, values[order % len(values)], -1)
+    return (terrain_types, biomes, resources.astype(np.int8))
+
+
+def hash_noise(xs, ys, seed):
+    """
+    Hash integer coordinates into uniform values.
+
+    Only integer arithmetic is used, so the same seed gives the same
+    values on every machine.
+
+    :param xs: int64 array of x coordinates
+    :param ys: int64 array of y coordinates
+    :param seed: an int
+    :return: a float64 array of values in [0, 1)
+    """
+    value = xs.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) ^ \
+        ys.astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F) ^ \
+        np.uint64(seed & 0xFFFFFFFFFFFFFFFF)
+    value ^= value >> np.uint64(30)
+    value *= np.uint64(0xBF58476D1CE4E5B9)
+    value ^= value >> np.uint64(27)
+    value *= np.uint64(0x94D049BB133111EB)
+    value ^= value >> np.uint64(31)
+    return (value >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def value_noise(xs, ys, seed, octaves=OCTAVES):
+    """
+    Compute smooth noise by interpolating hashed lattice values.
+
+    :param xs: int64 array of x coordinates
+    :param ys: int64 array of y coordinates
+    :param seed: an int
+    :param octaves: list of (lattice spacing, weight) pairs
+    :return: a float64 array of values in [0, 1)
+    """
+    total = np.zeros(xs.shape)
+    for octave, (spacing, weight) in enumerate(octaves):
+        octave_seed = seed * len(octaves) + octave
+        x0, x_offset = np.divmod(xs, spacing)
+        y0, y_offset = np.divmod(ys, spacing)
+        tx = x_offset / spacing
+        ty = y_offset / spacing
+        tx = tx * tx * (3 - 2 * tx)
+        ty = ty * ty * (3 - 2 * ty)
+        top = hash_noise(x0, y0, octave_seed) * (1 - tx) + \
+            hash_noise(x0 + 1, y0, octave_seed) * tx
+        bottom = hash_noise(x0, y0 + 1, octave_seed) * (1 - tx) + \
+            hash_noise(x0 + 1, y0 + 1, octave_seed) * tx
+        total += weight * (top * (1 - ty) + bottom * ty)
+    return total / sum(weight for spacing, weight in octaves)
+
+
+def noise_layers(xs, ys, zs, size, seed):
+    """
+    Compute the layers of a map from a seed.
+
+    Elevation noise decides the terrain, latitude and moisture noise the
+    biome, and hashed values place resources. The edge of the map is
+    always ocean, and START_LOCATIONS and their neighbours always flat
+    grassland.
+
+    :param xs: x coordinate of every tile
+    :param ys: y coordinate of every tile
+    :param zs: z coordinate of every tile
+    :param size: the size of the grid
+    :param seed: an int
+    :return: a tuple (terrain_types, biomes, resources) as static_layers
+    """
+    radius = max(size // 2, 1)
+    elevation = value_noise(xs, ys, 3 * seed)
+    terrain_types = np.full(xs.shape, TerrainType.FLAT.value, dtype=np.uint8)
+    terrain_types[elevation < 0.4] = TerrainType.OCEAN.value
+    terrain_types[elevation > 0.65] = TerrainType.HILL.value
+    terrain_types[elevation > 0.75] = TerrainType.MOUNTAIN.value
+    edge = (np.abs(xs) == radius) | (np.abs(ys) == radius) | \
+        (np.abs(zs) == radius)
+    terrain_types[edge] = TerrainType.OCEAN.value
+
+    latitude = np.abs(ys) / radius + \
+        (value_noise(xs, ys, 3 * seed + 1) - 0.5) * 0.4
+    biomes = np.full(xs.shape, BiomeType.GRASSLAND.value, dtype=np.uint8)
+    biomes[latitude < 0.25] = BiomeType.DESERT.value
+    biomes[latitude > 0.7] = BiomeType.TUNDRA.value
+
+    start = np.zeros(xs.shape, dtype=bool)
+    for x, y, z in START_LOCATIONS:
+        start |= np.maximum(np.maximum(np.abs(xs - x), np.abs(ys - y)),
+                            np.abs(zs - z)) <= 1
+    start &= ~edge
+    terrain_types[start] = TerrainType.FLAT.value
+    biomes[start] = BiomeType.GRASSLAND.value
+
+    chance = hash_noise(xs, ys, 3 * seed + 2)
+    has_resource = (chance < 0.12) & ~start & \
+        (terrain_types != TerrainType.OCEAN.value) & \
+        (terrain_types != TerrainType.MOUNTAIN.value)
+    values = np.array([resource.value for resource in NOISE_RESOURCES],
+                      dtype=np.int8)
+    choice = (chance / 0.12 * len(values)).astype(np.int64) % len(values)
+    resources = np.where(has_resource, values[choice], -1)
+    return (terrain_types, biomes, resources.astype(np.int8))
+
+
+def generate_map(grid, seed=None):
+    """
+    Generate the terrain of every tile on a grid.
+
+    :param grid: a Grid object with its tiles created
+    :param seed: an int seeding a noise based map, or None for the static
+        map
+    """
+    xs, ys, zs = coordinate_arrays(grid)
+    if seed is None:
+        layers = static_layers(xs, ys, zs, grid.size)
+    else:
+        layers = noise_layers(xs, ys, zs, grid.size, seed)
+    apply_layers(grid, *layers)
+
+
+def apply_layers(grid, terrain_types, biomes, resources):
+    """
+    Write generated layers into a grid.
+
+    :param grid: a Grid object with its tiles created
+    :param terrain_types: uint8 array of TerrainType values
+    :param biomes: uint8 array of BiomeType values
+    :param resources: int8 array of ResourceType values, -1 for none
+    """
+    resource_types = {resource.value: resource for resource in ResourceType}
+    tile_resources = [None] * len(resources)
+    for index in np.flatnonzero(resources >= 0).tolist():
+        tile_resources[index] = Resource(
+            resource_types[int(resources[index])], 1)
+    grid.set_layers(terrain_types.tobytes(), biomes.tobytes(),
+                    tile_resources,
+                    MOVEMENT_COSTS[terrain_types, biomes].tobytes())
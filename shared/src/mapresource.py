@@ -14,6 +14,8 @@ class ResourceType(Enum):
 class Resource():
     """Class to represent map resources."""
 
+    __slots__ = ('_resource_type', '_available_quantity', '_is_worked')
+
     def __init__(self, resource_type, available_quantity):
         """
         Create base resource.
@@ -0,0 +1,239 @@
+"""Index based path searches over a Grid's neighbour table."""
+
+from array import array
+from collections import OrderedDict
+from heapq import heappush, heappop
+from math import inf
+
+
+def dijkstra(neighbours, movement_costs, start, movement, target=None):
+    """
+    Run Dijkstra's algorithm from a tile index.
+
+    Entering a tile costs that tile's movement cost. Only tiles within the
+    movement budget are ever queued, and queue entries made stale by a
+    cheaper route are skipped when popped. Tiles of equal cost are
+    expanded in the order they were found.
+
+    :param neighbours: neighbour table, 6 tile indices per tile
+    :param movement_costs: movement cost of every tile, by index
+    :param start: tile index to search from
+    :param movement: the movement cost limit available
+    :param target: optional tile index, the search stops once it is reached
+    :return: a tuple (previous, costs) of dictionaries keyed by the reached
+        tile indices in the order they were reached. previous holds the
+        tile index before each tile on its path, -1 for start, and costs
+        holds the cost of reaching each tile.
+    """
+    previous = {start: -1}
+    best = {start: 0}
+    costs = {}
+    heap = [(0, 0, start)]
+    pushed = 1
+    while heap:
+        cost, order, index = heappop(heap)
+        if index in costs:
+            continue
+        costs[index] = cost
+        if index == target:
+            break
+        base = 6 * index
+        for neighbour in neighbours[base:base + 6]:
+            new_cost = cost + movement_costs[neighbour]
+            if new_cost <= movement and \
+                    new_cost < best.get(neighbour, inf):
+                best[neighbour] = new_cost
+                previous[neighbour] = index
+                heappush(heap, (new_cost, pushed, neighbour))
+                pushed += 1
+    return ({index: previous[index] for index in costs}, costs)
+
+
+def astar(neighbours, movement_costs, start, target, movement, heuristic):
+    """
+    Run an A* search from one tile index to another.
+
+    :param neighbours: neighbour table, 6 tile indices per tile
+    :param movement_costs: movement cost of every tile, by index
+    :param start: tile index to search from
+    :param target: tile index to search for
+    :param movement: the movement cost limit available
+    :param heuristic: function of a tile index returning a lower bound on
+        the cost of reaching target from it
+    :return: a tuple (previous, cost) where previous maps each reached tile
+        index to the one before it, -1 for start, and cost is the cost of
+        reaching target, or None if it is not reachable within movement
+    """
+    previous = {start: -1}
+    best = {start: 0}
+    closed = set()
+    heap = [(heuristic(start), 0, 0, start)]
+    pushed = 1
+    while heap:
+        estimate, order, cost, index = heappop(heap)
+        if index == target:
+            return (previous, cost)
+        if index in closed:
+            continue
+        closed.add(index)
+        base = 6 * index
+        for neighbour in neighbours[base:base + 6]:
+            new_cost = cost + movement_costs[neighbour]
+            if new_cost < best.get(neighbour, inf):
+                new_estimate = new_cost + heuristic(neighbour)
+                if new_estimate <= movement:
+                    best[neighbour] = new_cost
+                    previous[neighbour] = index
+                    heappush(heap, (new_estimate, pushed, new_cost,
+                                    neighbour))
+                    pushed += 1
+    return (previous, None)
+
+
+def distance_field(neighbours, movement_costs, sources, movement=inf):
+    """
+    Run one Dijkstra search outwards from many tile indices at once.
+
+    Every tile ends up with the cost of reaching it from its cheapest
+    source, as if a separate search had been run from each source. Ties
+    go to the source listed first.
+
+    :param neighbours: neighbour table, 6 tile indices per tile
+    :param movement_costs: movement cost of every tile, by index
+    :param sources: iterable of tile indices to search from
+    :param movement: the movement cost limit, tiles costing more to reach
+        are left unreached
+    :return: a tuple (distances, nearest) of arrays by tile index.
+        distances holds the cost of reaching each tile, inf if it was not
+        reached, and nearest holds the source it was reached from, -1 if
+        it was not reached.
+    """
+    count = len(movement_costs)
+    distances = array('d', [inf]) * count
+    nearest = array('l', [-1]) * count
+    heap = []
+    for source in sources:
+        if nearest[source] < 0:
+            distances[source] = 0
+            nearest[source] = source
+            heap.append((0, len(heap), source))
+    pushed = len(heap)
+    while heap:
+        cost, order, index = heappop(heap)
+        if cost > distances[index]:
+            continue
+        source = nearest[index]
+        base = 6 * index
+        for neighbour in neighbours[base:base + 6]:
+            new_cost = cost + movement_costs[neighbour]
+            if new_cost <= movement and new_cost < distances[neighbour]:
+                distances[neighbour] = new_cost
+                nearest[neighbour] = source
+                heappush(heap, (new_cost, pushed, neighbour))
+                pushed += 1
+    return (distances, nearest)
+
+
+def walk_back(previous, start, end):
+    """
+    Rebuild a path from a predecessor mapping.
+
+    :param previous: dictionary of tile index to previous tile index
+    :param start: tile index the path begins from
+    :param end: tile index the path ends at
+    :return: list of tile indices from after start up to end,
+        empty if end was not reached
+    """
+    path = []
+    if end in previous:
+        index = end
+        while index != start:
+            path.append(index)
+            index = previous[index]
+    path.reverse()
+    return path
+
+
+class SearchCache:
+    """A least recently used cache of search results for one grid epoch."""
+
+    def __init__(self, max_size):
+        """
+        Create a new SearchCache object.
+
+        :param max_size: the most results to keep
+        """
+        self._entries = OrderedDict()
+        self._max_size = max_size
+        self._epoch = None
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        """
+        Return the number of cached results.
+
+        :return: an int
+        """
+        return len(self._entries)
+
+    @property
+    def hits(self):
+        """
+        Getter for the number of lookups answered from the cache.
+
+        :return: an int
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        Getter for the number of lookups not found in the cache.
+
+        :return: an int
+        """
+        return self._misses
+
+    def get(self, key, epoch):
+        """
+        Look up a result.
+
+        :param key: the key the result was stored under
+        :param epoch: the current epoch of the grid, results stored under
+            any other epoch are dropped
+        :return: the cached result, or None
+        """
+        self._check_epoch(epoch)
+        result = self._entries.get(key)
+        if result is None:
+            self._misses += 1
+        else:
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return result
+
+    def put(self, key, epoch, result):
+        """
+        Store a result, evicting the least recently used if full.
+
+        :param key: the key to store the result under
+        :param epoch: the epoch of the grid the result was computed in
+        :param result: the result to store
+        """
+        self._check_epoch(epoch)
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached result."""
+        self._entries.clear()
+        self._epoch = None
+
+    def _check_epoch(self, epoch):
+        """Drop every cached result if the grid has changed."""
+        if epoch != self._epoch:
+            self._entries.clear()
+            self._epoch = epoch
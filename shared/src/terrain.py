@@ -20,13 +20,7 @@ class TerrainType(Enum):
         :param terrain_type: the type of the Terrain
         :return: movement cost for terrain type
         """
-        values = {
-            TerrainType.FLAT.value: 1,
-            TerrainType.HILL.value: 2,
-            TerrainType.MOUNTAIN.value: inf,
-            TerrainType.OCEAN.value: inf
-        }
-        return values[terrain_type.value]
+        return TERRAIN_MOVEMENT_COSTS[terrain_type.value]
 
     @staticmethod
     def vision_allowed(terrain_type):
@@ -36,9 +30,7 @@ class TerrainType(Enum):
         :param terrain_type: the terrain type to be checked
         :return: a boolean value indicating whether vision is allowed
         """
-        allowed = [TerrainType.FLAT,
-                   TerrainType.OCEAN]
-        return terrain_type in allowed
+        return VISION_ALLOWED[terrain_type.value]
 
 
 class BiomeType(Enum):
@@ -56,16 +48,78 @@ class BiomeType(Enum):
         :param biome_type: the type of the Terrain
         :return: movement cost for biome type
         """
-        values = {
-            BiomeType.TUNDRA.value: 2,
-            BiomeType.GRASSLAND.value: 0,
-            BiomeType.DESERT.value: 1
-        }
-        return values[biome_type.value]
+        return BIOME_MOVEMENT_COSTS[biome_type.value]
+
+
+def _by_value(enum, values):
+    """
+    Lay out a value for every member of an enum as a tuple.
+
+    :param enum: an Enum class whose values are 0, 1, 2, ...
+    :param values: dictionary of member to value
+    :return: a tuple holding the value of each member at its enum value
+    """
+    return tuple(values[member]
+                 for member in sorted(enum, key=lambda member: member.value))
+
+
+# Movement cost of each TerrainType, indexed by its value.
+TERRAIN_MOVEMENT_COSTS = _by_value(TerrainType, {
+    TerrainType.FLAT: 1,
+    TerrainType.HILL: 2,
+    TerrainType.MOUNTAIN: inf,
+    TerrainType.OCEAN: inf
+})
+
+# Whether vision passes over each TerrainType, indexed by its value.
+VISION_ALLOWED = _by_value(TerrainType, {
+    TerrainType.FLAT: True,
+    TerrainType.HILL: False,
+    TerrainType.MOUNTAIN: False,
+    TerrainType.OCEAN: True
+})
+
+# Extra movement cost of each BiomeType, indexed by its value.
+BIOME_MOVEMENT_COSTS = _by_value(BiomeType, {
+    BiomeType.TUNDRA: 2,
+    BiomeType.GRASSLAND: 0,
+    BiomeType.DESERT: 1
+})
+
+# Movement cost of a tile, indexed by TerrainType value then BiomeType
+# value.
+MOVEMENT_COSTS = tuple(tuple(terrain_cost + biome_cost
+                             for biome_cost in BIOME_MOVEMENT_COSTS)
+                       for terrain_cost in TERRAIN_MOVEMENT_COSTS)
 
 
 class Terrain:
-    """A class for a terrain object."""
+    """
+    A class for a terrain object.
+
+    Terrain without a resource is the same for every tile of its kind, so
+    Terrain.shared hands out one interned object per terrain type and
+    biome. Shared objects never hold a resource.
+    """
+
+    __slots__ = ('_terrain_type', '_biome', '_movement_cost', '_resource')
+
+    _shared = {}
+
+    @classmethod
+    def shared(cls, terrain_type, biome):
+        """
+        Get the interned terrain object of a terrain type and biome.
+
+        :param terrain_type: the terrain type
+        :param biome: the terrain biome
+        :return: a Terrain object without a resource
+        """
+        terrain = cls._shared.get((terrain_type, biome))
+        if terrain is None:
+            terrain = cls(terrain_type, biome)
+            cls._shared[(terrain_type, biome)] = terrain
+        return terrain
 
     def __init__(self, terrain_type, biome, resource=None):
         """
@@ -79,7 +133,8 @@ class Terrain:
         """
         self._terrain_type = terrain_type
         self._biome = biome
-        self._movement_cost = self.calculate_movement_cost()
+        self._movement_cost = \
+            MOVEMENT_COSTS[terrain_type.value][biome.value]
         self._resource = resource
 
     @property
@@ -116,7 +171,7 @@ class Terrain:
 
         :return: boolean value indicating vision allowed
         """
-        return TerrainType.vision_allowed(self._terrain_type)
+        return VISION_ALLOWED[self._terrain_type.value]
 
     @property
     def has_resource(self):
@@ -142,7 +197,10 @@ class Terrain:
         Set tile resource.
 
         :param resource: Resource object to be set
+        :raises AttributeError: if the terrain is shared
         """
+        if Terrain._shared.get((self._terrain_type, self._biome)) is self:
+            raise AttributeError("Shared terrain can not hold a resource.")
         self._resource = resource
 
     def calculate_movement_cost(self):
@@ -151,8 +209,7 @@ class Terrain:
 
         :return: The combined movement cost of the terrain_type and biome
         """
-        return TerrainType.get_movement_cost(self._terrain_type) + \
-            BiomeType.get_movement_cost(self._biome)
+        return MOVEMENT_COSTS[self._terrain_type.value][self._biome.value]
 
     def __repr__(self):
         """
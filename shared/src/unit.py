@@ -7,6 +7,10 @@ from mapresource import ResourceType
 class Unit:
     """Base class for the units."""
 
+    __slots__ = ('_health', '_max_health', '_level', '_movement',
+                 '_movement_range', '_cost', '_buy_cost', '_position', '_id',
+                 '_civ_id', '_actions')
+
     def __init__(self, identifier, health, level, movement_range, cost,
                  buy_cost, hextile, civilisation_id):
         """
@@ -289,6 +293,8 @@ class Unit:
 class Worker(Unit):
     """Worker class, for creating and upgrading buildings."""
 
+    __slots__ = ()
+
     def __init__(self, identifier, level, hex, civilisation_id):
         """
         Initialise workers attributes.
@@ -347,6 +353,8 @@ class Worker(Unit):
 class Soldier(Unit):
     """Soldier unit, for attacking other units and buildings."""
 
+    __slots__ = ('_strength', '_attack_range')
+
     def __init__(self, identifier, health, level, movement_range, strength,
                  attack_range, cost, buy_cost, hex, civilisation_id):
         """
@@ -425,6 +433,8 @@ class Soldier(Unit):
 class Swordsman(Soldier):
     """Close range soldier."""
 
+    __slots__ = ()
+
     def __init__(self, identifier, level, hex, civilisation_id):
         """
         Set Swordsman attributes according to level.
@@ -493,6 +503,8 @@ class Swordsman(Soldier):
 class Archer(Soldier):
     """Long range Soldier class."""
 
+    __slots__ = ()
+
     def __init__(self, identifier, level, hex, civilisation_id):
         """
         Set Archers attributes according to level.
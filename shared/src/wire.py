@@ -0,0 +1,188 @@
+"""
+Compact wire form of tiles and what is on them.
+
+Pickling a Hex pulls in its unit, whose position is another Hex, and its
+building, which for a City holds every Hex the city owns. Tiles are sent
+as flat tuples of ids instead:
+
+    tile      (x, y, z, terrain type, biome, resource, unit, building,
+               civ_id, city_id)
+    resource  (resource type, quantity, is worked) or None
+    unit      (unit type, id, level, health, movement, actions, civ_id)
+              or None, unit type as given by get_type
+    building  (building type, id, civ_id, city_id) or None
+
+Enums are sent as their values. A decoded tile is a detached Hex holding
+new unit and building objects, for the receiver to match up with its own
+grid by coordinates and ids.
+"""
+
+from building import Building, BuildingType
+from city import City
+from hexgrid import Hex, TileStore
+from mapresource import Resource, ResourceType
+from terrain import Terrain, TerrainType, BiomeType
+from unit import Worker, Archer, Swordsman
+
+# Unit classes by the value their get_type returns.
+UNIT_TYPES = {unit_type.get_type(): unit_type
+              for unit_type in [Worker, Archer, Swordsman]}
+
+
+def encode_resource(resource):
+    """
+    Get the wire form of a resource.
+
+    :param resource: a Resource object, or None
+    :return: a tuple, or None
+    """
+    if resource is None:
+        return None
+    return (resource.resource_type.value, resource.quantity,
+            resource.is_worked)
+
+
+def decode_resource(record):
+    """
+    Rebuild a resource from its wire form.
+
+    :param record: a tuple from encode_resource, or None
+    :return: a Resource object, or None
+    """
+    if record is None:
+        return None
+    resource_type, quantity, worked = record
+    resource = Resource(ResourceType(resource_type), quantity)
+    if worked:
+        resource.work()
+    return resource
+
+
+def encode_unit(unit):
+    """
+    Get the wire form of a unit, without its position.
+
+    :param unit: a Unit object, or None
+    :return: a tuple, or None
+    """
+    if unit is None:
+        return None
+    return (unit.get_type(), unit.id, unit.level, unit.health,
+            unit.movement, unit.actions, unit.civ_id)
+
+
+def decode_unit(record, hexagon):
+    """
+    Rebuild a unit from its wire form.
+
+    :param record: a tuple from encode_unit, or None
+    :param hexagon: the Hex the unit stands on
+    :return: a Unit object, or None
+    """
+    if record is None:
+        return None
+    unit_type, identifier, level, health, movement, actions, civ_id = record
+    unit = UNIT_TYPES[unit_type](identifier, level, hexagon, civ_id)
+    unit.health = health
+    unit.movement = movement
+    unit.actions = actions
+    return unit
+
+
+def encode_building(building):
+    """
+    Get the wire form of a building or city, without its tiles.
+
+    :param building: a Building or City object, or None
+    :return: a tuple, or None
+    """
+    if building is None:
+        return None
+    if isinstance(building, City):
+        return (BuildingType.CITY.value, building.id, building.civ_id, None)
+    return (building.building_type.value, building.id, building.civ_id,
+            building.city_id)
+
+
+def decode_building(record, hexagon):
+    """
+    Rebuild a building or city from its wire form.
+
+    A decoded City owns no tiles or buildings, the tiles it owns are
+    sent as tiles of their own carrying its city_id.
+
+    :param record: a tuple from encode_building, or None
+    :param hexagon: the Hex the building stands on
+    :return: a Building or City object, or None
+    """
+    if record is None:
+        return None
+    building_type, identifier, civ_id, city_id = record
+    if building_type == BuildingType.CITY.value:
+        return City(identifier, hexagon, civ_id)
+    return Building(identifier, BuildingType(building_type), hexagon,
+                    civ_id, city_id)
+
+
+def encode_tile(hexagon):
+    """
+    Get the wire form of a tile.
+
+    :param hexagon: a Hex object
+    :return: a tuple
+    """
+    terrain = hexagon.terrain
+    return (hexagon.x, hexagon.y, hexagon.z, terrain.terrain_type.value,
+            terrain.biome.value, encode_resource(hexagon.resource),
+            encode_unit(hexagon.unit), encode_building(hexagon.building),
+            hexagon.civ_id, hexagon.city_id)
+
+
+def decode_tile(record, tiles=None, index=0):
+    """
+    Rebuild a tile from its wire form, detached from any grid.
+
+    :param record: a tuple from encode_tile
+    :param tiles: the TileStore to hold the tile, a new single tile store
+        if None
+    :param index: the index of the tile in tiles
+    :return: a Hex object
+    """
+    (x, y, z, terrain_type, biome, resource, unit, building, civ_id,
+     city_id) = record
+    hexagon = Hex(x, y, z, tiles, index)
+    if resource is None:
+        hexagon.terrain = Terrain.shared(TerrainType(terrain_type),
+                                         BiomeType(biome))
+    else:
+        hexagon.terrain = Terrain(TerrainType(terrain_type),
+                                  BiomeType(biome), decode_resource(resource))
+    if unit is not None:
+        hexagon.unit = decode_unit(unit, hexagon)
+    if building is not None:
+        hexagon.building = decode_building(building, hexagon)
+    hexagon.civ_id = civ_id
+    hexagon.city_id = city_id
+    return hexagon
+
+
+def encode_tiles(hexagons):
+    """
+    Get the wire form of many tiles.
+
+    :param hexagons: iterable of Hex objects
+    :return: a list of tuples
+    """
+    return [encode_tile(hexagon) for hexagon in hexagons]
+
+
+def decode_tiles(records):
+    """
+    Rebuild many tiles from their wire form, sharing one tile store.
+
+    :param records: list of tuples from encode_tile
+    :return: a list of Hex objects, detached from any grid
+    """
+    tiles = TileStore(len(records))
+    return [decode_tile(record, tiles, index)
+            for index, record in enumerate(records)]
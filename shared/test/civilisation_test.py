@@ -129,9 +129,9 @@ class CivilisationTest(unittest.TestCase):
         hextile = Hex(0, 0, 0)
         hextile2 = Hex(1, 0, -1)
         hextile3 = Hex(1, 1, -2)
-        hextile._terrain = Terrain(TerrainType.FLAT, BiomeType.GRASSLAND)
-        hextile2._terrain = Terrain(TerrainType.HILL, BiomeType.GRASSLAND)
-        hextile3._terrain = Terrain(TerrainType.HILL, BiomeType.DESERT)
+        hextile.terrain = Terrain(TerrainType.FLAT, BiomeType.GRASSLAND)
+        hextile2.terrain = Terrain(TerrainType.HILL, BiomeType.GRASSLAND)
+        hextile3.terrain = Terrain(TerrainType.HILL, BiomeType.DESERT)
         # costs are 1, 2 and 3 respectively
         hexes = [hextile, hextile2, hextile3]
         archer = Archer(1, 1, hextile, "myCiv")
@@ -159,7 +159,6 @@ class CivilisationTest(unittest.TestCase):
         archer = Archer(1, 1, hextile, "myCiv")
         archer.health = 0
         civ.units[archer.id] = archer
-        archer._civilisation = civ
         civ.is_dead(archer)
 
         self.assertEqual(archer.health, 0)
@@ -304,3 +303,29 @@ class CivilisationTest(unittest.TestCase):
         civ.calculate_vision()
 
         self.assertEqual(len(civ._vision), 44)
+
+    def test_calculate_vision_reports_changes(self):
+        """Test only tiles entering or leaving vision are reported."""
+        grid = Grid(20)
+        grid.create_grid()
+        civ = Civilisation("myCiv", grid, logger)
+        worker = Worker("worker", 1, grid.get_hextile((0, 0, 0)), "myCiv")
+        civ.units[worker.id] = worker
+
+        visible, hidden = civ.calculate_vision()
+        self.assertEqual(len(visible), 37)
+        self.assertEqual(hidden, [])
+        self.assertEqual(civ.calculate_vision(), ([], []))
+
+        worker.position = grid.get_hextile((1, -1, 0))
+        visible, hidden = civ.calculate_vision()
+        self.assertEqual(len(visible), 7)
+        self.assertEqual(len(hidden), 7)
+        self.assertIn(grid.get_hextile((4, -4, 0)), visible)
+        self.assertIn(grid.get_hextile((-3, 3, 0)), hidden)
+        self.assertEqual(len(civ.vision), 37)
+
+        del civ.units[worker.id]
+        visible, hidden = civ.calculate_vision()
+        self.assertEqual(len(hidden), 37)
+        self.assertEqual(civ.vision, {})
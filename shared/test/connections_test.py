@@ -0,0 +1,210 @@
+"""connections unit testing."""
+
+import socket
+import threading
+import time
+import unittest
+from connections import Connection, FrameReader, NetworkException, \
+    FRAME_HEADER, MAX_FRAME, REPLY, UPDATE, write_frame
+
+
+class PairedConnection(Connection):
+    """A client Connection whose sockets are ends of socket pairs."""
+
+    def __init__(self, serve):
+        """
+        Create a connection to a fake server.
+
+        :param serve: function run in a thread with the server end of
+            every new socket
+        """
+        super().__init__("127.0.0.1", 0)
+        self._serve = serve
+        self.connects = 0
+
+    def _new_socket(self):
+        """Start a fake server on a new socket pair."""
+        client, server = socket.socketpair()
+        self.connects += 1
+        threading.Thread(target=self._serve, args=(server,),
+                         daemon=True).start()
+        return client
+
+
+def echo(server, requests=None):
+    """Reply to every request with its payload reversed."""
+    reader = FrameReader(server)
+    try:
+        while requests is None or requests > 0:
+            frame_type, flags, request_id, payload = reader.read_frame()
+            write_frame(server, REPLY, request_id, payload[::-1])
+            if requests is not None:
+                requests -= 1
+    except NetworkException:
+        pass
+    server.close()
+
+
+class ConnectionsTest(unittest.TestCase):
+    """Unittest class for connections."""
+
+    def test_requests_share_one_socket(self):
+        """Test many requests are carried by one connection."""
+        connection = PairedConnection(echo)
+        for i in range(5):
+            self.assertEqual(connection.request(b"move %i" % i),
+                             b"%i evom" % i)
+            self.assertEqual(connection.request(b"poll"), b"llop")
+        self.assertEqual(connection.connects, 1)
+        connection.close()
+        self.assertFalse(connection.is_open)
+
+    def test_replies_are_matched_by_request_id(self):
+        """Test replies sent out of order reach the right request."""
+        def reverse_order(server):
+            reader = FrameReader(server)
+            first = reader.read_frame()
+            second = reader.read_frame()
+            for frame_type, flags, request_id, payload in [second, first]:
+                write_frame(server, REPLY, request_id, payload)
+            echo(server)
+
+        connection = PairedConnection(reverse_order)
+        replies = {}
+
+        def ask(name):
+            replies[name] = connection.request(name.encode(), 5)
+
+        threads = [threading.Thread(target=ask, args=(name,))
+                   for name in ["actions", "updates"]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(replies, {"actions": b"actions",
+                                   "updates": b"updates"})
+
+    def test_reconnects_after_failure(self):
+        """Test a request after the server hangs up opens a new socket."""
+        connection = PairedConnection(lambda server: echo(server, 1))
+        self.assertEqual(connection.request(b"ab", 5), b"ba")
+        while connection.is_open:
+            time.sleep(0.01)
+        self.assertEqual(connection.request(b"cd", 5), b"dc")
+        self.assertEqual(connection.connects, 2)
+
+    def test_request_to_closed_port(self):
+        """Test a request that cannot connect raises NetworkException."""
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        port = listener.getsockname()[1]
+        listener.close()
+
+        class ClosedConnection(Connection):
+            """A client Connection to a port nothing listens on."""
+
+            connects = 0
+
+            def _new_socket(self):
+                """Try to connect to the closed port."""
+                self.connects += 1
+                return socket.create_connection(("127.0.0.1", port))
+
+        connection = ClosedConnection("127.0.0.1", port)
+        with self.assertRaises(NetworkException):
+            connection.request(b"refused", 5)
+        self.assertEqual(connection.connects, 2)
+        self.assertFalse(connection.is_open)
+
+    def test_lost_connection_fails_waiting_request(self):
+        """Test a request waiting for a reply is failed when the socket is."""
+        connection = PairedConnection(lambda server: echo(server, 0))
+        with self.assertRaises(NetworkException):
+            connection.request(b"lost", 5)
+
+    def test_updates_reach_handler(self):
+        """Test updates pushed by the server are passed to the handler."""
+        def push_then_echo(server):
+            reader = FrameReader(server)
+            frame_type, flags, request_id, payload = reader.read_frame()
+            write_frame(server, UPDATE, 0, b"update")
+            write_frame(server, REPLY, request_id, payload)
+            echo(server)
+
+        connection = PairedConnection(push_then_echo)
+        updates = []
+        connection.update_handler = updates.append
+        self.assertEqual(connection.request(b"subscribe", 5), b"subscribe")
+        self.assertEqual(updates, [b"update"])
+        self.assertEqual(connection.session, 1)
+        connection.close()
+
+    def test_failing_update_handler_keeps_connection(self):
+        """Test an update handler that raises does not stop replies."""
+        def push_then_echo(server):
+            reader = FrameReader(server)
+            frame_type, flags, request_id, payload = reader.read_frame()
+            write_frame(server, UPDATE, 0, b"update")
+            write_frame(server, REPLY, request_id, payload)
+            echo(server)
+
+        def fail(payload):
+            raise ValueError("bad update")
+
+        connection = PairedConnection(push_then_echo)
+        connection.update_handler = fail
+        with self.assertLogs("connections", "ERROR"):
+            self.assertEqual(connection.request(b"subscribe", 5),
+                             b"subscribe")
+        self.assertEqual(connection.request(b"later", 5), b"retal")
+        self.assertEqual(connection.connects, 1)
+        connection.close()
+
+    def test_send_timeout_shuts_connection_down(self):
+        """Test a frame the other party does not read gives up in time."""
+        client, server = socket.socketpair()
+        self.addCleanup(client.close)
+        self.addCleanup(server.close)
+        connection = Connection("127.0.0.1", 0, connection=server)
+        started = time.perf_counter()
+        with self.assertRaises((OSError, NetworkException)):
+            connection.send_frame(0, bytes(1 << 23), UPDATE, timeout=0.2)
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertFalse(connection.is_open)
+
+    def test_frames_of_every_size(self):
+        """Test frames smaller and larger than the read buffer arrive."""
+        first, second = socket.socketpair()
+        sizes = [0, 1, 9, 100, 5000, 70000, 300000]
+        payloads = [bytes([size % 251]) * size for size in sizes]
+
+        def send():
+            for request_id, payload in enumerate(payloads):
+                write_frame(first, REPLY, request_id, payload, 3)
+        thread = threading.Thread(target=send)
+        thread.start()
+        reader = FrameReader(second, 4096)
+        for request_id, payload in enumerate(payloads):
+            self.assertEqual(reader.read_frame(),
+                             (REPLY, 3, request_id, payload))
+        thread.join()
+        first.close()
+        with self.assertRaises(NetworkException):
+            reader.read_frame()
+        second.close()
+
+    def test_oversized_frame_is_refused(self):
+        """Test a header claiming a huge payload is refused unallocated."""
+        first, second = socket.socketpair()
+        first.sendall(FRAME_HEADER.pack(MAX_FRAME + 1, REPLY, 0, 1))
+        with self.assertRaises(NetworkException):
+            FrameReader(second).read_frame()
+        write_frame(first, REPLY, 2, bytes(17))
+        with self.assertRaises(NetworkException):
+            FrameReader(second, max_frame=16).read_frame()
+        first.close()
+        second.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
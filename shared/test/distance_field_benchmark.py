@@ -0,0 +1,51 @@
+"""Compare one multi-source distance field against a search per source."""
+
+import random
+import timeit
+from math import inf
+import pathfinding
+from hexgrid import Grid
+
+
+def nearest_by_search(grid, sources):
+    """Find the cost from the nearest source with one search per source."""
+    distances = [inf] * len(grid.tiles)
+    for source in sources:
+        previous, costs = pathfinding.dijkstra(
+            grid.neighbours, grid.tiles.movement_costs, source, inf)
+        for index, cost in costs.items():
+            if cost < distances[index]:
+                distances[index] = cost
+    return distances
+
+
+def nearest_by_field(grid, sources):
+    """Find the cost from the nearest source with one seeded search."""
+    return pathfinding.distance_field(
+        grid.neighbours, grid.tiles.movement_costs, sources)[0]
+
+
+def main():
+    """Benchmark both approaches for a range of map and source counts."""
+    for size in [20, 100, 200]:
+        grid = Grid(size)
+        grid.create_grid()
+        grid.static_map()
+        passable = [index for index in range(len(grid.tiles))
+                    if grid.tiles.movement_costs[index] != inf]
+        for count in [1, 10, 50]:
+            sources = random.Random(count).sample(passable, count)
+            number = 3
+            searches = timeit.timeit(
+                lambda: nearest_by_search(grid, sources),
+                number=number) / number
+            field = timeit.timeit(lambda: nearest_by_field(grid, sources),
+                                  number=number) / number
+            print("%-6s sources: %3i  per source: %9.2f ms  "
+                  "field: %8.2f ms  speedup: %6.1fx"
+                  % (size, count, searches * 1000, field * 1000,
+                     searches / field))
+
+
+if __name__ == "__main__":
+    main()
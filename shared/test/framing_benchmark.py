@@ -0,0 +1,83 @@
+"""Compare binary buffered framing against the old ASCII framing."""
+
+import socket
+import threading
+import time
+from connections import FrameReader, REPLY, write_frame
+
+SIZES = [("1 KB", 1024), ("100 KB", 100 * 1024), ("10 MB", 10 * 1024 ** 2)]
+
+# Payloads above this size take too long to read the old way.
+OLD_LIMIT = 1024 ** 2
+
+
+def old_send(sock, payload):
+    """Send a frame the way Connection.send used to."""
+    sock.sendall("{:16}".format(len(payload)).encode() + payload)
+
+
+def old_recv(sock):
+    """Receive a frame the way Connection.recv used to, 16 bytes a time."""
+    amount_expected = int(sock.recv(16).decode())
+    amount_received = 0
+    message = b""
+    while amount_received < amount_expected:
+        data = sock.recv(16)
+        message += data
+        amount_received += len(data)
+    return message
+
+
+def new_send(sock, payload):
+    """Send a frame with the binary header."""
+    write_frame(sock, REPLY, 1, payload)
+
+
+def time_frames(send, recv, payload, count):
+    """
+    Time sending frames over a socket pair.
+
+    :return: the mean seconds per frame
+    """
+    first, second = socket.socketpair()
+
+    def sender():
+        for i in range(count):
+            send(first, payload)
+    thread = threading.Thread(target=sender)
+    start = time.perf_counter()
+    thread.start()
+    for i in range(count):
+        recv(second)
+    elapsed = time.perf_counter() - start
+    thread.join()
+    first.close()
+    second.close()
+    return elapsed / count
+
+
+def main():
+    """Benchmark frames of 1 KB, 100 KB and 10 MB."""
+    for name, size in SIZES:
+        payload = bytes(size)
+        count = max(1, 2 * 1024 ** 2 // size)
+        if size <= OLD_LIMIT:
+            old = time_frames(old_send, old_recv, payload, count)
+            old_text = "%10.1f us" % (old * 1e6)
+        else:
+            old = None
+            old_text = "%13s" % "too slow"
+        reader = {}
+
+        def new_recv(sock):
+            if sock not in reader:
+                reader[sock] = FrameReader(sock)
+            return reader[sock].read_frame()
+        new = time_frames(new_send, new_recv, payload, count)
+        print("%-7s old: %s  new: %10.1f us  %8.1f MB/s%s"
+              % (name, old_text, new * 1e6, size / new / 1024 ** 2,
+                 "" if old is None else "  speedup: %6.1fx" % (old / new)))
+
+
+if __name__ == "__main__":
+    main()
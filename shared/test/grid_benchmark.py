@@ -0,0 +1,252 @@
+"""
+Micro-benchmarks of Grid map building, lookups, vision and path finding.
+
+Run from this directory with the shared sources on the path:
+
+    PYTHONPATH=../src python grid_benchmark.py --output results.json
+    PYTHONPATH=../src python grid_benchmark.py --compare results.json
+
+Every benchmark is timed on maps of each size, with and without units
+spread over the map. Search and vision caches are cleared before every
+call, so the times are for uncached work. Comparing against an earlier
+results file exits with status 1 if any benchmark got slower than the
+threshold allows.
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+import timeit
+from math import inf
+from hexgrid import Grid
+from unit import Worker
+
+SIZES = [20, 50, 100, 200, 400]
+
+# Tiles sampled as the centres, starts and ends of queries.
+SAMPLES = 64
+
+# Fraction of passable tiles given a unit in the "units" runs.
+UNIT_DENSITY = 0.1
+
+
+def build_grid(size, units):
+    """
+    Create a static map, optionally with units on it.
+
+    :param size: the size of the grid
+    :param units: True to put a unit on a share of the passable tiles
+    :return: a Grid object
+    """
+    grid = Grid(size)
+    grid.create_grid()
+    grid.static_map()
+    if units:
+        rand = random.Random(size)
+        passable = [index for index in range(len(grid.tiles))
+                    if grid.tiles.movement_costs[index] != inf]
+        for unit_id, index in enumerate(rand.sample(
+                passable, int(len(passable) * UNIT_DENSITY))):
+            hexagon = grid.hex_at(index)
+            hexagon.unit = Worker(unit_id, 1, hexagon, 1)
+    return grid
+
+
+def create_grid(grid, samples):
+    """Benchmark laying out a new grid of the same size."""
+    size = grid.size
+    return lambda: Grid(size).create_grid()
+
+
+def static_map(grid, samples):
+    """Benchmark generating the static map on a laid out grid."""
+    fresh = Grid(grid.size)
+    fresh.create_grid()
+    return fresh.static_map
+
+
+def get_hextile(grid, samples):
+    """Benchmark looking up coordinates on the map."""
+    coords = itertools.cycle([hexagon.coords for hexagon in samples])
+    return lambda: grid.get_hextile(next(coords))
+
+
+def get_hextile_wrapped(grid, samples):
+    """Benchmark looking up coordinates off the map, which wrap."""
+    shift = grid.size + 1
+    coords = itertools.cycle([(x + shift, y - shift, z)
+                              for x, y, z in (hexagon.coords
+                                              for hexagon in samples)])
+    return lambda: grid.get_hextile(next(coords))
+
+
+def get_all_neighbours(grid, samples):
+    """Benchmark getting the six neighbours of a tile."""
+    tiles = itertools.cycle(samples)
+    return lambda: grid.get_all_neighbours(next(tiles))
+
+
+def spiral_ring(grid, samples):
+    """Benchmark a radius 4 spiral, as used when destroying a city."""
+    tiles = itertools.cycle(samples)
+    return lambda: grid.spiral_ring(next(tiles), 4)
+
+
+def vision(grid, samples):
+    """Benchmark radius 3 vision, as used for units and cities."""
+    tiles = itertools.cycle(samples)
+    cache = grid.vision_cache
+
+    def run():
+        cache.clear()
+        grid.vision(next(tiles), 3)
+    return run
+
+
+def dijkstra(grid, samples):
+    """Benchmark finding every tile reachable with 5 movement."""
+    tiles = itertools.cycle(samples)
+    cache = grid.search_cache
+
+    def run():
+        cache.clear()
+        grid.dijkstra(next(tiles), 5)
+    return run
+
+
+def shortest_path(grid, samples):
+    """Benchmark finding paths between tiles up to 10 apart."""
+    pairs = []
+    for start in samples:
+        end = min(samples, key=lambda end: abs(
+            grid.wrapped_hex_distance(start, end) - 10))
+        pairs.append((start, end))
+    pairs = itertools.cycle(pairs)
+    cache = grid.search_cache
+
+    def run():
+        cache.clear()
+        grid.shortest_path(*next(pairs), 30)
+    return run
+
+
+# Benchmarks by name, with whether units on the map matter to them.
+BENCHMARKS = [
+    ("create_grid", create_grid, False),
+    ("static_map", static_map, False),
+    ("get_hextile", get_hextile, True),
+    ("get_hextile_wrapped", get_hextile_wrapped, True),
+    ("get_all_neighbours", get_all_neighbours, True),
+    ("spiral_ring", spiral_ring, True),
+    ("vision", vision, True),
+    ("dijkstra", dijkstra, True),
+    ("shortest_path", shortest_path, True),
+]
+
+
+def measure(function, repeat):
+    """
+    Time a function, taking the best of several runs.
+
+    :param function: the function to time
+    :param repeat: the number of runs
+    :return: the best mean time of one call, in seconds
+    """
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    times = [elapsed] + timer.repeat(repeat=repeat - 1, number=number)
+    return min(times) / number
+
+
+def run(sizes, repeat, names):
+    """
+    Run the benchmarks.
+
+    :param sizes: list of grid sizes
+    :param repeat: the number of runs of each benchmark
+    :param names: the benchmark names to run, all if empty
+    :return: dictionary of "name/size/layout" to seconds per call
+    """
+    results = {}
+    for size in sizes:
+        for units in [False, True]:
+            layout = "units" if units else "empty"
+            grid = build_grid(size, units)
+            rand = random.Random(0)
+            samples = [grid.hex_at(index) for index in
+                       rand.sample(range(len(grid.tiles)), SAMPLES)]
+            for name, benchmark, uses_units in BENCHMARKS:
+                if names and name not in names or units and not uses_units:
+                    continue
+                key = "%s/%i/%s" % (name, size, layout)
+                results[key] = measure(benchmark(grid, samples), repeat)
+                print("%-32s %12.2f us" % (key, results[key] * 1e6))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline and report regressions.
+
+    :param results: dictionary of "name/size/layout" to seconds per call
+    :param baseline: dictionary in the same form from an earlier run
+    :param threshold: the largest allowed slowdown, 0.2 for 20%
+    :return: list of the keys that regressed past the threshold
+    """
+    regressions = []
+    print()
+    print("%-32s %12s %12s %8s" % ("benchmark", "baseline", "now",
+                                   "change"))
+    for key, seconds in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        change = seconds / before - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(key)
+            flag = "  REGRESSED"
+        print("%-32s %9.2f us %9.2f us %+7.1f%%%s"
+              % (key, before * 1e6, seconds * 1e6, change * 100, flag))
+    return regressions
+
+
+def main(argv=None):
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="grid sizes to benchmark")
+    parser.add_argument("--only", nargs="+", default=[],
+                        help="names of the benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs of each benchmark, the best is kept")
+    parser.add_argument("--output", help="file to write results to as JSON")
+    parser.add_argument("--compare",
+                        help="JSON results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="slowdown allowed by --compare, 0.25 is 25%%")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.only)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"python": platform.python_version(),
+                       "machine": platform.machine(),
+                       "results": results}, output, indent=2,
+                      sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline)["results"],
+                                  args.threshold)
+        if regressions:
+            print("%i benchmarks regressed by more than %.0f%%"
+                  % (len(regressions), args.threshold * 100))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
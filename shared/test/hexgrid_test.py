@@ -1,10 +1,29 @@
 """hexgrid unit testing."""
 
+import pickle
 import unittest
-from hexgrid import Grid, Hex
+from fractions import Fraction
+from math import inf
+from hexgrid import Grid, Hex, hex_line
+from mapresource import Resource, ResourceType
 from terrain import Terrain, TerrainType, BiomeType
 
 
+def mirror_scan_wrap(grid, coordinates):
+    """Wrap coordinates by repeatedly subtracting the nearest mirror."""
+    radius = grid.size // 2
+    while max(abs(c) for c in coordinates) > radius:
+        nearest = grid.mirrors[0]
+        last_distance = grid.hex_distance_coordinates(coordinates, nearest)
+        for mirror in grid.mirrors[1:]:
+            distance = grid.hex_distance_coordinates(coordinates, mirror)
+            if distance <= last_distance:
+                nearest = mirror
+                last_distance = distance
+        coordinates = tuple(c - m for c, m in zip(coordinates, nearest))
+    return coordinates
+
+
 class HexGridTest(unittest.TestCase):
     """Unittest class for hexgrid."""
 
@@ -33,6 +52,67 @@ class HexGridTest(unittest.TestCase):
         grid.create_grid()
         self.assertEqual(len(grid._hextiles), 19)
 
+    def test_tile_index_round_trip(self):
+        """Test flat tile indices map back to their coordinates."""
+        grid = Grid(7)
+        grid.create_grid()
+        for index in range(len(grid.tiles)):
+            coordinates = grid.tile_coordinates(index)
+            self.assertEqual(grid.tile_index(coordinates), index)
+            self.assertEqual(grid.hex_at(index).coords, coordinates)
+
+    def test_hex_is_view_over_tile_store(self):
+        """Test hex state is stored in the grid's tile arrays."""
+        grid = Grid(5)
+        grid.create_grid()
+        hexagon = grid.get_hextile((1, -1, 0))
+        hexagon.terrain = Terrain(TerrainType.HILL, BiomeType.DESERT)
+        index = grid.tile_index((1, -1, 0))
+        self.assertIs(grid.get_hextile((1, -1, 0)), hexagon)
+        self.assertEqual(grid.tiles.terrain_types[index],
+                         TerrainType.HILL.value)
+        self.assertEqual(grid.tiles.movement_costs[index], 3)
+        self.assertFalse(hexagon.vision)
+
+    def test_tiles_share_terrain_without_resources(self):
+        """Test tiles of a kind share a Terrain unless holding a resource."""
+        grid = Grid(5)
+        grid.create_grid()
+        first = grid.get_hextile((1, -1, 0))
+        second = grid.get_hextile((0, 1, -1))
+        self.assertIs(first.terrain, second.terrain)
+        second.resource = Resource(ResourceType.IRON, 1)
+        self.assertIsNot(first.terrain, second.terrain)
+        self.assertIs(second.terrain.resource, second.resource)
+        self.assertIsNone(first.terrain.resource)
+
+    def test_pickled_hex_is_detached(self):
+        """Test pickling a grid hex does not carry the grid with it."""
+        grid = Grid(5)
+        grid.create_grid()
+        hexagon = grid.get_hextile((1, -1, 0))
+        hexagon.civ_id = 3
+        copy = pickle.loads(pickle.dumps(hexagon))
+        copy.civ_id = 4
+        self.assertEqual(copy, hexagon)
+        self.assertIsNot(copy._tiles, grid.tiles)
+        self.assertEqual(hexagon.civ_id, 3)
+
+    def test_detached_hexes_share_a_store(self):
+        """Test hexes not on a grid share one store and reuse its tiles."""
+        first = Hex(0, 0, 0)
+        second = Hex(1, 0, -1)
+        self.assertIs(first._tiles, second._tiles)
+        second.terrain = Terrain(TerrainType.HILL, BiomeType.DESERT)
+        second.civ_id = 2
+        self.assertIsNone(first.civ_id)
+        index = second._index
+        del second
+        third = Hex(1, -1, 0)
+        self.assertEqual(third._index, index)
+        self.assertIsNone(third.civ_id)
+        self.assertEqual(third.terrain.terrain_type, TerrainType.FLAT)
+
     def test_adding_hex_to_hex(self):
         """Test adding hexs."""
         grid = Grid(5)
@@ -68,6 +148,20 @@ class HexGridTest(unittest.TestCase):
                   Hex(0, 0, 0), Hex(0, -1, 1), Hex(1, -2, 1)]
         self.assertEqual(grid.get_all_neighbours(hex_a), result)
 
+    def test_neighbour_table_matches_wrapped_coordinates(self):
+        """Test the neighbour table agrees with wrapped coordinate lookups."""
+        grid = Grid(7)
+        grid.create_grid()
+        offsets = [(1, -1, 0), (1, 0, -1), (0, 1, -1),
+                   (-1, 1, 0), (-1, 0, 1), (0, -1, 1)]
+        for index in range(len(grid.tiles)):
+            x, y, z = grid.tile_coordinates(index)
+            expected = [grid.get_hextile((x + dx, y + dy, z + dz))
+                        for dx, dy, dz in offsets]
+            neighbours = [grid.hex_at(i)
+                          for i in grid.neighbour_indices(index)]
+            self.assertEqual(neighbours, expected)
+
     def test_getting_neighbour_of_hex_in_direction(self):
         """Test get neighbour in direction."""
         grid = Grid(5)
@@ -110,6 +204,14 @@ class HexGridTest(unittest.TestCase):
         result = 4
         self.assertEqual(grid.hex_distance(hex_a, hex_b), result)
 
+    def test_wrapped_distance_between_hexes(self):
+        """Test distance between hexs across the edge of the map."""
+        grid = Grid(5)
+        grid.create_grid()
+        hex_a = grid.get_hextile((-2, 0, 2))
+        hex_b = grid.get_hextile((2, -2, 0))
+        self.assertEqual(grid.wrapped_hex_distance(hex_a, hex_b), 1)
+
     def test_hex_rounding(self):
         """Test coordinate rounding."""
         grid = Grid(5)
@@ -148,6 +250,29 @@ class HexGridTest(unittest.TestCase):
                   Hex(2, 0, -2)]
         self.assertEqual(grid.hex_linedraw(hex_a, hex_b), result)
 
+    def test_hex_line_rounds_exactly(self):
+        """Test integer lines match exact fractional interpolation."""
+        grid = Grid(5)
+        points = [(x, y, -x - y) for x in range(-6, 7)
+                  for y in range(-6, 7) if abs(x + y) <= 6]
+        start = Hex(2, -5, 3)
+        for end in points:
+            distance = int(grid.hex_distance(start, Hex(*end)))
+            length = max(distance, 1)
+            expected = [grid.hex_round([
+                Fraction(a * (length - step) + b * step, length)
+                for a, b in zip(start.coords, end)])
+                for step in range(distance + 1)]
+            self.assertEqual(hex_line(start.coords, end), expected)
+
+    def test_line_indices_wrap(self):
+        """Test lines over the edge of the map wrap onto it."""
+        grid = Grid(5)
+        grid.create_grid()
+        line = grid.line_indices(Hex(2, 0, -2), Hex(4, 0, -4))
+        self.assertEqual(line, [grid.tile_index(coords) for coords in
+                                [(2, 0, -2), (-2, 2, 0), (-1, 2, -1)]])
+
     def test_single_ring(self):
         """Test single ring."""
         grid = Grid(7)
@@ -210,6 +335,21 @@ class HexGridTest(unittest.TestCase):
         result = (0, -2, 2)
         self.assertEqual(grid.wrap_around(coordinates), result)
 
+    def test_wrapped_index_matches_mirror_scan(self):
+        """Test constant time wrapping against the mirror scan."""
+        for size in [1, 2, 5, 7, 20, 21]:
+            grid = Grid(size)
+            grid.create_grid()
+            reach = 3 * (size // 2) + 3
+            for x in range(-reach, reach + 1):
+                for y in range(-reach, reach + 1):
+                    coordinates = (x, y, -x - y)
+                    expected = mirror_scan_wrap(grid, coordinates)
+                    self.assertEqual(grid.wrap_around(coordinates),
+                                     expected)
+                    self.assertEqual(grid.get_hextile(coordinates).coords,
+                                     expected)
+
     def test_vision(self):
         """Test vision."""
         grid = Grid(5)
@@ -227,6 +367,30 @@ class HexGridTest(unittest.TestCase):
                   Hex(0, 1, -1)]
         self.assertEqual(set(grid.vision(hexagon, 2)), set(result))
 
+    def test_vision_cache_invalidated_by_terrain_change(self):
+        """Test cached vision is recomputed once terrain changes."""
+        grid = Grid(7)
+        grid.create_grid()
+        centre = grid.get_hextile((0, 0, 0))
+        self.assertEqual(len(grid.vision(centre, 2)), 19)
+        grid.get_hextile((1, -1, 0)).terrain = Terrain(TerrainType.MOUNTAIN,
+                                                       BiomeType.GRASSLAND)
+        visible = grid.vision(centre, 2)
+        self.assertIn(grid.get_hextile((1, -1, 0)), visible)
+        self.assertNotIn(grid.get_hextile((2, -2, 0)), visible)
+        grid.get_hextile((0, 0, 0)).unit = None
+        self.assertEqual(grid.vision_cache.hits, 0)
+        grid.vision(centre, 2)
+        self.assertEqual(grid.vision_cache.hits, 1)
+
+    def test_vision_skips_rays_wrapping_over_edge(self):
+        """Test vision at the edge of the map does not wrap around."""
+        grid = Grid(7)
+        grid.create_grid()
+        visible = grid.vision(grid.get_hextile((3, -3, 0)), 2)
+        for tile in visible:
+            self.assertLessEqual(grid.hex_distance(tile, Hex(3, -3, 0)), 2)
+
     def test_dijkstra(self):
         """Test dijkstras."""
         grid = Grid(5)
@@ -253,6 +417,113 @@ class HexGridTest(unittest.TestCase):
         result = set(result).difference(dijkstra)
         self.assertEqual(set(), result)
 
+    def test_dijkstra_cache_invalidated_by_unit_move(self):
+        """Test cached reachable tiles are recomputed once a unit moves."""
+        grid = Grid(5)
+        grid.create_grid()
+        hexagon = grid.get_hextile((-1, 1, 0))
+        first = grid.dijkstra(hexagon, 1)
+        grid.dijkstra(hexagon, 1)
+        self.assertEqual(grid.search_cache.hits, 1)
+        grid.get_hextile((0, 1, -1)).unit = "unit"
+        second = grid.dijkstra(hexagon, 1)
+        self.assertIn(Hex(0, 1, -1), first)
+        self.assertNotIn(Hex(0, 1, -1), second)
+        self.assertEqual(grid.search_cache.misses, 2)
+
+    def test_ring_templates_match_neighbour_walk(self):
+        """Test rings from offset templates follow neighbours round edges."""
+        grid = Grid(9)
+        grid.create_grid()
+        centre = grid.get_hextile((3, -4, 1))
+        for radius in range(7):
+            tile = grid.get_hextile((3 - radius, -4, 1 + radius))
+            walk = []
+            for side in range(6):
+                for step in range(radius):
+                    walk.append(tile)
+                    tile = grid.get_neighbour_in_direction(tile, side)
+            self.assertEqual(grid.single_ring(centre, radius), walk)
+        self.assertIs(grid.ring_template(3), grid.ring_template(3))
+        spiral = grid.spiral_ring(centre, 3)
+        self.assertEqual(len(spiral), 37)
+        self.assertIs(spiral[-1], centre)
+
+    def test_path_cost(self):
+        """Test path cost sums the cost of entering every hex."""
+        grid = Grid(5)
+        grid.create_grid()
+        grid.get_hextile((1, -1, 0)).terrain = Terrain(TerrainType.HILL,
+                                                       BiomeType.DESERT)
+        detached = Hex(6, -6, 0)
+        detached.terrain = Terrain(TerrainType.HILL, BiomeType.TUNDRA)
+        path = [grid.get_hextile((1, 0, -1)), grid.get_hextile((1, -1, 0)),
+                detached]
+        self.assertEqual(grid.path_cost(path), 1 + 3 + 4)
+        self.assertEqual(grid.path_cost([]), 0)
+
+    def test_distance_field(self):
+        """Test distance fields are measured from the nearest hex."""
+        grid = Grid(9)
+        grid.create_grid()
+        grid.get_hextile((1, 0, -1)).terrain = Terrain(TerrainType.HILL,
+                                                       BiomeType.DESERT)
+        first = grid.get_hextile((0, 0, 0))
+        second = Hex(3, 0, -3)
+        distances, nearest = grid.distance_field([first, second], 3)
+        self.assertEqual(distances[grid.tile_index((1, 0, -1))], 3)
+        self.assertEqual(nearest[grid.tile_index((1, 0, -1))],
+                         grid.hex_index(first))
+        self.assertEqual(distances[grid.tile_index((2, 0, -2))], 1)
+        self.assertEqual(nearest[grid.tile_index((2, 0, -2))],
+                         grid.hex_index(second))
+        self.assertEqual(distances[grid.tile_index((-4, 0, 4))], inf)
+        self.assertEqual(nearest[grid.tile_index((-4, 0, 4))], -1)
+        distances[0] = -1
+        self.assertNotEqual(grid.distance_field([first, second], 3)[0][0],
+                            -1)
+
+    def test_changed_since_follows_tile_changes(self):
+        """Test every kind of tile change is recorded in the journal."""
+        grid = Grid(9)
+        grid.create_grid()
+        start = grid.version
+        self.assertEqual(grid.changed_since(start), [])
+        tiles = [grid.get_hextile(coords) for coords in
+                 [(2, -1, -1), (0, 0, 0), (-3, 1, 2), (1, 1, -2),
+                  (0, -4, 4)]]
+        tiles[0].unit = "unit"
+        tiles[1].building = "building"
+        tiles[2].civ_id = 1
+        tiles[3].city_id = 2
+        tiles[4].resource = Resource(ResourceType.GEMS, 1)
+        self.assertEqual(grid.changed_since(start), sorted(
+            tiles, key=grid.hex_index))
+        middle = grid.version
+        tiles[4].resource_worked = True
+        self.assertTrue(tiles[4].resource.is_worked)
+        self.assertEqual(grid.changed_since(middle), [tiles[4]])
+        self.assertEqual(grid.tile_version(tiles[4]), grid.version)
+        self.assertEqual(grid.tile_version(grid.get_hextile((4, 0, -4))), 0)
+
+    def test_changed_since_outlives_journal(self):
+        """Test old versions are answered after the journal is trimmed."""
+        grid = Grid(5)
+        grid.create_grid()
+        tile = grid.get_hextile((1, 0, -1))
+        tile.civ_id = 1
+        start = grid.version
+        other = grid.get_hextile((0, 2, -2))
+        for i in range(2000):
+            other.civ_id = i
+        self.assertEqual(grid.changed_since(start), [other])
+        self.assertEqual(grid.changed_since(start - 1), sorted(
+            [tile, other], key=grid.hex_index))
+        grid.set_layers(grid.tiles.terrain_types, grid.tiles.biomes,
+                        grid.tiles.resources)
+        self.assertEqual(len(grid.changed_since(grid.version - 1)),
+                         len(grid.tiles))
+
     def test_shortest_path(self):
         """Test shortest path."""
         grid = Grid(5)
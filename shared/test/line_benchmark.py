@@ -0,0 +1,48 @@
+"""Compare integer line drawing against float interpolation."""
+
+import random
+import timeit
+from hexgrid import Grid, Hex
+
+
+def float_line(grid, hex_a, hex_b):
+    """Draw a line the way hex_linedraw used to, rounding floats."""
+    distance = int(grid.hex_distance(hex_a, hex_b))
+    jump = 1 / max(distance, 1)
+    return [grid.get_hextile(grid.hex_round(
+        grid.hex_interpolate(hex_a, hex_b, jump * i)))
+        for i in range(distance + 1)]
+
+
+def main():
+    """Benchmark lines of a range of lengths on a radius 100 map."""
+    grid = Grid(200)
+    grid.create_grid()
+    rand = random.Random(0)
+    for length in [3, 10, 50]:
+        pairs = []
+        for i in range(200):
+            x, y = rand.randint(-50, 50), rand.randint(-50, 50)
+            dx = rand.randint(-length, length)
+            dy = rand.randint(max(-length, -dx - length),
+                              min(length, -dx + length))
+            pairs.append((Hex(x, y, -x - y),
+                          Hex(x + dx, y + dy, -x - y - dx - dy)))
+        number = 20
+        floats = timeit.timeit(
+            lambda: [float_line(grid, a, b) for a, b in pairs],
+            number=number) / number / len(pairs)
+        views = timeit.timeit(
+            lambda: [grid.hex_linedraw(a, b) for a, b in pairs],
+            number=number) / number / len(pairs)
+        indices = timeit.timeit(
+            lambda: [grid.line_indices(a, b) for a, b in pairs],
+            number=number) / number / len(pairs)
+        print("length <= %2i  float: %7.2f us  hex_linedraw: %7.2f us  "
+              "line_indices: %7.2f us  speedup: %4.1fx"
+              % (length, floats * 1e6, views * 1e6, indices * 1e6,
+                 floats / indices))
+
+
+if __name__ == "__main__":
+    main()
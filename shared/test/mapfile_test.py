@@ -0,0 +1,71 @@
+"""mapfile unit testing."""
+
+import os
+import tempfile
+import unittest
+import mapfile
+import mapgen
+from hexgrid import Grid
+from terrain import Terrain, TerrainType, BiomeType
+
+
+class MapfileTest(unittest.TestCase):
+    """Unittest class for mapfile."""
+
+    def setUp(self):
+        """Create a seeded map."""
+        self.grid = Grid(20)
+        self.grid.create_grid()
+        mapgen.generate_map(self.grid, 3)
+
+    def assertSameMap(self, grid, other):
+        """Assert two grids hold the same terrain and resources."""
+        self.assertEqual(grid.size, other.size)
+        self.assertEqual(grid.tiles.terrain_types, other.tiles.terrain_types)
+        self.assertEqual(grid.tiles.biomes, other.tiles.biomes)
+        self.assertEqual(grid.tiles.movement_costs,
+                         other.tiles.movement_costs)
+        self.assertEqual(grid.tiles.visions, other.tiles.visions)
+        self.assertEqual(
+            [resource and resource.resource_type
+             for resource in grid.tiles.resources],
+            [resource and resource.resource_type
+             for resource in other.tiles.resources])
+
+    def test_snapshot_round_trip(self):
+        """Test a grid loaded from a snapshot matches the original."""
+        snapshot = mapfile.dumps(self.grid)
+        self.assertEqual(len(snapshot),
+                         mapfile.HEADER.size + 3 * len(self.grid.tiles))
+        self.assertSameMap(mapfile.loads(snapshot), self.grid)
+
+    def test_snapshot_file_round_trip(self):
+        """Test saving a snapshot and mapping it back in."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "map.hexmap")
+            digest = mapfile.save(self.grid, path)
+            self.assertEqual(digest, mapfile.digest(self.grid))
+            self.assertSameMap(mapfile.load(path, digest), self.grid)
+
+    def test_digest_follows_content(self):
+        """Test the digest changes with the terrain of the map."""
+        digest = mapfile.digest(self.grid)
+        self.grid.get_hextile((0, 0, 0)).terrain = \
+            Terrain(TerrainType.MOUNTAIN, BiomeType.TUNDRA)
+        self.assertNotEqual(mapfile.digest(self.grid), digest)
+
+    def test_damaged_snapshot_is_rejected(self):
+        """Test truncated, altered and unexpected snapshots raise."""
+        snapshot = mapfile.dumps(self.grid)
+        with self.assertRaises(ValueError):
+            mapfile.loads(snapshot[:-1])
+        damaged = bytearray(snapshot)
+        damaged[-1] ^= 1
+        with self.assertRaises(ValueError):
+            mapfile.loads(bytes(damaged))
+        with self.assertRaises(ValueError):
+            mapfile.loads(snapshot, "0" * 64)
+
+
+if __name__ == '__main__':
+    unittest.main()
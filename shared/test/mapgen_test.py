@@ -0,0 +1,66 @@
+"""mapgen unit testing."""
+
+import unittest
+import mapgen
+from hexgrid import Grid
+from terrain import TerrainType
+
+
+def generated_grid(size, seed=None):
+    """Create a grid with generated terrain."""
+    grid = Grid(size)
+    grid.create_grid()
+    mapgen.generate_map(grid, seed)
+    return grid
+
+
+def layers(grid):
+    """Get the terrain, biome and resource type of every tile."""
+    return [(tile.terrain.terrain_type, tile.terrain.biome,
+             tile.resource.resource_type if tile.resource else None)
+            for tile in map(grid.hex_at, range(len(grid.tiles)))]
+
+
+class MapgenTest(unittest.TestCase):
+    """Unittest class for mapgen."""
+
+    def test_static_layers_match_static_map(self):
+        """Test the vectorised static map matches the per tile one."""
+        for size in [5, 20, 41]:
+            grid = Grid(size)
+            grid.create_grid()
+            grid.static_map()
+            generated = generated_grid(size)
+            self.assertEqual(layers(generated), layers(grid))
+            self.assertEqual(generated.tiles.movement_costs,
+                             grid.tiles.movement_costs)
+            self.assertEqual(generated.tiles.visions, grid.tiles.visions)
+
+    def test_seeded_map_is_repeatable(self):
+        """Test the same seed always gives the same map."""
+        self.assertEqual(layers(generated_grid(40, 7)),
+                         layers(generated_grid(40, 7)))
+        self.assertNotEqual(layers(generated_grid(40, 7)),
+                            layers(generated_grid(40, 8)))
+
+    def test_seeded_map_keeps_start_locations_flat(self):
+        """Test start locations and edges are fixed on a seeded map."""
+        for seed in range(5):
+            grid = generated_grid(20, seed)
+            for location in mapgen.START_LOCATIONS:
+                tile = grid.get_hextile(location)
+                self.assertEqual(tile.terrain.terrain_type, TerrainType.FLAT)
+                self.assertIsNone(tile.resource)
+            edge = grid.get_hextile((10, -10, 0))
+            self.assertEqual(edge.terrain.terrain_type, TerrainType.OCEAN)
+
+    def test_hash_noise_is_uniform(self):
+        """Test hashed values cover [0, 1) evenly."""
+        xs, ys, zs = mapgen.coordinate_arrays(generated_grid(100))
+        values = mapgen.hash_noise(xs, ys, 1)
+        self.assertTrue(((values >= 0) & (values < 1)).all())
+        self.assertAlmostEqual(values.mean(), 0.5, places=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""Measure the memory used per tile by a generated map."""
+
+import tracemalloc
+import mapgen
+from building import Building, BuildingType
+from hexgrid import Grid
+from mapresource import Resource, ResourceType
+from terrain import Terrain, TerrainType, BiomeType
+from unit import Worker
+
+
+class DictTerrain:
+    """A terrain laid out the way every tile used to hold its own."""
+
+    def __init__(self, terrain_type, biome, resource=None):
+        """Store the same attributes Terrain holds, in a __dict__."""
+        self._terrain_type = terrain_type
+        self._biome = biome
+        self._movement_cost = \
+            Terrain(terrain_type, biome).calculate_movement_cost()
+        self._resource = resource
+
+
+class DictHex:
+    """A tile laid out the way Hex used to hold its state."""
+
+    def __init__(self, x, y, z, terrain):
+        """Store the same attributes Hex used to hold, in a __dict__."""
+        self._x = x
+        self._y = y
+        self._z = z
+        self._terrain = terrain
+        self._unit = None
+        self._building = None
+        self._civ_id = None
+        self._city_id = None
+
+
+class Unslotted:
+    """An empty object to copy slotted attributes into a __dict__ of."""
+
+
+def unslotted(obj):
+    """Copy the slot values of an object into a plain object."""
+    copy = Unslotted()
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            setattr(copy, name, getattr(obj, name))
+    return copy
+
+
+class DictResource:
+    """A resource laid out with a __dict__."""
+
+    def __init__(self, resource_type, available_quantity):
+        """Store the same attributes Resource holds, in a __dict__."""
+        self._resource_type = resource_type
+        self._available_quantity = available_quantity
+        self._is_worked = False
+
+
+def dict_map(size):
+    """Build a static map as a dictionary of coordinates to DictHex."""
+    grid = Grid(size)
+    grid.create_grid()
+    xs, ys, zs = mapgen.coordinate_arrays(grid)
+    terrain_types, biomes, resources = \
+        mapgen.static_layers(xs, ys, zs, size)
+    tracemalloc.start()
+    tiles = {}
+    for x, y, z, terrain_type, biome, resource in zip(
+            xs.tolist(), ys.tolist(), zs.tolist(), terrain_types.tolist(),
+            biomes.tolist(), resources.tolist()):
+        tile_resource = None
+        if resource >= 0:
+            tile_resource = DictResource(ResourceType(resource), 1)
+        tiles[(x, y, z)] = DictHex(x, y, z, DictTerrain(
+            TerrainType(terrain_type), BiomeType(biome), tile_resource))
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used, len(tiles)
+
+
+def slotted_map(size, views):
+    """Build a static map on a Grid, optionally with every Hex view."""
+    tracemalloc.start()
+    grid = Grid(size)
+    grid.create_grid()
+    mapgen.generate_map(grid)
+    if views:
+        for index in range(len(grid.tiles)):
+            grid.hex_at(index).terrain
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used, len(grid.tiles)
+
+
+def object_size(factory, number=10000):
+    """Measure the mean memory used by objects from a factory."""
+    tracemalloc.start()
+    objects = [factory() for i in range(number)]
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return used / number
+
+
+def main():
+    """Report bytes per tile for maps of radius 10 to 200."""
+    print("radius   tiles  dict hexes  grid arrays  grid + views")
+    for radius in [10, 25, 50, 100, 200]:
+        before, tiles = dict_map(2 * radius)
+        arrays = slotted_map(2 * radius, False)[0]
+        views = slotted_map(2 * radius, True)[0]
+        print("%6i %7i %9.0f B %10.0f B %11.0f B"
+              % (radius, tiles, before / tiles, arrays / tiles,
+                 views / tiles))
+
+    print()
+    print("object             __dict__    slots")
+    for name, factory in [
+            ("Terrain", lambda: Terrain(TerrainType.HILL, BiomeType.TUNDRA)),
+            ("Resource", lambda: Resource(ResourceType.COAL, 1)),
+            ("Worker", lambda: Worker(1, 1, None, 1)),
+            ("Building", lambda: Building(1, BuildingType.FARM, None, 1,
+                                          1))]:
+        print("%-12s %10.0f B %6.0f B"
+              % (name, object_size(lambda: unslotted(factory())),
+                 object_size(factory)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare A* against a full Dijkstra flood for single target paths."""
+
+import timeit
+import pathfinding
+from hexgrid import Grid
+
+
+def flood_path(grid, start, end, movement):
+    """Find a path the way shortest_path used to, by flooding the grid."""
+    previous, costs = pathfinding.dijkstra(
+        grid.neighbours, grid.tiles.movement_costs, start, movement)
+    return pathfinding.walk_back(previous, start, end)
+
+
+def astar_path(grid, start, end, movement):
+    """Find a path with A*, bypassing the grid's search cache."""
+    previous, cost = pathfinding.astar(
+        grid.neighbours, grid.tiles.movement_costs, start, end, movement,
+        grid.distance_heuristic(end))
+    return pathfinding.walk_back(previous, start, end)
+
+
+def benchmark(grid, start, end, movement, number=20):
+    """Print the mean time of both searches for one path."""
+    flood = timeit.timeit(lambda: flood_path(grid, start, end, movement),
+                          number=number) / number
+    astar = timeit.timeit(lambda: astar_path(grid, start, end, movement),
+                          number=number) / number
+    print("%-6s steps: %3i  flood: %8.3f ms  A*: %8.3f ms  speedup: %5.1fx"
+          % (grid.size, len(astar_path(grid, start, end, movement)),
+             flood * 1000, astar * 1000, flood / astar))
+
+
+def farthest_tile(grid, start, movement):
+    """Find the most expensive tile to reach within movement of start."""
+    previous, costs = pathfinding.dijkstra(
+        grid.neighbours, grid.tiles.movement_costs, start, movement)
+    return max(costs, key=costs.get)
+
+
+def main():
+    """Benchmark short and long paths on a range of map sizes."""
+    for size in [20, 100, 200]:
+        grid = Grid(size)
+        grid.create_grid()
+        grid.static_map()
+        start = grid.tile_index((3, -2, -1))
+        print("Short path, movement 4")
+        benchmark(grid, start, farthest_tile(grid, start, 4), 4)
+        print("Long path, movement 200")
+        benchmark(grid, start, farthest_tile(grid, start, 40), 200)
+
+
+if __name__ == "__main__":
+    main()
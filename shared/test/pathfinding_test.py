@@ -0,0 +1,110 @@
+"""pathfinding unit testing."""
+
+import unittest
+from math import inf
+import pathfinding
+from hexgrid import Grid
+from terrain import Terrain, TerrainType, BiomeType
+
+
+class PathfindingTest(unittest.TestCase):
+    """Unittest class for pathfinding."""
+
+    def setUp(self):
+        """Create a grid with a mountain next to the centre."""
+        self.grid = Grid(7)
+        self.grid.create_grid()
+        self.grid.get_hextile((1, -1, 0)).terrain = \
+            Terrain(TerrainType.MOUNTAIN, BiomeType.GRASSLAND)
+        self.centre = self.grid.tile_index((0, 0, 0))
+
+    def test_dijkstra_respects_movement_budget(self):
+        """Test no tile beyond the movement budget is reached."""
+        previous, costs = pathfinding.dijkstra(
+            self.grid.neighbours, self.grid.tiles.movement_costs,
+            self.centre, 1)
+        self.assertEqual(len(costs), 6)
+        self.assertEqual(previous[self.centre], -1)
+        self.assertTrue(all(cost <= 1 for cost in costs.values()))
+
+    def test_dijkstra_never_enters_impassable_tiles(self):
+        """Test tiles with infinite movement cost are not reached."""
+        mountain = self.grid.tile_index((1, -1, 0))
+        previous, costs = pathfinding.dijkstra(
+            self.grid.neighbours, self.grid.tiles.movement_costs,
+            self.centre, inf)
+        self.assertNotIn(mountain, costs)
+        self.assertEqual(len(costs), len(self.grid.tiles) - 1)
+
+    def test_dijkstra_stops_at_target(self):
+        """Test the search ends once the target is reached."""
+        target = self.grid.tile_index((0, 1, -1))
+        previous, costs = pathfinding.dijkstra(
+            self.grid.neighbours, self.grid.tiles.movement_costs,
+            self.centre, 10, target)
+        self.assertIn(target, costs)
+        self.assertLess(len(costs), len(self.grid.tiles))
+
+    def test_astar_finds_cheapest_path(self):
+        """Test A* path costs agree with a full Dijkstra flood."""
+        grid = Grid(20)
+        grid.create_grid()
+        grid.static_map()
+        start = grid.tile_index((3, -2, -1))
+        previous, costs = pathfinding.dijkstra(
+            grid.neighbours, grid.tiles.movement_costs, start, 12)
+        for target in range(len(grid.tiles)):
+            path, cost = pathfinding.astar(
+                grid.neighbours, grid.tiles.movement_costs, start, target,
+                12, grid.distance_heuristic(target))
+            self.assertEqual(cost, costs.get(target))
+
+    def test_distance_field_matches_nearest_source(self):
+        """Test one seeded search agrees with a search from every source."""
+        grid = Grid(20)
+        grid.create_grid()
+        grid.static_map()
+        sources = [grid.tile_index(coords) for coords in
+                   [(3, -2, -1), (-6, 1, 5), (5, 4, -9)]]
+        distances, nearest = pathfinding.distance_field(
+            grid.neighbours, grid.tiles.movement_costs, sources, 9)
+        floods = [pathfinding.dijkstra(grid.neighbours,
+                                       grid.tiles.movement_costs, source,
+                                       9)[1]
+                  for source in sources]
+        for index in range(len(grid.tiles)):
+            best = min(flood.get(index, inf) for flood in floods)
+            self.assertEqual(distances[index], best)
+            if best == inf:
+                self.assertEqual(nearest[index], -1)
+            else:
+                self.assertEqual(
+                    floods[sources.index(nearest[index])][index], best)
+
+    def test_search_cache_evicts_least_recently_used(self):
+        """Test the cache keeps only its most recently used results."""
+        cache = pathfinding.SearchCache(2)
+        cache.put("a", 0, 1)
+        cache.put("b", 0, 2)
+        cache.get("a", 0)
+        cache.put("c", 0, 3)
+        self.assertIsNone(cache.get("b", 0))
+        self.assertEqual(cache.get("a", 0), 1)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_search_cache_drops_results_from_old_epoch(self):
+        """Test results are dropped once the epoch changes."""
+        cache = pathfinding.SearchCache(2)
+        cache.put("a", 0, 1)
+        self.assertIsNone(cache.get("a", 1))
+        self.assertEqual(len(cache), 0)
+
+    def test_walk_back(self):
+        """Test rebuilding a path from predecessors."""
+        previous = {4: -1, 7: 4, 9: 7}
+        self.assertEqual(pathfinding.walk_back(previous, 4, 9), [7, 9])
+        self.assertEqual(pathfinding.walk_back(previous, 4, 5), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 from math import inf
-from terrain import Terrain, TerrainType, BiomeType
+from mapresource import Resource, ResourceType
+from terrain import Terrain, TerrainType, BiomeType, MOVEMENT_COSTS, \
+    VISION_ALLOWED
 
 
 class TerrainTest(unittest.TestCase):
@@ -17,6 +19,33 @@ class TerrainTest(unittest.TestCase):
         terrain = Terrain(TerrainType.FLAT, BiomeType.GRASSLAND)
         self.assertEqual(terrain.movement_cost, 1)
 
+    def test_shared_terrain_is_interned(self):
+        terrain = Terrain.shared(TerrainType.HILL, BiomeType.DESERT)
+        self.assertIs(Terrain.shared(TerrainType.HILL, BiomeType.DESERT),
+                      terrain)
+        self.assertEqual(terrain.movement_cost, 3)
+        with self.assertRaises(AttributeError):
+            terrain.resource = Resource(ResourceType.COAL, 1)
+        self.assertIsNone(terrain.resource)
+
+    def test_terrain_has_no_dict(self):
+        terrain = Terrain(TerrainType.FLAT, BiomeType.GRASSLAND)
+        with self.assertRaises(AttributeError):
+            terrain.colour = "green"
+
+    def test_lookup_tables_match_enum_rules(self):
+        for terrain_type in TerrainType:
+            self.assertEqual(VISION_ALLOWED[terrain_type.value],
+                             terrain_type in [TerrainType.FLAT,
+                                              TerrainType.OCEAN])
+            for biome in BiomeType:
+                self.assertEqual(
+                    MOVEMENT_COSTS[terrain_type.value][biome.value],
+                    TerrainType.get_movement_cost(terrain_type) +
+                    BiomeType.get_movement_cost(biome))
+        self.assertEqual(MOVEMENT_COSTS[TerrainType.HILL.value]
+                         [BiomeType.TUNDRA.value], 4)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,44 @@
+"""Compare ray template vision against walking hex lines tile by tile."""
+
+import timeit
+from hexgrid import Grid
+
+
+def line_vision(grid, hexagon, radius):
+    """Compute vision the way Grid.vision used to, one hex line per ray."""
+    result = {hexagon}
+    for tile in grid.single_ring(hexagon, radius):
+        if grid.hex_distance(hexagon, tile) <= radius:
+            for ray_tile in grid.hex_linedraw(hexagon, tile)[1:]:
+                result.add(ray_tile)
+                if not ray_tile.vision:
+                    break
+    return list(result)
+
+
+def main():
+    """Benchmark vision at radius 3 to 8 from every tile of a map."""
+    grid = Grid(40)
+    grid.create_grid()
+    grid.static_map()
+    centres = [grid.hex_at(index) for index in range(0, len(grid.tiles), 7)]
+    indices = [grid.hex_index(centre) for centre in centres]
+    for radius in range(3, 9):
+        lines = timeit.timeit(
+            lambda: [line_vision(grid, centre, radius)
+                     for centre in centres], number=1) / len(centres)
+        templates = timeit.timeit(
+            lambda: [grid.visible_indices(index, radius)
+                     for index in indices], number=1) / len(centres)
+        [grid.vision(centre, radius) for centre in centres]
+        cached = timeit.timeit(
+            lambda: [grid.vision(centre, radius)
+                     for centre in centres], number=1) / len(centres)
+        print("radius %i  lines: %7.1f us  templates: %6.1f us  "
+              "cached: %5.1f us  speedup: %5.1fx / %5.1fx"
+              % (radius, lines * 1e6, templates * 1e6, cached * 1e6,
+                 lines / templates, lines / cached))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Measure the bytes of pickled tile updates, as Hex objects and as wire."""
+
+import timeit
+from action import TileUpdates
+from building import Building, BuildingType
+from city import City
+from hexgrid import Grid
+from message import Message
+from unit import Archer, Swordsman, Worker
+
+
+class HexTileUpdates:
+    """A tile update pickled the way TileUpdates used to be."""
+
+    def __init__(self, tiles):
+        """Hold the tiles as they are."""
+        self._tiles = tiles
+
+
+def build_game(grid):
+    """Put a city with buildings and some units on the map."""
+    centre = grid.get_hextile((0, 0, 0))
+    city = City(1, centre, 1)
+    city.tiles = grid.spiral_ring(centre, City.RANGE)
+    for tile in city.tiles:
+        tile.civ_id = 1
+        tile.city_id = 1
+    for building_id, (coords, building_type) in enumerate(
+            [((1, 0, -1), BuildingType.FARM),
+             ((-1, 1, 0), BuildingType.UNIVERSITY),
+             ((0, -2, 2), BuildingType.TRADE_POST)]):
+        tile = grid.get_hextile(coords)
+        tile.building = Building(building_id, building_type, tile, 1, 1)
+    for unit_id, (coords, unit_type, civ_id) in enumerate(
+            [((2, -1, -1), Archer, 1), ((1, 1, -2), Worker, 1),
+             ((3, 0, -3), Swordsman, 2), ((-2, 3, -1), Archer, 2)]):
+        tile = grid.get_hextile(coords)
+        tile.unit = unit_type(unit_id, 1, tile, civ_id)
+
+
+def measure(name, tiles):
+    """Print the bytes and time of both ways of pickling some tiles."""
+    before = Message(HexTileUpdates(tiles), 1).serialise()
+    after = Message(TileUpdates(tiles), 1).serialise()
+    number = 200
+    before_time = timeit.timeit(
+        lambda: Message.deserialise(
+            Message(HexTileUpdates(tiles), 1).serialise()),
+        number=number) / number
+    after_time = timeit.timeit(
+        lambda: Message.deserialise(
+            Message(TileUpdates(tiles), 1).serialise()),
+        number=number) / number
+    print("%-22s tiles: %3i  Hex: %6i B  wire: %6i B  (%4.1fx)  "
+          "round trip: %7.1f us -> %7.1f us"
+          % (name, len(tiles), len(before), len(after),
+             len(before) / len(after), before_time * 1e6, after_time * 1e6))
+
+
+def main():
+    """Measure updates of the sizes the server sends."""
+    grid = Grid(40)
+    grid.create_grid()
+    grid.static_map()
+    build_game(grid)
+    centre = grid.get_hextile((0, 0, 0))
+    measure("city tile", [centre])
+    measure("unit move", [grid.get_hextile((2, -1, -1)),
+                          grid.get_hextile((3, -1, -2))])
+    measure("radius 3 vision", grid.vision(centre, 3))
+    measure("city destroyed", grid.spiral_ring(centre, 4))
+
+
+if __name__ == "__main__":
+    main()
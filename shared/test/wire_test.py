@@ -0,0 +1,85 @@
+"""wire unit testing."""
+
+import pickle
+import unittest
+import wire
+from action import TileUpdates
+from building import Building, BuildingType
+from city import City
+from hexgrid import Grid
+from mapresource import Resource, ResourceType
+from terrain import Terrain, TerrainType, BiomeType
+from unit import Archer
+
+
+class WireTest(unittest.TestCase):
+    """Unittest class for wire."""
+
+    def setUp(self):
+        """Create a grid with a city, a building, a unit and a resource."""
+        self.grid = Grid(20)
+        self.grid.create_grid()
+        centre = self.grid.get_hextile((0, 0, 0))
+        self.city = City(7, centre, 3)
+        self.city.tiles = self.grid.spiral_ring(centre, City.RANGE)
+        for tile in self.city.tiles:
+            tile.civ_id = 3
+            tile.city_id = 7
+        farm_tile = self.grid.get_hextile((1, 0, -1))
+        farm_tile.building = Building(2, BuildingType.FARM, farm_tile, 3, 7)
+        archer_tile = self.grid.get_hextile((2, -1, -1))
+        self.archer = Archer(5, 2, archer_tile, 3)
+        self.archer.health = 41
+        self.archer.actions = 1
+        archer_tile.unit = self.archer
+        resource_tile = self.grid.get_hextile((0, 1, -1))
+        resource_tile.terrain = Terrain(TerrainType.HILL, BiomeType.DESERT,
+                                        Resource(ResourceType.IRON, 3))
+        resource_tile.resource_worked = True
+        self.tiles = [centre, farm_tile, archer_tile, resource_tile]
+
+    def test_tiles_round_trip(self):
+        """Test decoded tiles match the originals."""
+        update = pickle.loads(pickle.dumps(TileUpdates(self.tiles)))
+        self.assertEqual(update._tiles, self.tiles)
+        centre, farm_tile, archer_tile, resource_tile = update._tiles
+
+        self.assertIsInstance(centre.building, City)
+        self.assertEqual((centre.building.id, centre.building.civ_id),
+                         (7, 3))
+        self.assertIs(centre.building._hex, centre)
+        self.assertEqual((centre.civ_id, centre.city_id), (3, 7))
+
+        farm = farm_tile.building
+        self.assertEqual((farm.id, farm.building_type, farm.civ_id,
+                          farm.city_id), (2, BuildingType.FARM, 3, 7))
+
+        archer = archer_tile.unit
+        self.assertIsInstance(archer, Archer)
+        self.assertEqual((archer.id, archer.level, archer.health,
+                          archer.actions, archer.civ_id),
+                         (5, 2, 41, 1, 3))
+        self.assertEqual(archer.strength, self.archer.strength)
+        self.assertIs(archer.position, archer_tile)
+
+        self.assertEqual(resource_tile.terrain.terrain_type,
+                         TerrainType.HILL)
+        self.assertEqual(resource_tile.resource.resource_type,
+                         ResourceType.IRON)
+        self.assertTrue(resource_tile.resource_worked)
+
+    def test_city_tiles_are_not_sent(self):
+        """Test a city's tiles stay out of the wire form of its tile."""
+        record = wire.encode_tile(self.tiles[0])
+        self.assertEqual(record[7], (BuildingType.CITY.value, 7, 3, None))
+        self.assertLess(len(pickle.dumps(TileUpdates(self.tiles[:1]))),
+                        len(pickle.dumps(self.tiles[:1])) // 10)
+
+    def test_empty_update(self):
+        """Test an update with no tiles survives pickling."""
+        update = pickle.loads(pickle.dumps(TileUpdates([])))
+        self.assertEqual(update._tiles, [])
+
+
+if __name__ == '__main__':
+    unittest.main()